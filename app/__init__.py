@@ -46,6 +46,41 @@ def create_app(config_class=None):
     login_manager.login_message = "Please log in to access this page."
     login_manager.login_message_category = "info"
     
+    # Session data lives in the database; the cookie only holds a signed id
+    from app.utils.session_utils import server_sessions
+    server_sessions.init_app(app)
+    
+    # NLTK models are loaded on first use (or all at once when NLTK_WARM_UP is set)
+    from app.utils.nltk_utils import nltk_resources
+    nltk_resources.init_app(app)
+    
+    # Background analysis jobs for uploads, with the analyzers on a process pool
+    # and their outputs stored by content hash
+    from app.utils.pool_utils import analysis_pool
+    from app.utils.cache_utils import analysis_store
+    from app.utils.job_utils import analysis_jobs
+    analysis_pool.init_app(app)
+    analysis_store.init_app(app)
+    analysis_jobs.init_app(app)
+    
+    # Outbound requests share one connection pool. News providers are asked
+    # concurrently and full articles are downloaded on a shared thread pool; news API
+    # responses and extracted articles are cached
+    from app.utils.http_utils import http_client
+    from app.utils.news_cache import article_store, news_responses
+    from app.utils.news_providers import news_providers
+    from app.utils.news_utils import article_fetcher
+    http_client.init_app(app)
+    news_providers.init_app(app)
+    news_responses.init_app(app)
+    article_store.init_app(app)
+    article_fetcher.init_app(app)
+
+    # The latest news is pulled and analyzed ahead of time by `flask ingest-news`
+    # or, with NEWS_INGEST_THREAD, a background thread
+    from app.utils.ingest_utils import news_ingestor
+    news_ingestor.init_app(app)
+
     from app.models import User
     @login_manager.user_loader
     def load_user(user_id):
@@ -2,6 +2,13 @@
 from app.models.user import User, UserConnection
 from app.models.upload import UploadedText
 from app.models.share import SharedAnalysis, AnalysisResult
+from app.models.job import AnalysisJob
+from app.models.analysis_cache import AnalysisCacheEntry, ParagraphCacheEntry
+from app.models.article_cache import ArticleCacheEntry
+from app.models.news import NewsArticle
+from app.models.session import ServerSession
+from app.models.snapshot import AnalysisSnapshot
+from app.models import search  # Full-text index DDL and sync events
 
 # Export all models that should be available when importing from app.models
-__all__ = ['User', 'UploadedText', 'SharedAnalysis', 'AnalysisResult', 'UserConnection']
\ No newline at end of file
+__all__ = ['User', 'UploadedText', 'SharedAnalysis', 'AnalysisResult', 'UserConnection', 'AnalysisJob', 'AnalysisCacheEntry', 'ParagraphCacheEntry', 'ArticleCacheEntry', 'NewsArticle', 'ServerSession', 'AnalysisSnapshot']
\ No newline at end of file
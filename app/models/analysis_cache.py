@@ -0,0 +1,50 @@
+from datetime import datetime
+from app import db
+
+class AnalysisCacheEntry(db.Model):
+    """Stored output of one analyzer for one text content"""
+    __tablename__ = 'analysis_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    analyzer = db.Column(db.String(50), nullable=False)
+    analyzer_version = db.Column(db.Integer, nullable=False)
+    params_key = db.Column(db.String(64), nullable=False)  # SHA-256 of the analyzer parameters
+    payload = db.Column(db.Text, nullable=False)  # Analyzer output stored as JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    hit_count = db.Column(db.Integer, default=0)
+    
+    # One stored result per content, analyzer version and parameters
+    __table_args__ = (
+        db.UniqueConstraint('content_hash', 'analyzer', 'analyzer_version', 'params_key', name='unique_analysis_cache_key'),
+    )
+    
+    def __repr__(self):
+        return f'<AnalysisCacheEntry {self.analyzer} v{self.analyzer_version} {self.content_hash[:10]}>'
+
+class ParagraphCacheEntry(db.Model):
+    """
+    Stored partial analysis of one paragraph (see paragraph_utils).
+
+    Kept apart from the whole-text outputs with its own size limit, so the
+    many paragraphs of a large upload cannot evict the whole-text entries.
+    """
+    __tablename__ = 'paragraph_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    paragraph_hash = db.Column(db.String(64), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    params_key = db.Column(db.String(64), nullable=False)  # SHA-256 of the analyzer versions and parameters
+    payload = db.Column(db.Text, nullable=False)  # Partial stored as JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    hit_count = db.Column(db.Integer, default=0)
+    
+    # One stored partial per paragraph, version and parameters
+    __table_args__ = (
+        db.UniqueConstraint('paragraph_hash', 'version', 'params_key', name='unique_paragraph_cache_key'),
+    )
+    
+    def __repr__(self):
+        return f'<ParagraphCacheEntry v{self.version} {self.paragraph_hash[:10]}>'
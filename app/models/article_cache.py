@@ -0,0 +1,20 @@
+from datetime import datetime
+from app import db
+
+class ArticleCacheEntry(db.Model):
+    """Extracted body of a news article page, with the HTTP validators to revalidate it"""
+    __tablename__ = 'article_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    url_hash = db.Column(db.String(64), nullable=False, unique=True)  # SHA-256 of the canonical URL
+    url = db.Column(db.Text, nullable=False)
+    content = db.Column(db.Text, nullable=True)  # None if no article text could be extracted
+    etag = db.Column(db.String(255), nullable=True)
+    last_modified = db.Column(db.String(64), nullable=True)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    validated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    hit_count = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<ArticleCacheEntry {self.url}>'
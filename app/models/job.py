@@ -0,0 +1,54 @@
+from datetime import datetime
+from app import db
+import uuid
+
+def _generate_job_id():
+    return uuid.uuid4().hex
+
+class AnalysisJob(db.Model):
+    __tablename__ = 'analysis_job'
+
+    # Job states, in the order a job moves through them
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    id = db.Column(db.String(32), primary_key=True, default=_generate_job_id)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    upload_id = db.Column(db.Integer, db.ForeignKey('uploaded_texts.id', ondelete='CASCADE'), nullable=False)
+    analysis_id = db.Column(db.Integer, db.ForeignKey('analysis_result.id', ondelete='SET NULL'), nullable=True)
+    # Jobs queued together by a batch upload share a batch id
+    batch_id = db.Column(db.String(32), nullable=True, index=True)
+    status = db.Column(db.String(20), nullable=False, default=QUEUED, index=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Relationships - deleting an upload also deletes its jobs
+    upload = db.relationship('UploadedText', backref=db.backref('analysis_jobs', cascade='all, delete-orphan'))
+    analysis = db.relationship('AnalysisResult')
+
+    def __repr__(self):
+        return f'<AnalysisJob {self.id} {self.status}>'
+
+    @property
+    def url_path(self):
+        """URL path of the finished analysis, or None while it is not ready"""
+        if self.status == self.DONE and self.analysis:
+            return self.analysis.url_path
+        return None
+
+    def to_dict(self):
+        """Return the job state as a JSON-serializable dict"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'upload_id': self.upload_id,
+            'batch_id': self.batch_id,
+            'url_path': self.url_path,
+            'error': self.error,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None
+        }
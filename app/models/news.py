@@ -0,0 +1,45 @@
+from datetime import datetime
+from app import db
+
+class NewsArticle(db.Model):
+    """
+    An article of the shared news corpus, filled by scheduled ingestion.
+
+    Its analyzer outputs are kept in the analysis cache under content_hash,
+    so importing the article into a user's uploads needs no analysis.
+    """
+    __tablename__ = 'news_article'
+
+    id = db.Column(db.Integer, primary_key=True)
+    url_hash = db.Column(db.String(64), nullable=False, unique=True)  # SHA-256 of the canonical URL
+    url = db.Column(db.Text, nullable=False)
+    category = db.Column(db.String(50), nullable=False, index=True)
+    provider = db.Column(db.String(20), nullable=True)
+    title = db.Column(db.String(255), nullable=False)
+    source = db.Column(db.String(255), nullable=True)
+    description = db.Column(db.Text, nullable=True)
+    image_url = db.Column(db.Text, nullable=True)
+    content = db.Column(db.Text, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)
+    published_at = db.Column(db.DateTime, nullable=True)
+    ingested_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Last pulled from the headlines
+    analyzed_at = db.Column(db.DateTime, nullable=True)  # None until the analyzers have run
+
+    def __repr__(self):
+        return f'<NewsArticle {self.category} {self.title}>'
+
+    def to_dict(self):
+        """Return the article in the format of the news routes"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'source': self.source or 'Unknown',
+            'url': self.url,
+            'publishedAt': (self.published_at or self.ingested_at).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'description': self.description or '',
+            'content': self.content,
+            'urlToImage': self.image_url or '',
+            'category': self.category,
+            'provider': self.provider,
+            'analyzed': self.analyzed_at is not None
+        }
@@ -0,0 +1,87 @@
+from sqlalchemy import DDL, event, inspect, text
+from app import db
+from app.models.upload import UploadedText
+
+# Full-text index of uploads and analysis results (SQLite FTS5 only).
+# Each document's rowid encodes where it comes from: upload id * 2 for
+# uploads and analysis result id * 2 + 1 for analysis results, so keeping
+# the index in sync is always a lookup by rowid. The owner column holds the
+# token 'u<user id>', so a search only visits the user's own documents.
+# SQLite drops triggers with their table, so a batch migration that
+# recreates uploaded_texts or analysis_result must run SEARCH_DDL again.
+SEARCH_TABLE = 'search_index'
+SEARCH_KINDS = ('upload', 'analysis')
+
+# Characters of a text kept in upload storage that are indexed
+SEARCH_STORED_TEXT_CHARS = 10 * 1024 * 1024
+
+SEARCH_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        title, body, owner,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+    # BM25 with title matches counting double and the owner token ignored
+    f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25(2.0, 1.0, 0.0)')",
+
+    # Uploads; the text of stored uploads is added by index_stored_upload()
+    f"""CREATE TRIGGER IF NOT EXISTS uploaded_texts_search_insert AFTER INSERT ON uploaded_texts BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, title, body, owner)
+        VALUES (new.id * 2, new.title, new.content, 'u' || new.user_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS uploaded_texts_search_update
+    AFTER UPDATE OF title, content, content_path, user_id ON uploaded_texts BEGIN
+        UPDATE {SEARCH_TABLE} SET title = new.title, owner = 'u' || new.user_id,
+            body = CASE WHEN new.content IS NULL AND new.content_path IS NOT NULL THEN body ELSE new.content END
+        WHERE rowid = new.id * 2;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS uploaded_texts_search_delete AFTER DELETE ON uploaded_texts BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+    END""",
+
+    # Analysis results
+    f"""CREATE TRIGGER IF NOT EXISTS analysis_result_search_insert AFTER INSERT ON analysis_result BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, title, body, owner)
+        VALUES (new.id * 2 + 1, new.title, new.content, 'u' || new.owner_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS analysis_result_search_update
+    AFTER UPDATE OF title, content, owner_id ON analysis_result BEGIN
+        UPDATE {SEARCH_TABLE} SET title = new.title, body = new.content, owner = 'u' || new.owner_id
+        WHERE rowid = new.id * 2 + 1;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS analysis_result_search_delete AFTER DELETE ON analysis_result BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+    END""",
+]
+
+SEARCH_DROP_DDL = [
+    'DROP TRIGGER IF EXISTS uploaded_texts_search_insert',
+    'DROP TRIGGER IF EXISTS uploaded_texts_search_update',
+    'DROP TRIGGER IF EXISTS uploaded_texts_search_delete',
+    'DROP TRIGGER IF EXISTS analysis_result_search_insert',
+    'DROP TRIGGER IF EXISTS analysis_result_search_update',
+    'DROP TRIGGER IF EXISTS analysis_result_search_delete',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+]
+
+# db.create_all() / db.drop_all() create and drop the index with the tables
+for statement in SEARCH_DDL:
+    event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in SEARCH_DROP_DDL:
+    event.listen(db.metadata, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
+
+
+@event.listens_for(UploadedText, 'after_insert')
+@event.listens_for(UploadedText, 'after_update')
+def index_stored_upload(mapper, connection, upload):
+    """Index the text of uploads kept in upload storage, which the triggers cannot read"""
+    if connection.dialect.name != 'sqlite' or not upload.is_stored:
+        return
+    if upload.id is None or not inspect(upload).attrs.content_path.history.has_changes():
+        return
+    from app.utils.storage_utils import read_stored_preview
+    try:
+        body = read_stored_preview(upload.content_path, SEARCH_STORED_TEXT_CHARS)
+    except OSError:
+        return
+    connection.execute(text(f'UPDATE {SEARCH_TABLE} SET body = :body WHERE rowid = :rowid'),
+                       {'body': body, 'rowid': upload.id * 2})
@@ -0,0 +1,15 @@
+from datetime import datetime
+from app import db
+
+class ServerSession(db.Model):
+    """Session data kept on the server; the cookie only holds the signed session id"""
+    __tablename__ = 'server_session'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(64), unique=True, nullable=False)
+    data = db.Column(db.Text, nullable=False)  # Session dict, tagged JSON
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ServerSession {self.session_id[:10]}>'
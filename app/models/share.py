@@ -1,6 +1,6 @@
 from datetime import datetime
 from app import db
-import json
+from app.models.types import CompressedJSON
 from app.models.user import User, UserConnection  # Import UserConnection from user.py
 
 class AnalysisResult(db.Model):
@@ -14,11 +14,11 @@ class AnalysisResult(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     url_path = db.Column(db.String(100), nullable=True, unique=True)  # Unique URL path for direct access
     
-    # Analysis results stored as JSON
-    sentiment_data = db.Column(db.Text, nullable=True)
-    ngram_data = db.Column(db.Text, nullable=True)
-    ner_data = db.Column(db.Text, nullable=True)
-    word_freq_data = db.Column(db.Text, nullable=True)
+    # Analysis results, stored as compressed JSON and decoded when loaded
+    sentiment_data = db.Column(CompressedJSON, nullable=True)
+    ngram_data = db.Column(CompressedJSON, nullable=True)
+    ner_data = db.Column(CompressedJSON, nullable=True)
+    word_freq_data = db.Column(CompressedJSON, nullable=True)
     
     # Relationships
     owner = db.relationship('User', backref='analysis_results')
@@ -31,31 +31,23 @@ class AnalysisResult(db.Model):
         
     @property
     def sentiment_json(self):
-        """Return sentiment_data as a Python object"""
-        if self.sentiment_data:
-            return json.loads(self.sentiment_data)
-        return None
+        """Return sentiment_data as a Python object (already decoded on load)"""
+        return self.sentiment_data
     
     @property
     def ngram_json(self):
-        """Return ngram_data as a Python object"""
-        if self.ngram_data:
-            return json.loads(self.ngram_data)
-        return None
+        """Return ngram_data as a Python object (already decoded on load)"""
+        return self.ngram_data
     
     @property
     def ner_json(self):
-        """Return ner_data as a Python object"""
-        if self.ner_data:
-            return json.loads(self.ner_data)
-        return None
+        """Return ner_data as a Python object (already decoded on load)"""
+        return self.ner_data
     
     @property
     def word_freq_json(self):
-        """Return word_freq_data as a Python object"""
-        if self.word_freq_data:
-            return json.loads(self.word_freq_data)
-        return None
+        """Return word_freq_data as a Python object (already decoded on load)"""
+        return self.word_freq_data
 
 class SharedAnalysis(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -68,50 +60,65 @@ class SharedAnalysis(db.Model):
     
     # Duplicated fields from AnalysisResult for efficient access
     title = db.Column(db.String(200), nullable=True)
-    content = db.Column(db.Text, nullable=True)  
     original_owner_id = db.Column(db.Integer, nullable=True)
     upload_id = db.Column(db.Integer, nullable=True)
     analysis_created_at = db.Column(db.DateTime, nullable=True)
     url_path = db.Column(db.String(100), nullable=True)
     
-    # Analysis results stored as JSON
-    sentiment_data = db.Column(db.Text, nullable=True)
-    ngram_data = db.Column(db.Text, nullable=True)
-    ner_data = db.Column(db.Text, nullable=True)
-    word_freq_data = db.Column(db.Text, nullable=True)
+    # Text and analysis results as shared, stored once per content in a snapshot
+    snapshot_id = db.Column(db.Integer, db.ForeignKey('analysis_snapshot.id'), nullable=True, index=True)
       # Relationships
     user = db.relationship('User', foreign_keys=[user_id], backref='shared_with_me')
     sharer = db.relationship('User', foreign_keys=[sharer_id], backref='shared_by_me')
+    snapshot = db.relationship('AnalysisSnapshot')
+    
+    # An analysis is shared with a user at most once; sharing again updates the share
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'analysis_id', name='unique_shared_analysis'),
+    )
     
     def __repr__(self):
         return f'<SharedAnalysis {self.analysis_id} shared with {self.user_id}>'
+    
+    @property
+    def content(self):
+        """Shared text, read through the snapshot"""
+        return self.snapshot.content if self.snapshot else None
+    
+    @property
+    def sentiment_data(self):
+        return self.snapshot.sentiment_data if self.snapshot else None
+    
+    @property
+    def ngram_data(self):
+        return self.snapshot.ngram_data if self.snapshot else None
+    
+    @property
+    def ner_data(self):
+        return self.snapshot.ner_data if self.snapshot else None
+    
+    @property
+    def word_freq_data(self):
+        return self.snapshot.word_freq_data if self.snapshot else None
         
     @property
     def sentiment_json(self):
-        """Return sentiment_data as a Python object"""
-        if self.sentiment_data:
-            return json.loads(self.sentiment_data)
-        return None
+        """Return sentiment_data as a Python object (already decoded on load)"""
+        return self.sentiment_data
     
     @property
     def ngram_json(self):
-        """Return ngram_data as a Python object"""
-        if self.ngram_data:
-            return json.loads(self.ngram_data)
-        return None
+        """Return ngram_data as a Python object (already decoded on load)"""
+        return self.ngram_data
     
     @property
     def ner_json(self):
-        """Return ner_data as a Python object"""
-        if self.ner_data:
-            return json.loads(self.ner_data)
-        return None
+        """Return ner_data as a Python object (already decoded on load)"""
+        return self.ner_data
     
     @property
     def word_freq_json(self):
-        """Return word_freq_data as a Python object"""
-        if self.word_freq_data:
-            return json.loads(self.word_freq_data)
-        return None
+        """Return word_freq_data as a Python object (already decoded on load)"""
+        return self.word_freq_data
 
 # UserConnection model is now imported from user.py, removing duplicate definition
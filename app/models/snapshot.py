@@ -0,0 +1,100 @@
+from datetime import datetime
+from sqlalchemy import DDL, event
+from app import db
+from app.models.types import CompressedJSON
+import hashlib
+import json
+
+# AnalysisResult columns frozen into a snapshot when an analysis is shared
+SNAPSHOT_FIELDS = ('content', 'sentiment_data', 'ngram_data', 'ner_data', 'word_freq_data')
+
+def hash_snapshot(fields):
+    """Return the SHA-256 that identifies a dict of snapshot fields"""
+    canonical = json.dumps({name: fields.get(name) for name in SNAPSHOT_FIELDS}, sort_keys=True)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class AnalysisSnapshot(db.Model):
+    """
+    Immutable copy of an analysis' text and results, stored once per content.
+    Every share of the same analysis state references the same snapshot.
+    """
+    __tablename__ = 'analysis_snapshot'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    snapshot_hash = db.Column(db.String(64), unique=True, nullable=False)  # hash_snapshot() of the fields
+    content = db.Column(db.Text, nullable=True)
+    sentiment_data = db.Column(CompressedJSON, nullable=True)
+    ngram_data = db.Column(CompressedJSON, nullable=True)
+    ner_data = db.Column(CompressedJSON, nullable=True)
+    word_freq_data = db.Column(CompressedJSON, nullable=True)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # Shares referencing this snapshot
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<AnalysisSnapshot {self.snapshot_hash[:10]} refs={self.ref_count}>'
+
+
+# ref_count is kept by triggers on shared_analysis, so shares removed by
+# database cascades (deleted analyses, uploads and users) release their
+# snapshot too. A snapshot is deleted in the statement that drops its last
+# reference. SQLite drops triggers with their table, so a batch migration
+# that recreates shared_analysis must run SNAPSHOT_REF_DDL again.
+SNAPSHOT_REF_DDL = {
+    'sqlite': [
+        """CREATE TRIGGER IF NOT EXISTS shared_analysis_snapshot_insert AFTER INSERT ON shared_analysis
+        WHEN new.snapshot_id IS NOT NULL BEGIN
+            UPDATE analysis_snapshot SET ref_count = ref_count + 1 WHERE id = new.snapshot_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS shared_analysis_snapshot_update AFTER UPDATE OF snapshot_id ON shared_analysis
+        WHEN new.snapshot_id IS NOT old.snapshot_id BEGIN
+            UPDATE analysis_snapshot SET ref_count = ref_count + 1 WHERE id = new.snapshot_id;
+            UPDATE analysis_snapshot SET ref_count = ref_count - 1 WHERE id = old.snapshot_id;
+            DELETE FROM analysis_snapshot WHERE id = old.snapshot_id AND ref_count <= 0;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS shared_analysis_snapshot_delete AFTER DELETE ON shared_analysis
+        WHEN old.snapshot_id IS NOT NULL BEGIN
+            UPDATE analysis_snapshot SET ref_count = ref_count - 1 WHERE id = old.snapshot_id;
+            DELETE FROM analysis_snapshot WHERE id = old.snapshot_id AND ref_count <= 0;
+        END""",
+    ],
+    'postgresql': [
+        """CREATE OR REPLACE FUNCTION shared_analysis_snapshot_refs() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.snapshot_id IS NOT DISTINCT FROM OLD.snapshot_id THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP <> 'DELETE' AND NEW.snapshot_id IS NOT NULL THEN
+                UPDATE analysis_snapshot SET ref_count = ref_count + 1 WHERE id = NEW.snapshot_id;
+            END IF;
+            IF TG_OP <> 'INSERT' AND OLD.snapshot_id IS NOT NULL THEN
+                UPDATE analysis_snapshot SET ref_count = ref_count - 1 WHERE id = OLD.snapshot_id;
+                DELETE FROM analysis_snapshot WHERE id = OLD.snapshot_id AND ref_count <= 0;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+        """CREATE TRIGGER shared_analysis_snapshot_refs
+        AFTER INSERT OR DELETE OR UPDATE OF snapshot_id ON shared_analysis
+        FOR EACH ROW EXECUTE FUNCTION shared_analysis_snapshot_refs()""",
+    ],
+}
+
+SNAPSHOT_REF_DROP_DDL = {
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS shared_analysis_snapshot_insert',
+        'DROP TRIGGER IF EXISTS shared_analysis_snapshot_update',
+        'DROP TRIGGER IF EXISTS shared_analysis_snapshot_delete',
+    ],
+    'postgresql': [
+        'DROP TRIGGER IF EXISTS shared_analysis_snapshot_refs ON shared_analysis',
+        'DROP FUNCTION IF EXISTS shared_analysis_snapshot_refs()',
+    ],
+}
+
+# db.create_all() / db.drop_all() create and drop the triggers with the tables
+for dialect, statements in SNAPSHOT_REF_DDL.items():
+    for statement in statements:
+        event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect=dialect))
+for dialect, statements in SNAPSHOT_REF_DROP_DDL.items():
+    for statement in statements:
+        event.listen(db.metadata, 'before_drop', DDL(statement).execute_if(dialect=dialect))
@@ -0,0 +1,44 @@
+import json
+import zlib
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# zlib level for stored payloads; 6 is the usual size/speed balance
+COMPRESSION_LEVEL = 6
+
+def dump_json(value):
+    """Encode a JSON-serializable value as compact UTF-8 bytes, with orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def load_json(data):
+    """Decode UTF-8 JSON bytes, with orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON value stored as zlib-compressed bytes.
+
+    The attribute holds the decoded Python value: it is decoded once when
+    the row is loaded (and then kept in the session's identity map for the
+    rest of the request) and encoded once when it is written.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(dump_json(value), COMPRESSION_LEVEL)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return load_json(zlib.decompress(value))
@@ -1,5 +1,25 @@
 from datetime import datetime
+from sqlalchemy.orm import validates
 from app import db
+import hashlib
+
+def hash_content(content):
+    """Return the SHA-256 hex digest that identifies a text content"""
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+# Characters of a text shown in upload lists
+PREVIEW_CHARS = 100
+
+def make_preview(content=None, content_path=None):
+    """
+    Return the list preview of a text: its first PREVIEW_CHARS characters,
+    read from upload storage when the text is kept there
+    """
+    if content is None and content_path:
+        from app.utils.storage_utils import read_stored_preview
+        content = read_stored_preview(content_path, PREVIEW_CHARS + 1)
+    content = content or ''
+    return content[:PREVIEW_CHARS] + '...' if len(content) > PREVIEW_CHARS else content
 
 class UploadedText(db.Model):
     __tablename__ = 'uploaded_texts'
@@ -8,9 +28,41 @@ class UploadedText(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     title = db.Column(db.String(255), nullable=True)
     content = db.Column(db.Text, nullable=True)
+    # SHA-256 of content, kept in sync whenever content is assigned
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    # Large files are kept in upload storage instead of the content column
+    content_path = db.Column(db.String(512), nullable=True)
+    content_size = db.Column(db.Integer, nullable=True)
     filename = db.Column(db.String(255), nullable=True)
     file_type = db.Column(db.String(50), default='text')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Upload lists are paged newest first by (created_at, id) per user
+    __table_args__ = (
+        db.Index('ix_uploaded_texts_user_created', 'user_id', 'created_at', 'id'),
+    )
+    
+    @validates('content')
+    def _update_content_hash(self, key, content):
+        self.content_hash = hash_content(content) if content is not None else None
+        return content
+    
+    @property
+    def is_stored(self):
+        """True if the content is kept in upload storage rather than the database"""
+        return self.content is None and bool(self.content_path)
+    
+    def read_content(self):
+        """Return the full text, from the database or from upload storage"""
+        if self.is_stored:
+            from app.utils.storage_utils import read_stored_text
+            return read_stored_text(self.content_path)
+        return self.content
+    
+    @property
+    def preview(self):
+        """The first 100 characters of the text, for upload lists"""
+        return make_preview(self.content, self.content_path)
+    
     def __repr__(self):
-        return f'<UploadedText {self.id}>'
\ No newline at end of file
+        return f'<UploadedText {self.id}>'
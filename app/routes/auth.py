@@ -4,6 +4,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from app.models import User
 from app import db
+from app.utils.session_utils import server_sessions
 from app.forms import (
     LoginForm, RegistrationForm, ResetPasswordRequestForm, 
     ResetPasswordForm, UpdateProfileForm, ChangePasswordForm, DeleteAccountForm
@@ -41,6 +42,7 @@ def login():
                 return redirect(url_for('auth.login'))
 
         login_user(user, remember=form.remember_me.data)
+        server_sessions.regenerate(session)
         
         # Handle AJAX vs regular form submission for success case
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -62,6 +64,7 @@ def login():
 def logout():
     """Handle user logout."""
     logout_user()
+    server_sessions.regenerate(session)
     flash('You have been logged out.', 'info')
     return redirect(url_for('auth.login'))
 
@@ -227,6 +230,7 @@ def register():
                 
                 # Log the user in
                 login_user(new_user)
+                server_sessions.regenerate(session)
                 
                 return jsonify({
                     'success': 'Registration successful!', 
@@ -243,6 +247,7 @@ def register():
             db.session.add(new_user)
             db.session.commit()
             login_user(new_user)
+            server_sessions.regenerate(session)
             flash('Your account has been created!', 'success')
             return redirect(url_for('main.home'))
     
@@ -365,6 +370,7 @@ def profile():
                 db.session.delete(user)
                 db.session.commit()
                 logout_user()
+                server_sessions.regenerate(session)
                 
                 return jsonify({
                     'success': 'Account deleted successfully',
@@ -394,6 +400,7 @@ def profile():
             db.session.delete(user)
             db.session.commit()
             logout_user()
+            server_sessions.regenerate(session)
             
             return jsonify({
                 'success': 'Account deleted successfully',
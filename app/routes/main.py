@@ -1,43 +1,12 @@
 from flask import Blueprint, render_template, session, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from ..utils.ngram_utils import get_multiple_ngrams
-from ..utils.word_frequency_utils import analyze_word_frequency
-from app.models import UploadedText, AnalysisResult, SharedAnalysis
+from app.models import AnalysisResult, SharedAnalysis, AnalysisJob, UploadedText
 from app import db
-import json
-import uuid
-import hashlib
+from sqlalchemy.orm import load_only
 
 
 main_bp = Blueprint('main', __name__)
 
-# Helper function to generate a URL path
-def _generate_url_path():
-    """Generate a unique URL path for an analysis result"""
-    unique_id = str(uuid.uuid4())
-    hash_id = hashlib.md5(f"{unique_id}-{current_user.id}".encode()).hexdigest()[:10]
-    return f"{current_user.id}-{hash_id}"
-
-# Helper function to process text content and generate analysis data
-def _process_text_content(text_content):
-    """Process text content and generate analysis data"""
-    result = {
-        'ngram_data': None,
-        'word_freq_data': None
-    }
-    
-    if text_content and text_content != 'No text analyzed yet.':
-        # Generate N-gram data
-        result['ngram_data'] = get_multiple_ngrams(text_content)
-        
-        # Generate word frequency data
-        result['word_freq_data'] = analyze_word_frequency(text_content)
-        
-        # Store word frequency data in session
-        session['word_freq_data'] = result['word_freq_data']
-    
-    return result
-
 # Helper function to load analysis data from an analysis object
 def _load_analysis_data(analysis):
     """Load and parse analysis data from an analysis object"""
@@ -49,24 +18,21 @@ def _load_analysis_data(analysis):
     }
     
     if analysis:
-        if analysis.sentiment_data:
-            result['sentiment_data'] = json.loads(analysis.sentiment_data)
-        
-        if analysis.ngram_data:
-            result['ngram_data'] = json.loads(analysis.ngram_data)
-        
-        if analysis.ner_data:
-            result['ner_data'] = json.loads(analysis.ner_data)
-        
-        if analysis.word_freq_data:
-            result['word_freq_data'] = json.loads(analysis.word_freq_data)
+        # The columns are decoded once, when the analysis is loaded
+        result['sentiment_data'] = analysis.sentiment_data or None
+        result['ngram_data'] = analysis.ngram_data or None
+        result['ner_data'] = analysis.ner_data or None
+        result['word_freq_data'] = analysis.word_freq_data or None
     
     return result
 
 # Helper function to get previous analyses
 def _get_previous_analyses():
-    """Get previous analysis results for the current user"""
-    return AnalysisResult.query.filter_by(owner_id=current_user.id) \
+    """Get previous analysis results for the current user, without their analyzer outputs"""
+    return AnalysisResult.query.options(load_only(
+        AnalysisResult.id, AnalysisResult.title, AnalysisResult.content,
+        AnalysisResult.created_at, AnalysisResult.url_path
+    )).filter_by(owner_id=current_user.id) \
         .order_by(AnalysisResult.created_at.desc()).limit(5).all()
 
 @main_bp.route('/')
@@ -84,7 +50,8 @@ def analyze(url_path=None):
     """
     Unified route to handle both new analysis and viewing existing analysis
     If url_path is provided, it loads an existing analysis
-    If no url_path, it creates a new analysis based on upload_id or session data
+    If no url_path, it opens the analysis of the upload in the session,
+    queueing an analysis job if there is none yet
     """
     # Check if we're viewing an existing analysis
     if url_path:
@@ -121,114 +88,40 @@ def analyze(url_path=None):
             previous_analyses=previous_analyses
         )
     
-    # Creating a new analysis based on upload_id or session data
-    # Get analysis results from session
-    sentiment_data = session.get('sentiment_data', None)
-    ner_data = session.get('ner_data', None) 
-    word_freq_data = session.get('word_freq_data', None)
+    # New analyses are created by upload jobs and viewed through their own
+    # URL path; the upload view finds it, or queues the job that creates it
+    upload_id = session.get('upload_id')
+    if upload_id:
+        upload = db.session.get(UploadedText, upload_id)
+        if upload is not None and upload.user_id == current_user.id:
+            return redirect(url_for('upload.view_upload', upload_id=upload.id))
     
-    # Get the upload_id from the session
-    upload_id = session.get('upload_id', None)
-    text_content = 'No text analyzed yet.'
-    ngram_data = None
+    flash('Upload a text to analyze it', 'info')
+    return redirect(url_for('upload.upload'))
+
+@main_bp.route('/analysis/job/<string:job_id>')
+@login_required
+def analysis_job(job_id):
+    """
+    Wait for a background analysis job
+    Redirects to the analysis once it is done, otherwise shows a page that
+    polls the job status until the result URL is ready
+    """
+    job = db.session.get(AnalysisJob, job_id)
     
-    # Try to get the text content from database if possible
-    if upload_id:
-        uploaded_text = UploadedText.query.get(upload_id)
-        if uploaded_text and uploaded_text.user_id == current_user.id:
-            # Get the full text directly from the database
-            text_content = uploaded_text.content
-            
-            # Store the analysis results in the database
-            try:
-                # Process the text content to get analysis data
-                analysis_results = _process_text_content(text_content)
-                ngram_data = analysis_results['ngram_data']
-                word_freq_data = analysis_results['word_freq_data']
-                
-                # Convert data to JSON for storage
-                sentiment_json = json.dumps(sentiment_data) if sentiment_data else None
-                ner_json = json.dumps(ner_data) if ner_data else None
-                ngram_json = json.dumps(ngram_data) if ngram_data else None
-                word_freq_json = json.dumps(word_freq_data) if word_freq_data else None
-                
-                # Create a title for the analysis result
-                title = f"Analysis of {uploaded_text.title}"
-                
-                # Check if an analysis result already exists
-                existing_analysis = AnalysisResult.query.filter_by(
-                    upload_id=upload_id, 
-                    owner_id=current_user.id
-                ).first()
-                
-                if existing_analysis:
-                    # Update the existing analysis result
-                    existing_analysis.content = text_content
-                    existing_analysis.sentiment_data = sentiment_json
-                    existing_analysis.ngram_data = ngram_json
-                    existing_analysis.ner_data = ner_json
-                    existing_analysis.word_freq_data = word_freq_json
-                    
-                    # If URL path doesn't exist, create one
-                    if not existing_analysis.url_path:
-                        existing_analysis.url_path = _generate_url_path()
-                    
-                    url_path = existing_analysis.url_path
-                else:
-                    # Create a unique URL path
-                    url_path = _generate_url_path()
-                      # Create a new analysis result
-                    new_analysis = AnalysisResult(
-                        title=title,
-                        content=text_content,
-                        sentiment_data=sentiment_json,
-                        ngram_data=ngram_json,
-                        ner_data=ner_json,
-                        word_freq_data=word_freq_json,
-                        owner_id=current_user.id,
-                        upload_id=upload_id,
-                        url_path=url_path
-                    )
-                    db.session.add(new_analysis)
-                
-                db.session.commit()
-                flash('Analysis results saved to database', 'success')
-                
-                # Redirect to the unique URL path
-                return redirect(url_for('main.analyze', url_path=url_path))
-            except Exception as e:
-                flash(f'Error saving analysis results: {str(e)}', 'danger')
-                db.session.rollback()
-        else:
-            # Fallback to session data
-            text_content = session.get('text_content', 'No text analyzed yet.')
-            
-            # Process the text content
-            analysis_results = _process_text_content(text_content)
-            ngram_data = analysis_results['ngram_data']
-            word_freq_data = analysis_results['word_freq_data']
-    else:
-        # Fallback to session data
-        text_content = session.get('text_content', 'No text analyzed yet.')
-        
-        # Process the text content
-        analysis_results = _process_text_content(text_content)
-        ngram_data = analysis_results['ngram_data']
-        word_freq_data = analysis_results['word_freq_data']
+    # Check if the current user owns the job
+    if job is None or job.user_id != current_user.id:
+        flash('Analysis job not found', 'danger')
+        return redirect(url_for('upload.upload'))
+    
+    if job.status == AnalysisJob.DONE and job.url_path:
+        return redirect(url_for('main.analyze', url_path=job.url_path))
     
-    # Get previous analysis results for the current user
-    previous_analyses = _get_previous_analyses()
+    if job.status == AnalysisJob.FAILED:
+        flash(f'Analysis failed: {job.error}', 'danger')
+        return redirect(url_for('upload.upload'))
     
-    # Render the analysis template with the analysis data
-    return render_template(
-        'analyze.html', 
-        sentiment_data=sentiment_data,
-        ngram_data=ngram_data, 
-        ner_data=ner_data,
-        word_freq_data=word_freq_data,
-        analyzed_text=text_content,
-        previous_analyses=previous_analyses
-    )
+    return render_template('analysis_pending.html', job=job)
 
 @main_bp.route('/protected-route')
 @login_required
@@ -1,9 +1,11 @@
 from app import db
 from app.models.user import User, UserConnection
 from app.models.share import SharedAnalysis, AnalysisResult
+from app.utils.share_utils import load_share_targets, upsert_shares
 from flask import Blueprint, render_template, session, request, redirect, url_for, jsonify, flash
 from flask_login import login_required, current_user
-from sqlalchemy import and_, inspect
+from sqlalchemy import and_, func, inspect
+from sqlalchemy.orm import joinedload, load_only
 from datetime import datetime
 
 # Define blueprint
@@ -40,68 +42,31 @@ def share_results():
         return "Error: No users selected", 400
 
     try:
+        selected_ids = list(dict.fromkeys(int(result_id) for result_id in selected_ids))
+        user_ids = list(dict.fromkeys(int(user_id) for user_id in user_ids))
+    except (TypeError, ValueError):
+        return "Error: Invalid analysis or user ID", 400
+
+    try:
+        # Load all recipients and analysis results with one IN query each
+        results, existing_users = load_share_targets(selected_ids, user_ids)
+
         # Validate all users exist
         for user_id in user_ids:
-            user = User.query.get(user_id)
-            if not user:
+            if user_id not in existing_users:
                 return f"Error: User ID {user_id} not found", 400
 
         # Validate all analysis results exist and belong to current user
         for result_id in selected_ids:
-            result = AnalysisResult.query.get(result_id)
+            result = results.get(result_id)
             if not result:
                 return f"Error: Analysis result {result_id} not found", 400
             if result.owner_id != current_user.id:
-                return f"Error: You don't own analysis result {result_id}", 403        # Create share entries
-        for user_id in user_ids:
-            for result_id in selected_ids:
-                # Check if already shared
-                existing = SharedAnalysis.query.filter_by(
-                    user_id=user_id,
-                    analysis_id=result_id
-                ).first()
-                
-                # Get the full analysis result data
-                result = AnalysisResult.query.get(result_id)
-                
-                if existing:
-                    # Update existing share
-                    existing.permission = permission
-                    existing.message = message
-                    existing.sharer_id = current_user.id  # Set current user as sharer
-                    # Update all the duplicated fields 
-                    existing.title = result.title
-                    existing.content = result.content
-                    existing.original_owner_id = result.owner_id
-                    existing.upload_id = result.upload_id
-                    existing.analysis_created_at = result.created_at
-                    existing.url_path = result.url_path
-                    existing.sentiment_data = result.sentiment_data
-                    existing.ngram_data = result.ngram_data
-                    existing.ner_data = result.ner_data
-                    existing.word_freq_data = result.word_freq_data
-                else:
-                    # Create new share with all analysis data
-                    entry = SharedAnalysis(
-                        user_id=user_id,
-                        analysis_id=result_id,
-                        sharer_id=current_user.id,  # Set current user as sharer
-                        permission=permission,
-                        message=message,
-                        # Add all the duplicated fields
-                        title=result.title,
-                        content=result.content,
-                        original_owner_id=result.owner_id,
-                        upload_id=result.upload_id,
-                        analysis_created_at=result.created_at,
-                        url_path=result.url_path,
-                        sentiment_data=result.sentiment_data,
-                        ngram_data=result.ngram_data,
-                        ner_data=result.ner_data,
-                        word_freq_data=result.word_freq_data
-                    )
-                    db.session.add(entry)
+                return f"Error: You don't own analysis result {result_id}", 403
 
+        # Create or update every share in one upsert, committed as one transaction
+        upsert_shares([results[result_id] for result_id in selected_ids], user_ids,
+                      current_user.id, permission, message)
         db.session.commit()
         return "Analysis results shared successfully!", 200
 
@@ -112,94 +77,54 @@ def share_results():
 @share_bp.route('/')
 @login_required
 def shared_page():
-    # Get connected users for the current user using ORM
+    # Get connected users for the current user using ORM, loading the users in the same query
     if table_exists('user_connection'):
-        # Use ORM query to get user connections
-        connections = UserConnection.query.filter_by(user_id=current_user.id).all()
+        connections = UserConnection.query.options(
+            joinedload(UserConnection.connected_user)
+        ).filter_by(user_id=current_user.id).all()
         connected_users = [conn.connected_user for conn in connections]
     else:
         # Fallback to all users if table doesn't exist
         connected_users = User.query.filter(User.id != current_user.id).all()
     
-    # Direct query to get ONLY the newest result per upload_id where title is correctly formatted
-    # This approach eliminates the issues with multiple entries being displayed
-    from sqlalchemy import func, desc
-    
-    # Use a simpler approach that's more reliable
-    # Get a list of all upload_id values for the current user
-    upload_ids = db.session.query(AnalysisResult.upload_id).filter(
+    # Newest analysis result per upload of the current user. Titles are stored
+    # in the "Analysis Result: " form (see format_analysis_title), so this page
+    # only reads, and the compressed analyzer outputs are not loaded.
+    newest_result = db.session.query(
+        AnalysisResult.id,
+        func.row_number().over(
+            partition_by=AnalysisResult.upload_id,
+            order_by=(AnalysisResult.created_at.desc(), AnalysisResult.id.desc())
+        ).label('rank')
+    ).filter(
         AnalysisResult.owner_id == current_user.id,
         AnalysisResult.upload_id.isnot(None)
-    ).distinct().all()
-    upload_ids = [id[0] for id in upload_ids]  # Convert from [(id1,), (id2,)] to [id1, id2]
-    
-    # Get the newest result for each upload_id that is explicitly an analysis result
-    # and not just a copy of the original upload title
-    my_results = []
-    for upload_id in upload_ids:
-        # For each upload_id, find results that have "Analysis" in the title
-        analysis_results = AnalysisResult.query.filter(
-            AnalysisResult.owner_id == current_user.id,
-            AnalysisResult.upload_id == upload_id,
-            (AnalysisResult.title.startswith("Analysis Result:") | AnalysisResult.title.startswith("Analysis of "))
-        ).order_by(desc(AnalysisResult.created_at)).all()
-        
-        # If we found analysis results, use the newest one
-        if analysis_results:
-            newest = analysis_results[0]
-            # Standardize the title format if needed
-            if newest.title.startswith("Analysis of "):
-                newest.title = newest.title.replace("Analysis of ", "Analysis Result: ")
-                db.session.commit()
-            my_results.append(newest)
-        else:
-            # Check if there's any result at all for this upload_id
-            regular_result = AnalysisResult.query.filter(
-                AnalysisResult.owner_id == current_user.id,
-                AnalysisResult.upload_id == upload_id
-            ).order_by(desc(AnalysisResult.created_at)).first()
-            
-            # If there is a result but without "Analysis" in the title, fix it
-            if regular_result:
-                regular_result.title = f"Analysis Result: {regular_result.title}"
-                db.session.commit()
-                my_results.append(regular_result)
-      # Get results shared with current user directly from the SharedAnalysis table
-    # This now contains all the duplicated analysis data
-    from sqlalchemy import func, desc
-    
-    # Get all shared analyses for the current user
-    shared_analyses = SharedAnalysis.query.filter(
-        SharedAnalysis.user_id == current_user.id
-    ).all()
+    ).subquery()
     
-    # Organize by upload_id to find the newest for each
-    shared_by_upload = {}
+    my_results = AnalysisResult.query.options(
+        load_only(AnalysisResult.id, AnalysisResult.title, AnalysisResult.created_at)
+    ).join(
+        newest_result, newest_result.c.id == AnalysisResult.id
+    ).filter(newest_result.c.rank == 1).order_by(AnalysisResult.created_at.desc()).all()
     
-    # Group by upload_id and keep only the newest
-    for shared_analysis in shared_analyses:
-        if shared_analysis.upload_id is not None:
-            # Group by upload_id
-            if shared_analysis.upload_id not in shared_by_upload or shared_analysis.analysis_created_at > shared_by_upload[shared_analysis.upload_id].analysis_created_at:
-                shared_by_upload[shared_analysis.upload_id] = shared_analysis
+    # Newest share per upload among the analyses shared with the current user,
+    # with the sharers loaded in the same query
+    newest_share = db.session.query(
+        SharedAnalysis.id,
+        func.row_number().over(
+            partition_by=SharedAnalysis.upload_id,
+            order_by=(SharedAnalysis.analysis_created_at.desc(), SharedAnalysis.id)
+        ).label('rank')
+    ).filter(
+        SharedAnalysis.user_id == current_user.id,
+        SharedAnalysis.upload_id.isnot(None)
+    ).subquery()
     
-    # Convert to list and fix titles if needed
-    shared_results = list(shared_by_upload.values())
-    
-    # Standardize titles if needed
-    for result in shared_results:
-        if not result.title.startswith("Analysis Result:"):
-            if result.title.startswith("Analysis of "):
-                result.title = result.title.replace("Analysis of ", "Analysis Result: ")
-            else:
-                result.title = f"Analysis Result: {result.title}"
-            db.session.commit()
-    
-    # Filter out any results that do not start with 'Analysis Result:'
-    my_results = [result for result in my_results if result.title.startswith('Analysis Result:')]
-
-    # Also ensure all shared results have proper titles
-    shared_results = [result for result in shared_results if result.title.startswith('Analysis Result:')]
+    shared_results = SharedAnalysis.query.options(
+        joinedload(SharedAnalysis.sharer)
+    ).join(
+        newest_share, newest_share.c.id == SharedAnalysis.id
+    ).filter(newest_share.c.rank == 1).order_by(SharedAnalysis.analysis_created_at.desc()).all()
 
     return render_template('share.html',
         users=connected_users,
@@ -324,25 +249,13 @@ def view_shared_analysis(shared_id):
         flash('You do not have permission to view this analysis', 'danger')
         return redirect(url_for('share.shared_page'))
         
-    # Parse the JSON data
-    import json
-    
-    sentiment_data = None
-    ngram_data = None
-    ner_data = None
-    word_freq_data = None
+    # The analysis data is decoded once, when the snapshot is loaded
+    sentiment_data = shared.sentiment_data or None
+    ngram_data = shared.ngram_data or None
+    ner_data = shared.ner_data or None
+    word_freq_data = shared.word_freq_data or None
     
-    if shared.sentiment_data:
-        sentiment_data = json.loads(shared.sentiment_data)
-    
-    if shared.ngram_data:
-        ngram_data = json.loads(shared.ngram_data)
-    
-    if shared.ner_data:
-        ner_data = json.loads(shared.ner_data)
-    
-    if shared.word_freq_data:
-        word_freq_data = json.loads(shared.word_freq_data)    # Create a dict to represent the original owner
+    # Create a dict to represent the original owner
     original_owner = User.query.get(shared.original_owner_id)
     owner_info = {
         "username": original_owner.username if original_owner else "Unknown User"
@@ -389,10 +302,12 @@ def save_shared_to_my_news(shared_id):
         # Create a new UploadedText from the shared analysis
         from app.models import UploadedText
         
-        # Check if the user already has this content saved
+        from app.models.upload import hash_content
+        
+        # Check if the user already has this content saved (indexed hash lookup)
         existing_upload = UploadedText.query.filter_by(
             user_id=current_user.id,
-            content=shared.content
+            content_hash=hash_content(shared.content)
         ).first()
         
         if existing_upload:
@@ -1,40 +1,267 @@
-from flask import Blueprint, render_template, request, jsonify, current_app, flash, redirect, url_for, session
+from flask import Blueprint, render_template, request, jsonify, current_app, flash, redirect, url_for, session, abort
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-from app.models import UploadedText, AnalysisResult
+from app.models import UploadedText, AnalysisResult, AnalysisJob, NewsArticle
+from app.models.upload import PREVIEW_CHARS, make_preview
 from app.models.share import SharedAnalysis
 from app import db
 from flask_wtf.csrf import validate_csrf, ValidationError
-from app.utils.sentiment_utils import get_sentiment_summary
-from app.utils.ngram_utils import get_multiple_ngrams
-from app.utils.ner_utils import perform_ner_analysis
-from app.utils.word_frequency_utils import analyze_word_frequency
+from app.utils.http_utils import http_client
+from app.utils.ingest_utils import news_ingestor
+from app.utils.job_utils import analysis_jobs
+from app.utils.news_cache import article_store, news_responses
+from app.utils.news_providers import news_providers
+from app.utils.news_utils import article_fetcher, needs_full_content
+from app.utils.analysis_utils import SUMMARY_ANALYZERS, summarize_analysis
+from app.utils.cache_utils import analysis_store
+from app.utils.search_utils import SEARCH_MAX_PAGE_SIZE, SEARCH_PAGE_SIZE, SearchUnavailable, search_documents
+from app.utils.storage_utils import delete_stored_text, store_text_stream
 import os
 import re
+import zipfile
 import traceback
-import requests
 from datetime import datetime, timedelta
+from functools import wraps
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import joinedload
 
 upload_bp = Blueprint('upload', __name__, url_prefix='/upload')
 
 # Define allowed file types
 ALLOWED_EXTENSIONS = {'txt'}
 
+# Uploads per page of the upload history and list endpoints
+UPLOAD_PAGE_SIZE = 50
+UPLOAD_MAX_PAGE_SIZE = 200
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def stats_route(view):
+    """Serve a route reporting process-wide state only when STATS_ENDPOINTS_ENABLED is set."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not current_app.config.get('STATS_ENDPOINTS_ENABLED'):
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapped
+
+def _create_file_upload(file, title=None):
+    """
+    Stream an uploaded .txt file to storage and build its UploadedText.
+    
+    The file is never read into memory as a whole. Files up to
+    UPLOAD_INLINE_MAX_BYTES are then moved into the content column; larger
+    ones stay in upload storage and are analyzed from there.
+    
+    Returns:
+        tuple: (UploadedText, StoredText), or (None, None) if the file is empty
+    
+    Raises:
+        UnicodeDecodeError: If the file is not UTF-8 encoded
+    """
+    return _create_stream_upload(file.stream, secure_filename(file.filename), title)
+
+def _create_stream_upload(stream, filename, title=None, size=None):
+    """
+    Build the UploadedText of a binary stream of UTF-8 text.
+    
+    Streams whose size is known and at most UPLOAD_INLINE_MAX_BYTES are
+    decoded in memory; the others go through upload storage like
+    _create_file_upload().
+    
+    Returns:
+        tuple: (UploadedText, StoredText or None if kept in memory), or
+        (None, None) if the text is empty
+    
+    Raises:
+        UnicodeDecodeError: If the text is not UTF-8 encoded
+    """
+    new_upload = UploadedText(
+        user_id=current_user.id,
+        title=title,
+        filename=filename,
+        file_type='file'
+    )
+    
+    inline_max = current_app.config['UPLOAD_INLINE_MAX_BYTES']
+    if size is not None and size <= inline_max:
+        content = stream.read().decode('utf-8')
+        if not content.strip():
+            return None, None
+        new_upload.content = content
+        new_upload.content_size = size
+        return new_upload, None
+    
+    stored = store_text_stream(stream, current_app.config['UPLOAD_STORAGE_DIR'])
+    if not stored.has_text:
+        stored.delete()
+        return None, None
+    
+    new_upload.content_size = stored.size
+    if stored.size <= inline_max:
+        new_upload.content = stored.read()
+        stored.delete()
+    else:
+        new_upload.content_path = stored.path
+        new_upload.content_hash = stored.content_hash
+    
+    return new_upload, stored
+
+def _batch_entries(files):
+    """
+    List the texts of a batch upload: plain .txt files, and the .txt entries
+    of .zip archives.
+    
+    Archives are read through zipfile straight from the request stream and
+    each entry is decompressed as it is read, so nothing is extracted to
+    disk. Directories and hidden or macOS metadata entries are ignored.
+    
+    Yields:
+        tuple: (name, size or None, function opening a binary stream or None,
+        error message or None); entries of an archive are named
+        'archive.zip/path/in/archive.txt'
+    """
+    for file in files:
+        name = file.filename or ''
+        extension = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+        if extension == 'txt':
+            yield name, None, lambda file=file: file.stream, None
+        elif extension == 'zip':
+            try:
+                archive = zipfile.ZipFile(file.stream)
+            except zipfile.BadZipFile:
+                yield name, None, None, 'Not a valid zip archive'
+                continue
+            with archive:
+                for info in archive.infolist():
+                    basename = info.filename.rsplit('/', 1)[-1]
+                    if info.is_dir() or not basename or basename.startswith('.') or info.filename.startswith('__MACOSX/'):
+                        continue
+                    entry = f'{name}/{info.filename}'
+                    if not basename.lower().endswith('.txt'):
+                        yield entry, None, None, 'Only .txt files are allowed'
+                    elif info.flag_bits & 0x1:
+                        yield entry, None, None, 'Encrypted entries are not supported'
+                    else:
+                        yield entry, info.file_size, lambda archive=archive, info=info: archive.open(info), None
+        else:
+            yield name, None, None, 'Only .txt and .zip files are allowed'
+
+def _encode_cursor(created_at, upload_id):
+    """Return the page cursor of an upload: its (created_at, id) position"""
+    return f"{created_at.isoformat()}_{upload_id}"
+
+def _decode_cursor(cursor):
+    """Parse a page cursor; raises ValueError if it is malformed"""
+    created_at, _, upload_id = cursor.rpartition('_')
+    return datetime.fromisoformat(created_at), int(upload_id)
+
+def _upload_page(user_id, cursor=None, since=None, limit=UPLOAD_PAGE_SIZE):
+    """
+    Load one page of a user's uploads, newest first, in a single query.
+    
+    Pages are keyed on (created_at, id) instead of offsets, so each page is
+    an index range scan however deep the user pages. The preview only reads
+    the start of the content, and the analysis URL path comes from the same
+    joined query.
+    
+    A since page holds the oldest new uploads (still listed newest first),
+    so none are skipped when more than a page was added. While its next
+    cursor is set, even newer uploads remain and the caller must pass it as
+    since again.
+    
+    Args:
+        user_id: Owner of the uploads
+        cursor: Only return uploads older than this cursor (the next page)
+        since: Only return uploads newer than this cursor (new uploads)
+        limit: Maximum number of uploads to return
+        
+    Returns:
+        tuple: (list of upload dicts, cursor of the next page or None; with
+        since, the since of the next page of newer uploads)
+        
+    Raises:
+        ValueError: If a cursor is malformed
+    """
+    # Analysis URL path of each of the user's uploads
+    analyses = db.session.query(
+        AnalysisResult.upload_id,
+        func.max(AnalysisResult.url_path).label('url_path')
+    ).filter(
+        AnalysisResult.owner_id == user_id
+    ).group_by(AnalysisResult.upload_id).subquery()
+    
+    query = db.session.query(
+        UploadedText.id,
+        UploadedText.title,
+        UploadedText.filename,
+        UploadedText.file_type,
+        UploadedText.created_at,
+        UploadedText.content_path,
+        func.substr(UploadedText.content, 1, PREVIEW_CHARS + 1).label('content_start'),
+        analyses.c.url_path
+    ).outerjoin(
+        analyses, analyses.c.upload_id == UploadedText.id
+    ).filter(UploadedText.user_id == user_id)
+    
+    if cursor:
+        created_at, upload_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            UploadedText.created_at < created_at,
+            and_(UploadedText.created_at == created_at, UploadedText.id < upload_id)
+        ))
+    if since:
+        created_at, upload_id = _decode_cursor(since)
+        query = query.filter(or_(
+            UploadedText.created_at > created_at,
+            and_(UploadedText.created_at == created_at, UploadedText.id > upload_id)
+        ))
+    
+    # Fetch one extra row to know whether another page follows
+    if since:
+        rows = query.order_by(UploadedText.created_at.asc(), UploadedText.id.asc()).limit(limit + 1).all()
+        next_cursor = _encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+        rows = rows[:limit][::-1]
+    else:
+        rows = query.order_by(UploadedText.created_at.desc(), UploadedText.id.desc()).limit(limit + 1).all()
+        next_cursor = _encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    
+    uploads = [{
+        'id': row.id,
+        'title': row.title,
+        'filename': row.filename,
+        'file_type': row.file_type,
+        'created_at': row.created_at,
+        'preview': make_preview(row.content_start, row.content_path),
+        'analysis_url_path': row.url_path,
+        'cursor': _encode_cursor(row.created_at, row.id)
+    } for row in rows[:limit]]
+    
+    return uploads, next_cursor
+
+def _page_args():
+    """Read the cursor, since and limit query parameters of a paged endpoint"""
+    limit = request.args.get('limit', UPLOAD_PAGE_SIZE, type=int)
+    return {
+        'cursor': request.args.get('cursor') or None,
+        'since': request.args.get('since') or None,
+        'limit': max(1, min(limit, UPLOAD_MAX_PAGE_SIZE))
+    }
+
 @upload_bp.route('/', methods=['GET', 'POST'])
 @login_required
 def upload():
     # For GET requests, always explicitly query the latest uploads
     if request.method == 'GET':
-        # Force database query to get fresh data, regardless of session state
+        # Force database query to get fresh data, regardless of session state;
+        # later pages are fetched by upload.js
         if current_user and hasattr(current_user, 'id'):
-            recent_uploads = UploadedText.query.filter_by(user_id=current_user.id).order_by(UploadedText.created_at.desc()).all()
+            recent_uploads, next_cursor = _upload_page(current_user.id)
         else:
-            recent_uploads = []
+            recent_uploads, next_cursor = [], None
             
-        return render_template('upload.html', uploads=recent_uploads)
+        return render_template('upload.html', uploads=recent_uploads, next_cursor=next_cursor)
     
     # From here on, we're handling POST requests
     try:
@@ -49,51 +276,31 @@ def upload():
                     flash('Only .txt files are supported!', 'danger')
                     return redirect(url_for('upload.upload'))
                 
-                # Read and process the file content
+                # Stream the file to storage and create the UploadedText entry
                 try:
-                    file_content = file.read().decode('utf-8')
+                    new_upload, stored = _create_file_upload(file, title or secure_filename(file.filename))
                 except UnicodeDecodeError:
                     flash('File encoding not supported. Please use UTF-8 encoded text files.', 'danger')
                     return redirect(url_for('upload.upload'))
                 
-                if len(file_content.strip()) == 0:
+                if new_upload is None:
                     flash('Uploaded file is empty!', 'danger')
                     return redirect(url_for('upload.upload'))
-                  # Create the UploadedText entry
-                new_upload = UploadedText(
-                    user_id=current_user.id,
-                    title=title or secure_filename(file.filename),
-                    content=file_content,
-                    filename=secure_filename(file.filename),
-                    file_type='file'
-                )
-                
-                db.session.add(new_upload)
-                db.session.commit()
                 
-                # Perform sentiment analysis
-                sentiment_data = get_sentiment_summary(file_content)
-                
-                # Perform N-gram analysis
-                ngram_data = get_multiple_ngrams(file_content)
-                
-                # Perform NER analysis
-                ner_data = perform_ner_analysis(file_content)
+                try:
+                    db.session.add(new_upload)
+                    db.session.commit()
+                except Exception:
+                    stored.delete()
+                    raise
                 
-                # Perform word frequency analysis
-                word_freq_data = analyze_word_frequency(file_content)
+                # Queue sentiment, N-gram, NER and word frequency analysis in the background
+                job = analysis_jobs.enqueue(new_upload)
                 
-                # Store data in session for visualization page - using a reference approach
-                session['sentiment_data'] = sentiment_data
-                session['ngram_data'] = ngram_data
-                session['ner_data'] = ner_data
-                session['word_freq_data'] = word_freq_data
-                session['upload_id'] = new_upload.id
-                # Store text preview in session but keep it minimal - we'll get full text from database
-                session['text_content'] = file_content[:500] + "..." if len(file_content) > 500 else file_content                # Flash success message and redirect to analyze page
-                flash('File uploaded and analyzed successfully!', 'success')
-                # Redirecting to analyze will then redirect to a unique URL
-                return redirect(url_for('main.analyze'))
+                # Flash success message and redirect to the job page, which
+                # forwards to the unique analysis URL once the job is done
+                flash('File uploaded successfully! Analysis is running...', 'success')
+                return redirect(url_for('main.analysis_job', job_id=job.id))
             else:
                 flash('No file selected!', 'warning')
             
@@ -112,28 +319,12 @@ def upload():
                 db.session.add(new_upload)
                 db.session.commit()
                 
-                # Perform sentiment analysis
-                sentiment_data = get_sentiment_summary(text_content)
-                
-                # Perform N-gram analysis
-                ngram_data = get_multiple_ngrams(text_content)
-                
-                # Perform NER analysis
-                ner_data = perform_ner_analysis(text_content)
-                  # Perform word frequency analysis
-                word_freq_data = analyze_word_frequency(text_content)
+                # Queue sentiment, N-gram, NER and word frequency analysis in the background
+                job = analysis_jobs.enqueue(new_upload)
                 
-                # Store data in session for visualization page - using a reference approach
-                session['sentiment_data'] = sentiment_data
-                session['ngram_data'] = ngram_data
-                session['ner_data'] = ner_data
-                session['word_freq_data'] = word_freq_data
-                session['upload_id'] = new_upload.id
-                # Store text preview in session but keep it minimal - we'll get full text from database
-                session['text_content'] = text_content[:500] + "..." if len(text_content) > 500 else text_content
-                  # Flash success message and redirect to analyze page
-                flash('Text content uploaded and analyzed successfully!', 'success')
-                return redirect(url_for('main.analyze'))
+                # Flash success message and redirect to the job page
+                flash('Text content uploaded successfully! Analysis is running...', 'success')
+                return redirect(url_for('main.analysis_job', job_id=job.id))
             else:
                 flash('No content provided!', 'danger')
         
@@ -188,21 +379,16 @@ def upload_text():
         db.session.add(new_upload)
         db.session.commit()
         
-        # Perform text analysis
-        sentiment_data = get_sentiment_summary(content)
-        ngram_data = get_multiple_ngrams(content)
-        ner_data = perform_ner_analysis(content)
-        word_freq_data = analyze_word_frequency(content)
+        # Queue text analysis and return right away
+        job = analysis_jobs.enqueue(new_upload)
         
         return jsonify({
             'success': True,
-            'message': 'Content uploaded successfully!',
-            'sentiment_data': sentiment_data,
-            'ngram_data': ngram_data,
-            'ner_data': ner_data,
-            'word_freq_data': word_freq_data,
-            'upload_id': new_upload.id
-        })
+            'message': 'Content uploaded successfully! Analysis is running.',
+            'upload_id': new_upload.id,
+            'job_id': job.id,
+            'status_url': url_for('upload.job_status', job_id=job.id)
+        }), 202
         
     except Exception as e:
         db.session.rollback()
@@ -225,39 +411,32 @@ def upload_file():
             return jsonify({'error': 'Only .txt files are allowed'}), 400
         
         try:
-            file_content = file.read().decode('utf-8')
+            new_upload, stored = _create_file_upload(file)
         except UnicodeDecodeError:
             return jsonify({'error': 'File encoding not supported. Please use UTF-8 encoded text files.'}), 400
             
-        if len(file_content.strip()) == 0:
+        if new_upload is None:
             return jsonify({'error': 'File is empty'}), 400
-            
-        new_upload = UploadedText(
-            user_id=current_user.id,
-            content=file_content,
-            filename=secure_filename(file.filename),
-            file_type='file'
-        )
         
-        db.session.add(new_upload)
-        db.session.commit()
+        try:
+            db.session.add(new_upload)
+            db.session.commit()
+        except Exception:
+            stored.delete()
+            raise
         
-        # Perform text analysis
-        sentiment_data = get_sentiment_summary(file_content)
-        ngram_data = get_multiple_ngrams(file_content)
-        ner_data = perform_ner_analysis(file_content)
-        word_freq_data = analyze_word_frequency(file_content)
+        # Queue text analysis and return right away
+        job = analysis_jobs.enqueue(new_upload)
         
         return jsonify({
             'success': True,
-            'message': 'File uploaded successfully',
+            'message': 'File uploaded successfully. Analysis is running.',
             'upload_id': new_upload.id,
-            'sentiment_data': sentiment_data,
-            'ngram_data': ngram_data,
-            'ner_data': ner_data,
-            'word_freq_data': word_freq_data,
-            'content': file_content  # Storing full content without truncation
-        }), 200
+            'job_id': job.id,
+            'status_url': url_for('upload.job_status', job_id=job.id),
+            # Full content for inline uploads, the beginning of stored ones
+            'content': new_upload.content if not new_upload.is_stored else stored.preview
+        }), 202
         
     except Exception as e:
         db.session.rollback()
@@ -265,24 +444,151 @@ def upload_file():
         current_app.logger.error(f"File upload error: {str(e)}\n{error_details}")
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
 
+@upload_bp.route('/batch', methods=['POST'])
+@login_required
+def upload_batch():
+    """
+    Upload several .txt files and/or .zip archives of .txt files at once.
+    
+    All the texts are inserted together and their analyses are queued as one
+    batch, which the job workers run in parallel; poll status_url for the
+    progress and url_path of each file. Files that cannot be uploaded are
+    reported in the response and do not stop the rest of the batch.
+    
+    Form fields:
+        files: The files (several 'files' or 'file' fields)
+    
+    Limits:
+        UPLOAD_BATCH_MAX_FILES texts and UPLOAD_BATCH_MAX_BYTES of text in total
+    """
+    files = request.files.getlist('files') or request.files.getlist('file')
+    files = [file for file in files if file and file.filename]
+    if not files:
+        return jsonify({'error': 'No file selected'}), 400
+    
+    max_files = current_app.config['UPLOAD_BATCH_MAX_FILES']
+    max_bytes = current_app.config['UPLOAD_BATCH_MAX_BYTES']
+    results = []
+    uploads = []
+    stored_files = []
+    total_bytes = 0
+    try:
+        for name, size, open_entry, error in _batch_entries(files):
+            result = {'filename': name}
+            results.append(result)
+            if error is None and len(uploads) >= max_files:
+                error = f'A batch can contain at most {max_files} files'
+            if error is None and size is not None and total_bytes + size > max_bytes:
+                error = 'Batch is too large'
+            if error is None:
+                try:
+                    with open_entry() as stream:
+                        filename = secure_filename(name.rsplit('/', 1)[-1])
+                        new_upload, stored = _create_stream_upload(stream, filename, filename, size)
+                except UnicodeDecodeError:
+                    error = 'File encoding not supported. Please use UTF-8 encoded text files.'
+                except (zipfile.BadZipFile, EOFError, OSError) as e:
+                    error = f'Could not read file: {str(e)}'
+                else:
+                    if stored is not None:
+                        stored_files.append(stored)
+                    if new_upload is None:
+                        error = 'File is empty'
+                    elif total_bytes + new_upload.content_size > max_bytes:
+                        error = 'Batch is too large'
+                    else:
+                        total_bytes += new_upload.content_size
+                        uploads.append((result, new_upload))
+            if error is not None:
+                result.update(status='skipped', error=error)
+        
+        if not uploads:
+            for stored in stored_files:
+                stored.delete()
+            return jsonify({'success': False, 'error': 'No text files could be uploaded', 'files': results}), 400
+        
+        # One flush inserts all the texts (batched into multi-row INSERTs)
+        try:
+            db.session.add_all([new_upload for _, new_upload in uploads])
+            db.session.commit()
+        except Exception:
+            for stored in stored_files:
+                stored.delete()
+            raise
+        
+        # Remove storage files of skipped texts
+        kept = {new_upload.content_path for _, new_upload in uploads if new_upload.is_stored}
+        for stored in stored_files:
+            if stored.path not in kept:
+                stored.delete()
+        
+        batch_id, jobs = analysis_jobs.enqueue_many([new_upload for _, new_upload in uploads])
+        for (result, new_upload), job in zip(uploads, jobs):
+            result.update(status=job.status, upload_id=new_upload.id, job_id=job.id, url_path=job.url_path)
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(jobs)} files uploaded. Analysis is running.',
+            'batch_id': batch_id,
+            'status_url': url_for('upload.batch_status', batch_id=batch_id),
+            'files': results
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        error_details = traceback.format_exc()
+        current_app.logger.error(f"Batch upload error: {str(e)}\n{error_details}")
+        return jsonify({'error': f'An error occurred: {str(e)}'}), 500
+
+@upload_bp.route('/batch/<string:batch_id>', methods=['GET'])
+@login_required
+def batch_status(batch_id):
+    """Report the progress of a batch upload: the state and url_path of each file's job."""
+    jobs = AnalysisJob.query.options(
+        joinedload(AnalysisJob.analysis).load_only(AnalysisResult.url_path),
+        joinedload(AnalysisJob.upload).load_only(UploadedText.filename)
+    ).filter_by(batch_id=batch_id, user_id=current_user.id).order_by(AnalysisJob.upload_id).all()
+    
+    if not jobs:
+        return jsonify({
+            'success': False,
+            'error': 'Batch not found'
+        }), 404
+    
+    counts = {status: 0 for status in (AnalysisJob.QUEUED, AnalysisJob.RUNNING, AnalysisJob.DONE, AnalysisJob.FAILED)}
+    for job in jobs:
+        counts[job.status] += 1
+    
+    return jsonify({
+        'success': True,
+        'batch_id': batch_id,
+        'counts': counts,
+        'finished': counts[AnalysisJob.DONE] + counts[AnalysisJob.FAILED] == len(jobs),
+        'jobs': [dict(job.to_dict(), filename=job.upload.filename) for job in jobs]
+    }), 200
+
 @upload_bp.route('/list', methods=['GET'])
 @login_required
 def list_uploads():
-    """Get list of user's uploads."""
+    """Get a page of the user's uploads (see get_upload_history for parameters)."""
+    try:
+        uploads, next_cursor = _upload_page(current_user.id, **_page_args())
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
     try:
-        uploads = UploadedText.query.filter_by(user_id=current_user.id).order_by(UploadedText.created_at.desc()).all()
-        
         upload_list = [{
-            'id': upload.id,
-            'filename': upload.filename,
-            'created_at': upload.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'preview': upload.content[:100] + '...' if len(upload.content) > 100 else upload.content,
-            'file_type': upload.file_type
+            'id': upload['id'],
+            'filename': upload['filename'],
+            'created_at': upload['created_at'].strftime('%Y-%m-%d %H:%M:%S'),
+            'preview': upload['preview'],
+            'file_type': upload['file_type']
         } for upload in uploads]
         
         return jsonify({
             'success': True,
-            'uploads': upload_list
+            'uploads': upload_list,
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -293,6 +599,16 @@ def list_uploads():
 @upload_bp.route('/history', methods=['GET'])
 @login_required
 def get_upload_history():
+    """
+    Get a page of the user's upload history, newest first.
+    
+    Query parameters:
+        limit: Uploads per page (default 50, at most 200)
+        cursor: next_cursor of the previous page, to load older uploads
+        since: cursor of the newest upload already shown, to load only newer ones.
+            The oldest of them come first; while next_cursor is set, request
+            again with it as since to get the rest
+    """
     try:
         # Check if current_user is authenticated and has an id
         if not current_user or not hasattr(current_user, 'id'):
@@ -301,48 +617,77 @@ def get_upload_history():
                 'success': False,
                 'error': 'Authentication required'
             }), 401
-            
-        uploads = UploadedText.query.filter_by(user_id=current_user.id).order_by(UploadedText.created_at.desc()).all()
         
-        # Import AnalysisResult to check for existing analyses
-        from app.models import AnalysisResult
+        try:
+            uploads, next_cursor = _upload_page(current_user.id, **_page_args())
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid cursor'
+            }), 400
         
-        uploads_list = []
-        for upload in uploads:
-            # Handle possible None values in content
-            content = upload.content or ""
-            preview = content[:100] + '...' if len(content) > 100 else content
-            
-            # Check if an analysis result exists for this upload
-            analysis = AnalysisResult.query.filter_by(upload_id=upload.id, owner_id=current_user.id).first()
-            analysis_url_path = None
-            if analysis and analysis.url_path:
-                analysis_url_path = analysis.url_path
-            
-            uploads_list.append({
-                'id': upload.id,
-                'title': getattr(upload, 'title', None) or 'Untitled',
-                'filename': getattr(upload, 'filename', None) or 'text_input.txt',
-                'created_at': upload.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'preview': preview,
-                'file_type': getattr(upload, 'file_type', 'text'),
-                'analysis_url_path': analysis_url_path
-            })
+        uploads_list = [{
+            'id': upload['id'],
+            'title': upload['title'] or 'Untitled',
+            'filename': upload['filename'] or 'text_input.txt',
+            'created_at': upload['created_at'].strftime('%Y-%m-%d %H:%M:%S'),
+            'preview': upload['preview'],
+            'file_type': upload['file_type'] or 'text',
+            'analysis_url_path': upload['analysis_url_path'],
+            'cursor': upload['cursor']
+        } for upload in uploads]
         
         return jsonify({
             'success': True,
-            'uploads': uploads_list
+            'uploads': uploads_list,
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
         current_app.logger.error(f"Error in upload history: {str(e)}")
-        import traceback
         current_app.logger.error(traceback.format_exc())
         return jsonify({
             'success': False,
             'error': f'Could not retrieve upload history: {str(e)}'
         }), 500
 
+@upload_bp.route('/search', methods=['GET'])
+@login_required
+def search_uploads():
+    """
+    Full-text search over the user's uploads and analysis results, best matches first.
+    
+    Query parameters:
+        q: Words to search for (all must match; end a word with * to match prefixes)
+        limit: Hits per page (default 20, at most 100)
+        cursor: next_cursor of the previous page
+    
+    Each hit has a snippet of the matching text with the [start, end)
+    character offsets of the matched terms in snippet_highlights (and in
+    title_highlights for the title).
+    """
+    limit = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+    try:
+        hits, next_cursor = search_documents(
+            current_user.id,
+            request.args.get('q', ''),
+            cursor=request.args.get('cursor') or None,
+            limit=max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+        )
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+    except SearchUnavailable as e:
+        return jsonify({'success': False, 'error': str(e)}), 501
+    
+    for hit in hits:
+        hit['created_at'] = hit['created_at'].strftime('%Y-%m-%d %H:%M:%S') if hit['created_at'] else None
+    
+    return jsonify({
+        'success': True,
+        'results': hits,
+        'next_cursor': next_cursor
+    })
+
 @upload_bp.route('/view/<int:upload_id>', methods=['GET'])
 @login_required
 def view_upload(upload_id):
@@ -365,39 +710,143 @@ def view_upload(upload_id):
             # If analysis exists with URL path, redirect directly to it
             return redirect(url_for('main.analyze', url_path=existing_analysis.url_path))
         
-        # Otherwise, set up session variables and go through the regular analyze flow
-        # Retrieve content and set it in the session
-        content = upload.content
-        
-        # Perform sentiment analysis
-        sentiment_data = get_sentiment_summary(content)
-        
-        # Perform N-gram analysis
-        ngram_data = get_multiple_ngrams(content)
-        
-        # Perform NER analysis
-        ner_data = perform_ner_analysis(content)
+        # Reuse a job that is still queued or running for this upload
+        pending_job = AnalysisJob.query.filter(
+            AnalysisJob.upload_id == upload_id,
+            AnalysisJob.status.in_([AnalysisJob.QUEUED, AnalysisJob.RUNNING])
+        ).first()
         
-        # Perform word frequency analysis
-        word_freq_data = analyze_word_frequency(content)
+        # Otherwise queue a new analysis job
+        job = pending_job or analysis_jobs.enqueue(upload)
         
-        # Store data in session for visualization page
-        session['sentiment_data'] = sentiment_data
-        session['ngram_data'] = ngram_data
-        session['ner_data'] = ner_data
-        session['word_freq_data'] = word_freq_data
-        session['upload_id'] = upload.id
-        session['text_content'] = content[:500] + "..." if len(content) > 500 else content
-          # Flash a message to the user
+        # Flash a message to the user
         flash('Content loaded for analysis', 'success')
         
-        # Redirect to the analysis page (which will create a URL and redirect again)
-        return redirect(url_for('main.analyze'))
+        # Redirect to the job page (which forwards to the analysis URL when ready)
+        return redirect(url_for('main.analysis_job', job_id=job.id))
         
     except Exception as e:
         current_app.logger.error(f"Error viewing upload: {str(e)}")
         return render_template('error.html', message=f"An error occurred: {str(e)}"), 500
 
+@upload_bp.route('/jobs/<string:job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    """Report the state of an analysis job (queued, running, done or failed)."""
+    job = db.session.get(AnalysisJob, job_id)
+    
+    # Security check - users can only see their own jobs
+    if job is None or job.user_id != current_user.id:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    }), 200
+
+@upload_bp.route('/analysis-cache/stats', methods=['GET'])
+@login_required
+@stats_route
+def analysis_cache_stats():
+    """Report hit/miss counters and size of the stored analyzer outputs."""
+    return jsonify({
+        'success': True,
+        'stats': analysis_store.stats(current_app)
+    }), 200
+
+@upload_bp.route('/news-cache/stats', methods=['GET'])
+@login_required
+@stats_route
+def news_cache_stats():
+    """Report hit/miss counters of the news API response cache and the article store."""
+    return jsonify({
+        'success': True,
+        'stats': {
+            'responses': news_responses.stats(current_app),
+            'articles': article_store.stats(current_app)
+        }
+    }), 200
+
+@upload_bp.route('/news-providers/stats', methods=['GET'])
+@login_required
+@stats_route
+def news_provider_stats():
+    """Report the circuit breaker state of each configured news provider."""
+    return jsonify({
+        'success': True,
+        'providers': news_providers.stats(current_app)
+    }), 200
+
+@upload_bp.route('/news-corpus', methods=['GET'])
+@login_required
+def news_corpus():
+    """List the newest articles of the pre-analyzed news corpus, optionally of one category."""
+    limit = min(request.args.get('limit', 20, type=int) or 20, 100)
+    query = NewsArticle.query
+    category = request.args.get('category')
+    if category:
+        query = query.filter(NewsArticle.category == category)
+    articles = query.order_by(NewsArticle.ingested_at.desc(), NewsArticle.id.desc()).limit(limit).all()
+    last_run = current_app.extensions['news_ingestor']['last_run']
+    return jsonify({
+        'success': True,
+        'articles': [_corpus_article(article) for article in articles],
+        'last_run': last_run.strftime('%Y-%m-%d %H:%M:%S') if last_run else None
+    }), 200
+
+@upload_bp.route('/news-corpus/<int:article_id>/import', methods=['POST'])
+@login_required
+def import_news_article(article_id):
+    """Add a corpus article to the user's uploads, with its analysis if it was pre-analyzed."""
+    article = db.session.get(NewsArticle, article_id)
+    if article is None:
+        return jsonify({'success': False, 'error': 'Article not found'}), 404
+    try:
+        upload, result = news_ingestor.import_article(article, current_user.id)
+        if result is not None:
+            return jsonify({
+                'success': True,
+                'message': 'Article imported and analyzed.',
+                'upload_id': upload.id,
+                'url_path': result.url_path,
+                'analysis_url': url_for('main.analyze', url_path=result.url_path)
+            }), 201
+
+        # Not analyzed yet (or the outputs were evicted): analyze it like any upload
+        job = analysis_jobs.enqueue(upload)
+        return jsonify({
+            'success': True,
+            'message': 'Article imported. Analysis is running.',
+            'upload_id': upload.id,
+            'job_id': job.id,
+            'status_url': url_for('upload.job_status', job_id=job.id),
+            'job_url': url_for('main.analysis_job', job_id=job.id)
+        }), 202
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"News import error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _corpus_article(article):
+    """A corpus article in the format of the news routes, with the URL that imports it"""
+    data = article.to_dict()
+    data['contentInsufficient'] = False
+    data['import_url'] = url_for('upload.import_news_article', article_id=article.id)
+    return data
+
+@upload_bp.route('/http-client/stats', methods=['GET'])
+@login_required
+@stats_route
+def http_client_stats():
+    """Report request counts, errors, retries and latency of outbound requests per host."""
+    return jsonify({
+        'success': True,
+        'hosts': http_client.stats(current_app)
+    }), 200
+
 @upload_bp.route('/delete/<int:upload_id>', methods=['DELETE'])
 @login_required
 def delete_upload(upload_id):
@@ -423,9 +872,12 @@ def delete_upload(upload_id):
                 'error': "You don't have permission to delete this upload"
             }), 403
         
-        # Delete the upload itself
+        # Delete the upload itself, then its stored file if it has one
+        content_path = upload.content_path
         db.session.delete(upload)
         db.session.commit()
+        if content_path:
+            delete_stored_text(content_path)
         
         return jsonify({
             'success': True,
@@ -449,12 +901,11 @@ def search_news():
         query = request.args.get('query', '')
         if not query:
             return jsonify({'error': 'No search query provided'}), 400
+        # Optionally attach a sentiment and top-entities summary to every result
+        analyze = request.args.get('analyze', 'false').lower() in ('1', 'true', 'yes')
             
-        # Using NewsAPI for real data
-        api_key = current_app.config.get('NEWS_API_KEY', '')
-        
-        # Check if we have a valid API key
-        if not api_key or api_key == 'your-news-api-key-here':
+        # Check that at least one news provider has an API key
+        if not news_providers.configured(current_app):
             return jsonify({
                 'success': False,
                 'error': 'No valid News API key configured. Please add your News API key to the configuration or environment variables.',
@@ -465,24 +916,19 @@ def search_news():
         current_date = datetime.now()
         from_date = (current_date - timedelta(days=7)).strftime('%Y-%m-%d')
         
-        # Make request to News API
-        url = f'https://newsapi.org/v2/everything'
-        params = {
-            'q': query,
-            'from': from_date,
-            'sortBy': 'relevancy',
-            'language': 'en',
-            'apiKey': api_key,
-            'pageSize': 10  # Limit to 10 results
-        }
-        
-        response = requests.get(url, params=params)
-        data = response.json()
+        # Ask the news providers, limited to 10 results
+        data = news_providers.search(query, from_date, limit=10)
         
-        if response.status_code == 200 and data.get('articles'):
+        if data['articles']:
+            # Get the full text of all truncated articles at once
+            full_texts = article_fetcher.fetch_articles(
+                article.get('url') for article in data['articles']
+                if needs_full_content(article.get('content', ''))
+            )
+            
             # Format the results
             articles = []
-            for article in data.get('articles', []):
+            for article in data['articles']:
                 # Make sure we don't have future dates
                 publish_date = article.get('publishedAt', '')
                 try:
@@ -496,57 +942,11 @@ def search_news():
                 # Get full content
                 content = article.get('content', '')
                 
-                # If content is truncated, try to fetch full article if URL exists
+                # If content is truncated, use the full article fetched above
                 url = article.get('url')
-                if url and (not content or len(content) < 500 or '[+' in content):
-                    try:
-                        full_article = requests.get(url, timeout=5)  # Increased timeout for better reliability
-                        if full_article.status_code == 200:
-                            # Extract article content - improved approach for better content extraction
-                            from bs4 import BeautifulSoup
-                            soup = BeautifulSoup(full_article.text, 'html.parser')
-                            
-                            # Try multiple approaches to find article content
-                            article_content = None
-                            
-                            # Check for common article containers
-                            selectors = [
-                                'article', '.article-content', '.story-body', '.entry-content',
-                                '.article-body', '.story-content', '.post-content', '.news-content',
-                                '[itemprop="articleBody"]', '[property="content:encoded"]',
-                                '.main-content', '.blog-post-content', '.node-content'
-                            ]
-                            
-                            for selector in selectors:
-                                if selector.startswith('.'):
-                                    article_content = soup.find(class_=selector[1:])
-                                elif selector.startswith('['):
-                                    # Extract attribute name and value
-                                    attr = selector[1:-1].split('=')
-                                    if len(attr) == 2:
-                                        attr_name = attr[0]
-                                        attr_value = attr[1].strip('"\'')
-                                        article_content = soup.find(attrs={attr_name: attr_value})
-                                else:
-                                    article_content = soup.find(selector)
-                                    
-                                if article_content:
-                                    break
-                            
-                            # If no specific content container found, use the main content area
-                            if not article_content:
-                                article_content = soup.find('main') or soup.find(id='main') or soup.find('body')
-                            
-                            if article_content:
-                                # Get all paragraphs and combine
-                                paragraphs = article_content.find_all('p')
-                                full_content = '\n\n'.join([p.text.strip() for p in paragraphs if len(p.text.strip()) > 20])
-                                
-                                if full_content and len(full_content) > 100:
-                                    content = full_content
-                                    current_app.logger.info(f"Successfully extracted full content: {len(content)} chars")
-                    except Exception as e:
-                        current_app.logger.error(f"Error fetching full article: {str(e)}")
+                if url and needs_full_content(content) and full_texts.get(url):
+                    content = full_texts[url]
+                    current_app.logger.info(f"Using full content: {len(content)} chars")
                 
                 # Ensure we have substantial content
                 if not content or len(content.strip()) < 225:
@@ -567,17 +967,31 @@ def search_news():
                     'description': article.get('description', ''),
                     'content': content,
                     'urlToImage': article.get('urlToImage', ''),
-                    'contentInsufficient': article.get('contentInsufficient', False)
+                    'contentInsufficient': article.get('contentInsufficient', False),
+                    'provider': article.get('provider')
                 })
+            
+            if analyze:
+                # Analyze all results together; the ones not done within
+                # ANALYSIS_BATCH_TIMEOUT get an empty summary
+                analyzable = [article for article in articles if not article['contentInsufficient']]
+                outputs = analysis_store.analyze_many(
+                    current_app, [article['content'] for article in analyzable], SUMMARY_ANALYZERS
+                )
+                for article in articles:
+                    article['analysis'] = None
+                for article, analysis_data in zip(analyzable, outputs):
+                    article['analysis'] = summarize_analysis(analysis_data)
                 
             return jsonify({
                 'success': True,
-                'articles': articles
+                'articles': articles,
+                'providers': data['providers']
             })
         else:
             # If API request failed, return error with more details
-            error_message = data.get('message', 'Unknown error')
-            current_app.logger.error(f"NewsAPI error: {error_message}")
+            error_message = '; '.join(f'{name}: {error}' for name, error in data['errors'].items()) or 'No articles found'
+            current_app.logger.error(f"News API error: {error_message}")
             return jsonify({
                 'success': False,
                 'error': f"News API error: {error_message}",
@@ -600,42 +1014,38 @@ def latest_news():
         # Get optional category parameter
         category = request.args.get('category', 'general')
         
-        # Using NewsAPI for real data
-        api_key = current_app.config.get('NEWS_API_KEY', '')
+        # Serve the pre-analyzed corpus while ingestion keeps it fresh
+        corpus = news_ingestor.latest(current_app, category, limit=3)
+        if corpus:
+            return jsonify({
+                'success': True,
+                'articles': [_corpus_article(article) for article in corpus],
+                'providers': ['corpus']
+            })
+        
         current_date = datetime.now()
         
-        # Check if we have a valid API key
-        if not api_key or api_key == 'your-news-api-key-here':
+        # Check that at least one news provider has an API key
+        if not news_providers.configured(current_app):
             return jsonify({
                 'success': False,
                 'error': 'No valid News API key configured. Please add your News API key to the configuration or environment variables.',
                 'articles': []
             })
         
-        # Make request to News API
-        if category == 'general':
-            url = f'https://newsapi.org/v2/top-headlines'
-            params = {
-                'country': 'us',
-                'apiKey': api_key,
-                'pageSize': 3  # Limit to 3 results as requested
-            }
-        else:
-            url = f'https://newsapi.org/v2/top-headlines'
-            params = {
-                'category': category,
-                'country': 'us',
-                'apiKey': api_key,
-                'pageSize': 3  # Limit to 3 results as requested
-            }
-        
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if response.status_code == 200 and data.get('articles'):
+        # Ask the news providers, limited to 3 results as requested
+        data = news_providers.top_headlines(category, current_date.strftime('%Y-%m-%d'), limit=3)
+        
+        if data['articles']:
+            # Get the full text of all truncated articles at once
+            full_texts = article_fetcher.fetch_articles(
+                article.get('url') for article in data['articles'][:3]
+                if needs_full_content(article.get('content', ''))
+            )
+            
             # Format the results
             articles = []
-            for article in data.get('articles', [])[:3]:  # Double ensure we only get 3
+            for article in data['articles'][:3]:  # Double ensure we only get 3
                 # Make sure we don't have future dates
                 publish_date = article.get('publishedAt', '')
                 try:
@@ -649,57 +1059,11 @@ def latest_news():
                 # Get full content
                 content = article.get('content', '')
                 
-                # If content is truncated, try to fetch full article if URL exists
+                # If content is truncated, use the full article fetched above
                 url = article.get('url')
-                if url and (not content or len(content) < 500 or '[+' in content):
-                    try:
-                        full_article = requests.get(url, timeout=5)  # Increased timeout for better reliability
-                        if full_article.status_code == 200:
-                            # Extract article content - improved approach for better content extraction
-                            from bs4 import BeautifulSoup
-                            soup = BeautifulSoup(full_article.text, 'html.parser')
-                            
-                            # Try multiple approaches to find article content
-                            article_content = None
-                            
-                            # Check for common article containers
-                            selectors = [
-                                'article', '.article-content', '.story-body', '.entry-content',
-                                '.article-body', '.story-content', '.post-content', '.news-content',
-                                '[itemprop="articleBody"]', '[property="content:encoded"]',
-                                '.main-content', '.blog-post-content', '.node-content'
-                            ]
-                            
-                            for selector in selectors:
-                                if selector.startswith('.'):
-                                    article_content = soup.find(class_=selector[1:])
-                                elif selector.startswith('['):
-                                    # Extract attribute name and value
-                                    attr = selector[1:-1].split('=')
-                                    if len(attr) == 2:
-                                        attr_name = attr[0]
-                                        attr_value = attr[1].strip('"\'')
-                                        article_content = soup.find(attrs={attr_name: attr_value})
-                                else:
-                                    article_content = soup.find(selector)
-                                    
-                                if article_content:
-                                    break
-                            
-                            # If no specific content container found, use the main content area
-                            if not article_content:
-                                article_content = soup.find('main') or soup.find(id='main') or soup.find('body')
-                            
-                            if article_content:
-                                # Get all paragraphs and combine
-                                paragraphs = article_content.find_all('p')
-                                full_content = '\n\n'.join([p.text.strip() for p in paragraphs if len(p.text.strip()) > 20])
-                                
-                                if full_content and len(full_content) > 100:
-                                    content = full_content
-                                    current_app.logger.info(f"Successfully extracted full content: {len(content)} chars")
-                    except Exception as e:
-                        current_app.logger.error(f"Error fetching full article: {str(e)}")
+                if url and needs_full_content(content) and full_texts.get(url):
+                    content = full_texts[url]
+                    current_app.logger.info(f"Using full content: {len(content)} chars")
                   # Ensure we have substantial content
                 if not content or len(content.strip()) < 225:
                     # Instead of trying to create a fallback, report that content extraction failed
@@ -719,17 +1083,19 @@ def latest_news():
                     'description': article.get('description', ''),
                     'content': content,
                     'urlToImage': article.get('urlToImage', ''),
-                    'contentInsufficient': article.get('contentInsufficient', False)
+                    'contentInsufficient': article.get('contentInsufficient', False),
+                    'provider': article.get('provider')
                 })
                 
             return jsonify({
                 'success': True,
-                'articles': articles
+                'articles': articles,
+                'providers': data['providers']
             })
         else:
             # If API request failed, return error with more details
-            error_message = data.get('message', 'Unknown error')
-            current_app.logger.error(f"NewsAPI error: {error_message}")
+            error_message = '; '.join(f'{name}: {error}' for name, error in data['errors'].items()) or 'No articles found'
+            current_app.logger.error(f"News API error: {error_message}")
             return jsonify({
                 'success': False,
                 'error': f"News API error: {error_message}",
@@ -33,7 +33,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Show the file name when selected - UX 101
     if (fileInput && selectedFileName) {
         fileInput.addEventListener('change', function() {
-            if (this.files && this.files[0]) {
+            if (this.files && this.files.length > 1) {
+                selectedFileName.textContent = `${this.files.length} files selected`;
+            } else if (this.files && this.files[0]) {
                 selectedFileName.textContent = this.files[0].name;
             } else {
                 selectedFileName.textContent = 'No file selected';
@@ -72,6 +74,13 @@ document.addEventListener('DOMContentLoaded', function() {
             
             console.log('File selected:', fileInput.files[0].name);
             
+            // Several files or a zip archive go to the batch endpoint, without leaving the page
+            if (isBatchUpload(fileInput.files)) {
+                e.preventDefault();
+                uploadBatch(fileUploadForm, fileInput, analyzeFileBtn);
+                return false;
+            }
+            
             // Show that something's happening - users hate waiting with no feedback
             const originalBtnText = analyzeFileBtn.textContent;
             analyzeFileBtn.disabled = true;
@@ -129,6 +138,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const uploadArticleTitle = document.getElementById('uploadArticleTitle');
     const uploadArticleContent = document.getElementById('uploadArticleContent');
     const searchResultsPlaceholder = document.querySelector('.search-results-placeholder');
+    // Pre-analyzed corpus articles are imported by id rather than uploaded
+    let selectedImportUrl = null;
 
     // Handle news search
     if (searchNewsBtn && newsSearchQuery) {
@@ -156,7 +167,10 @@ document.addEventListener('DOMContentLoaded', function() {
             if (selectedArticlePreview) selectedArticlePreview.classList.add('d-none');
 
             // Make API request to search for news
-            fetch(`/upload/search-news?query=${encodeURIComponent(query)}`)
+            // Optionally have every result analyzed in the same request
+            const analyzeResults = document.getElementById('newsSearchAnalyze');
+            const analyzeParam = analyzeResults && analyzeResults.checked ? '&analyze=1' : '';
+            fetch(`/upload/search-news?query=${encodeURIComponent(query)}${analyzeParam}`)
                 .then(response => response.json())
                 .then(data => {
                     // Hide spinner
@@ -310,6 +324,24 @@ document.addEventListener('DOMContentLoaded', function() {
                 <small class="text-muted">Source: ${article.source}</small>
             `;
             
+            // Sentiment and top entities, when the results were analyzed
+            if (article.analysis && article.analysis.sentiment) {
+                const summary = document.createElement('div');
+                summary.className = 'mt-1';
+                const badge = document.createElement('span');
+                const colours = {Positive: 'bg-success', Negative: 'bg-danger'};
+                badge.className = `badge ${colours[article.analysis.sentiment] || 'bg-secondary'} me-2`;
+                badge.textContent = `${article.analysis.sentiment} (${article.analysis.compound_score.toFixed(2)})`;
+                summary.appendChild(badge);
+                if (article.analysis.top_entities && article.analysis.top_entities.length > 0) {
+                    const entities = document.createElement('small');
+                    entities.className = 'text-muted';
+                    entities.textContent = article.analysis.top_entities.map(entity => entity.text).join(', ');
+                    summary.appendChild(entities);
+                }
+                resultItem.appendChild(summary);
+            }
+            
             // Add click handler to select this article
             resultItem.addEventListener('click', function() {
                 selectArticle(article);
@@ -354,6 +386,7 @@ document.addEventListener('DOMContentLoaded', function() {
         // Set the values for the upload form with full content
         if (uploadArticleTitle) uploadArticleTitle.value = article.title;
         if (uploadArticleContent) uploadArticleContent.value = articleContent;
+        selectedImportUrl = article.import_url || null;
         
         // Update word count if we have a word count element
         if (wordCount) {
@@ -398,6 +431,34 @@ document.addEventListener('DOMContentLoaded', function() {
             
             // Disable submit button to prevent double-submission
             const submitBtn = this.querySelector('button[type="submit"]');
+            
+            // Corpus articles are already analyzed: import and go straight to the analysis
+            if (selectedImportUrl) {
+                e.preventDefault();
+                if (submitBtn) {
+                    submitBtn.disabled = true;
+                    submitBtn.textContent = 'Importing...';
+                }
+                fetch(selectedImportUrl, {
+                    method: 'POST',
+                    headers: {
+                        'X-CSRFToken': document.querySelector('meta[name="csrf-token"]').getAttribute('content')
+                    }
+                })
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) throw new Error(data.error || 'Import failed');
+                    window.location.href = data.analysis_url || data.job_url;
+                })
+                .catch(error => {
+                    console.error('Import error:', error);
+                    // Fall back to uploading the text
+                    selectedImportUrl = null;
+                    articleUploadForm.submit();
+                });
+                return false;
+            }
+            
             if (submitBtn) {
                 submitBtn.disabled = true;
                 submitBtn.textContent = 'Uploading & Analyzing...';
@@ -417,9 +478,123 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Load history on page load - keeps things fresh after login/logout
     loadUploadHistory();
+
+    // Older uploads are fetched a page at a time
+    const loadMoreBtn = document.getElementById('loadMoreUploadsBtn');
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', loadMoreUploadHistory);
+    }
+});
+
+// Coming back to the page from the browser cache only fetches the new uploads
+window.addEventListener('pageshow', function(event) {
+    if (event.persisted) {
+        refreshUploadHistory();
+    }
 });
 
-// Function to load upload history
+// Paging state of the history table - cursors come from the server
+const uploadHistory = {
+    newestCursor: null,  // cursor of the newest upload shown, for loading new ones
+    nextCursor: null     // cursor of the next (older) page, null when all are shown
+};
+
+// Function to load upload history - fetches the first page only
+// Batch uploads: several .txt files or .zip archives, analyzed in parallel on the server
+const BATCH_POLL_INTERVAL = 2000;
+
+function isBatchUpload(files) {
+    return files.length > 1 || Array.from(files).some(file => file.name.toLowerCase().endsWith('.zip'));
+}
+
+function uploadBatch(form, fileInput, submitBtn) {
+    const progress = document.getElementById('batchProgress');
+    const formData = new FormData(form);
+    const originalBtnText = submitBtn.textContent;
+    submitBtn.disabled = true;
+    submitBtn.textContent = 'Uploading...';
+    
+    fetch(fileInput.dataset.batchUrl, {
+        method: 'POST',
+        body: formData,
+        credentials: 'same-origin'
+    })
+    .then(response => response.json())
+    .then(data => {
+        renderBatchProgress(progress, data.files || []);
+        if (!data.success) {
+            throw new Error(data.error || 'Upload failed');
+        }
+        pollBatch(data.status_url, progress, data.files);
+    })
+    .catch(error => {
+        console.error('Batch upload error:', error);
+        alert(`Batch upload failed: ${error.message}`);
+    })
+    .finally(() => {
+        submitBtn.disabled = false;
+        submitBtn.textContent = originalBtnText;
+    });
+}
+
+function pollBatch(statusUrl, progress, files) {
+    fetch(statusUrl, { credentials: 'same-origin' })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            throw new Error(data.error || 'Could not load batch progress');
+        }
+        // Merge job states into the uploaded files; skipped files keep their error
+        const jobs = new Map(data.jobs.map(job => [job.id, job]));
+        files.forEach(file => {
+            const job = jobs.get(file.job_id);
+            if (job) {
+                Object.assign(file, { status: job.status, url_path: job.url_path, error: job.error });
+            }
+        });
+        renderBatchProgress(progress, files);
+        if (data.finished) {
+            refreshUploadHistory();
+        } else {
+            setTimeout(() => pollBatch(statusUrl, progress, files), BATCH_POLL_INTERVAL);
+        }
+    })
+    .catch(error => console.error('Batch progress error:', error));
+}
+
+function renderBatchProgress(progress, files) {
+    const badges = { queued: 'secondary', running: 'info', done: 'success', failed: 'danger', skipped: 'warning' };
+    progress.innerHTML = '';
+    files.forEach(file => {
+        const item = document.createElement('li');
+        item.className = 'list-group-item d-flex justify-content-between align-items-center';
+        
+        const name = document.createElement('span');
+        if (file.url_path) {
+            const link = document.createElement('a');
+            link.href = `/analysis/${file.url_path}`;
+            link.textContent = file.filename;
+            name.appendChild(link);
+        } else {
+            name.textContent = file.filename;
+        }
+        if (file.error) {
+            const error = document.createElement('small');
+            error.className = 'text-muted ms-2';
+            error.textContent = file.error;
+            name.appendChild(error);
+        }
+        
+        const badge = document.createElement('span');
+        badge.className = `badge bg-${badges[file.status] || 'secondary'}`;
+        badge.textContent = file.status;
+        
+        item.append(name, badge);
+        progress.appendChild(item);
+    });
+    progress.classList.toggle('d-none', files.length === 0);
+}
+
 function loadUploadHistory() {
     // Show loading spinner - so it doesn't look broken
     const loadingSpinner = document.getElementById('historyLoadingSpinner');
@@ -427,29 +602,131 @@ function loadUploadHistory() {
         loadingSpinner.style.display = 'block';
     }
 
-    fetch('/upload/history')
-        .then(response => response.json())
+    fetchUploadHistory({})
         .then(data => {
-            // Hide loading spinner
+            updateUploadHistoryTable(data.uploads);
+            uploadHistory.newestCursor = data.uploads.length ? data.uploads[0].cursor : null;
+            setNextCursor(data.next_cursor);
+        })
+        .catch(error => {
+            console.error('Error loading upload history:', error);
+        })
+        .finally(() => {
+            // Hide loading spinner either way
             if (loadingSpinner) {
                 loadingSpinner.style.display = 'none';
             }
+        });
+}
 
-            if (data.success && data.uploads) {
-                updateUploadHistoryTable(data.uploads);
-            } else {
-                console.error('Failed to load upload history:', data.error);
+// Append the next (older) page of uploads to the table
+function loadMoreUploadHistory() {
+    if (!uploadHistory.nextCursor) {
+        return;
+    }
+
+    fetchUploadHistory({ cursor: uploadHistory.nextCursor })
+        .then(data => {
+            appendUploadHistoryRows(data.uploads, false);
+            setNextCursor(data.next_cursor);
+        })
+        .catch(error => console.error('Error loading more uploads:', error));
+}
+
+// Add only the uploads made since the table was loaded - e.g. when coming back to the page
+function refreshUploadHistory() {
+    if (!uploadHistory.newestCursor) {
+        loadUploadHistory();
+        return;
+    }
+
+    fetchUploadHistory({ since: uploadHistory.newestCursor })
+        .then(data => {
+            if (data.uploads.length) {
+                appendUploadHistoryRows(data.uploads, true);
+                uploadHistory.newestCursor = data.uploads[0].cursor;
+            }
+            // The oldest new uploads come first; follow the cursor for the rest
+            if (data.next_cursor) {
+                refreshUploadHistory();
             }
         })
-        .catch(error => {
-            // Hide loading spinner on error too
-            if (loadingSpinner) {
-                loadingSpinner.style.display = 'none';
+        .catch(error => console.error('Error refreshing upload history:', error));
+}
+
+// Fetch one page of history - params can hold cursor, since and limit
+function fetchUploadHistory(params) {
+    const query = new URLSearchParams(params).toString();
+    return fetch(`/upload/history${query ? '?' + query : ''}`)
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success || !data.uploads) {
+                throw new Error(data.error || 'Failed to load upload history');
             }
-            console.error('Error loading upload history:', error);
+            return data;
         });
 }
 
+// Show the "Load more" button only while older uploads remain
+function setNextCursor(cursor) {
+    uploadHistory.nextCursor = cursor;
+    const loadMoreBtn = document.getElementById('loadMoreUploadsBtn');
+    if (loadMoreBtn) {
+        loadMoreBtn.style.display = cursor ? 'inline-block' : 'none';
+    }
+}
+
+// Build one history row
+function createUploadHistoryRow(upload) {
+    const row = document.createElement('tr');
+    row.dataset.uploadId = upload.id; // Store upload ID in the row for easy reference
+    
+    // Use the analysis URL path if available, otherwise use the regular view upload route
+    const analyzeUrl = upload.analysis_url_path 
+        ? `/analysis/${upload.analysis_url_path}` 
+        : `/upload/view/${upload.id}`;
+        
+    row.innerHTML = `
+        <td>${upload.title || 'Untitled'}</td>
+        <td>${upload.created_at}</td>
+        <td>${upload.preview}</td>
+        <td>
+            <a href="${analyzeUrl}" class="btn btn-sm btn-primary">Analyze</a>
+            <button type="button" class="btn btn-sm btn-danger delete-upload-btn" data-upload-id="${upload.id}">Delete</button>
+        </td>
+    `;
+    return row;
+}
+
+// Add rows at the top (new uploads) or bottom (older pages) of the table
+function appendUploadHistoryRows(uploads, prepend) {
+    const historyTableBody = document.querySelector('.upload-history table tbody');
+    if (!historyTableBody || uploads.length === 0) {
+        return;
+    }
+
+    // Drop the "No uploads yet." row if it is there
+    const emptyRow = historyTableBody.querySelector('td[colspan]');
+    if (emptyRow) {
+        emptyRow.parentElement.remove();
+    }
+
+    const rows = document.createDocumentFragment();
+    uploads.forEach(upload => {
+        const row = createUploadHistoryRow(upload);
+        row.querySelector('.delete-upload-btn').addEventListener('click', function() {
+            confirmDeleteUpload(this.getAttribute('data-upload-id'));
+        });
+        rows.appendChild(row);
+    });
+
+    if (prepend) {
+        historyTableBody.insertBefore(rows, historyTableBody.firstChild);
+    } else {
+        historyTableBody.appendChild(rows);
+    }
+}
+
 // Refreshing the history table - keeping DOM manipulation organized
 function updateUploadHistoryTable(uploads) {
     const historyTableBody = document.querySelector('.upload-history table tbody');
@@ -470,24 +747,7 @@ function updateUploadHistoryTable(uploads) {
         return;
     }    // Add each upload to the table
     uploads.forEach(upload => {
-        const row = document.createElement('tr');
-        row.dataset.uploadId = upload.id; // Store upload ID in the row for easy reference
-        
-        // Use the analysis URL path if available, otherwise use the regular view upload route
-        const analyzeUrl = upload.analysis_url_path 
-            ? `/analysis/${upload.analysis_url_path}` 
-            : `/upload/view/${upload.id}`;
-            
-        row.innerHTML = `
-            <td>${upload.title || 'Untitled'}</td>
-            <td>${upload.created_at}</td>
-            <td>${upload.preview}</td>
-            <td>
-                <a href="${analyzeUrl}" class="btn btn-sm btn-primary">Analyze</a>
-                <button type="button" class="btn btn-sm btn-danger delete-upload-btn" data-upload-id="${upload.id}">Delete</button>
-            </td>
-        `;
-        historyTableBody.appendChild(row);
+        historyTableBody.appendChild(createUploadHistoryRow(upload));
     });
     
     // Adding those delete button listeners - event delegation would be cleaner but this works
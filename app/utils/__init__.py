@@ -1,9 +1,13 @@
 # Used to identify the utils directory as a Python package
-from .sentiment_utils import analyze_sentiment, get_sentiment_summary
-from .analysis_utils import save_or_update_analysis_result
+from .sentiment_utils import analyze_sentiment, analyze_sentence_sentiment, get_sentiment_summary
+from .document_utils import AnalyzedDocument
+from .analysis_utils import analyze_text, save_or_update_analysis_result
 
 __all__ = [
     'analyze_sentiment', 
+    'analyze_sentence_sentiment',
     'get_sentiment_summary',
+    'AnalyzedDocument',
+    'analyze_text',
     'save_or_update_analysis_result'
 ]
\ No newline at end of file
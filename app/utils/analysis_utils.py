@@ -5,22 +5,103 @@ Utilities for handling analysis results
 from app import db
 from app.models import AnalysisResult
 from datetime import datetime
+from collections import Counter, OrderedDict
+import uuid
+import hashlib
+from .document_utils import as_document
+from .sentiment_utils import get_sentiment_summary, SENTIMENT_VERSION, TIMELINE_WINDOW
+from .ngram_utils import get_multiple_ngrams, NGRAM_VERSION
+from .ner_utils import perform_ner_analysis, NER_VERSION
+from .word_frequency_utils import analyze_word_frequency, WORD_FREQUENCY_VERSION
 
-def save_or_update_analysis_result(title, content, owner_id, upload_id):
+# Analyzer name -> function, output version and the parameters it runs with.
+# The version and parameters identify stored results of the analyzer.
+ANALYZERS = OrderedDict([
+    ('sentiment_data', {'function': get_sentiment_summary, 'version': SENTIMENT_VERSION, 'params': {'window': TIMELINE_WINDOW}}),
+    ('ngram_data', {'function': get_multiple_ngrams, 'version': NGRAM_VERSION, 'params': {'n': [1, 2, 3], 'top_k': 10}}),
+    ('ner_data', {'function': perform_ner_analysis, 'version': NER_VERSION, 'params': {}}),
+    ('word_freq_data', {'function': analyze_word_frequency, 'version': WORD_FREQUENCY_VERSION, 'params': {'top_k': 20}}),
+])
+
+def analyze_text(text, analyzers=None):
     """
-    Save a new analysis result or update an existing one to prevent duplicates.
-    Ensures title always starts with "Analysis Result: ".
+    Run the analyzers over a text, tokenizing it only once.
+    
+    Args:
+        text: The text content to analyze (a string or an AnalyzedDocument)
+        analyzers: Optional names of the analyzers to run (default: all four)
+        
+    Returns:
+        dict with sentiment_data, ngram_data, ner_data and word_freq_data
+    """
+    document = as_document(text)
+    names = analyzers if analyzers is not None else ANALYZERS.keys()
+    
+    return {name: ANALYZERS[name]['function'](document) for name in names}
+
+# Analyzers whose outputs summarize_analysis() uses
+SUMMARY_ANALYZERS = ('sentiment_data', 'ner_data')
+
+def summarize_analysis(analysis_data, top_entities=5):
+    """
+    Return a compact sentiment and top-entities summary of analyzer outputs,
+    small enough to attach to every result of a search.
+    
+    Args:
+        analysis_data: dict of analyzer name -> output, possibly incomplete
+        top_entities: Number of entities to include
+        
+    Returns:
+        dict with sentiment, compound_score and top_entities; fields whose
+        analyzer output is missing are None
+    """
+    sentiment = analysis_data.get('sentiment_data')
+    ner = analysis_data.get('ner_data')
+    
+    top = None
+    if ner is not None:
+        # The most mentioned entities, counting mentions case-insensitively
+        counts = Counter()
+        names = {}
+        for entity in ner.get('entities', []):
+            key = (entity['text'].lower(), entity['type'])
+            counts[key] += 1
+            names.setdefault(key, entity['text'])
+        top = [
+            {'text': names[key], 'type': key[1], 'count': count}
+            for key, count in counts.most_common(top_entities)
+        ]
+    
+    return {
+        'sentiment': sentiment['sentiment'] if sentiment else None,
+        'compound_score': sentiment['compound_score'] if sentiment else None,
+        'top_entities': top
+    }
+
+def generate_url_path(owner_id):
+    """
+    Generate a unique URL path for an analysis result
     
     Args:
-        title: The base title for the analysis result (e.g., the original upload title)
-        content: The content for the analysis result
         owner_id: The user ID of the owner
-        upload_id: The ID of the uploaded text
         
     Returns:
-        The saved or updated AnalysisResult object
+        str: URL path in the form "<owner_id>-<10 hex chars>"
+    """
+    unique_id = str(uuid.uuid4())
+    hash_id = hashlib.md5(f"{unique_id}-{owner_id}".encode()).hexdigest()[:10]
+    return f"{owner_id}-{hash_id}"
+
+def format_analysis_title(title):
+    """
+    Return an analysis result title in the standard "Analysis Result: <title>" form
+    
+    Args:
+        title: The base title, possibly already prefixed or in the old "Analysis of" form
+        
+    Returns:
+        str: The formatted title
     """
-    # Ensure the title always starts with "Analysis Result: "
     if title.startswith("Analysis Result: "):
         formatted_title = title
     elif title.startswith("Analysis of "):
@@ -29,7 +110,26 @@ def save_or_update_analysis_result(title, content, owner_id, upload_id):
         formatted_title = f"Analysis Result: {title}"
     
     # Clean up potential double prefixes, just in case
-    formatted_title = formatted_title.replace("Analysis Result: Analysis Result: ", "Analysis Result: ")
+    return formatted_title.replace("Analysis Result: Analysis Result: ", "Analysis Result: ")
+
+def save_or_update_analysis_result(title, content, owner_id, upload_id, analysis_data=None):
+    """
+    Save a new analysis result or update an existing one to prevent duplicates.
+    Ensures title always starts with "Analysis Result: ".
+    
+    Args:
+        title: The base title for the analysis result (e.g., the original upload title)
+        content: The content for the analysis result
+        owner_id: The user ID of the owner
+        upload_id: The ID of the uploaded text
+        analysis_data: Optional dict as returned by analyze_text(). When given,
+            the analyzer outputs are stored and the result gets a URL path.
+        
+    Returns:
+        The saved or updated AnalysisResult object
+    """
+    # Ensure the title always starts with "Analysis Result: "
+    formatted_title = format_analysis_title(title)
 
     # Check if an analysis result already exists for this upload_id
     existing_results = AnalysisResult.query.filter_by(
@@ -58,6 +158,17 @@ def save_or_update_analysis_result(title, content, owner_id, upload_id):
         )
         db.session.add(result)
     
+    if analysis_data is not None:
+        # Store the analyzer outputs (compressed JSON columns)
+        result.sentiment_data = analysis_data.get('sentiment_data') or None
+        result.ngram_data = analysis_data.get('ngram_data') or None
+        result.ner_data = analysis_data.get('ner_data') or None
+        result.word_freq_data = analysis_data.get('word_freq_data') or None
+        
+        # Make the result reachable through its own URL
+        if not result.url_path:
+            result.url_path = generate_url_path(owner_id)
+    
     # Commit changes
     db.session.commit()
     
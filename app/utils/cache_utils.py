@@ -0,0 +1,497 @@
+"""
+Content-addressed store of analyzer outputs, shared by all users and processes
+"""
+
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+import hashlib
+import json
+import os
+import threading
+from app import db
+from app.models import AnalysisCacheEntry, ParagraphCacheEntry
+from app.models.upload import hash_content
+from .analysis_utils import ANALYZERS
+from .document_utils import split_paragraphs
+from .paragraph_utils import (PARAGRAPH_ANALYZERS, PARAGRAPH_PARAMS, PARAGRAPH_VERSION,
+                              ParagraphMerger, hash_paragraph)
+from .pool_utils import analysis_pool
+from .storage_utils import iter_stored_paragraphs
+
+# Paragraphs of a stored text looked up and analyzed together
+STORED_TEXT_BATCH_CHARS = 1024 * 1024
+
+# Analyzers whose outputs come from sketches for very large stored texts
+SKETCH_ANALYZERS = ('ngram_data', 'word_freq_data')
+
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def params_key(params):
+    """Return a stable SHA-256 key for a dict of analyzer parameters"""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _insert_missing(model, rows):
+    """
+    Insert cache entries, skipping those another worker stored first, and commit.
+
+    On SQLite and PostgreSQL this is one INSERT ... ON CONFLICT DO NOTHING;
+    elsewhere each entry is inserted in its own savepoint.
+    """
+    if not rows:
+        return
+    make_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if make_insert is not None:
+        db.session.execute(make_insert(model.__table__).on_conflict_do_nothing(), rows)
+    else:
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(model(**row))
+            except IntegrityError:
+                pass
+    db.session.commit()
+
+
+class AnalysisResultStore:
+    """
+    Looks up analyzer outputs by (content hash, analyzer version, parameters)
+    so a text that was analyzed before is not analyzed again.
+
+    Entries live in the analysis_cache table. When the table grows past
+    ANALYSIS_CACHE_MAX_ENTRIES the least recently used entries are evicted.
+
+    For texts with several paragraphs the store also keeps a partial result
+    per paragraph (keyed by paragraph hash) in the paragraph_cache table,
+    which has its own size limit. When an edited or re-fetched text comes
+    in, only its changed paragraphs are analyzed and the partials are merged
+    into the n-gram, word frequency, NER and sentiment outputs.
+    Hit and miss counters are kept per process and reported by stats().
+
+    Configuration:
+        ANALYSIS_CACHE_ENABLED: Turn the store on or off (default True)
+        ANALYSIS_CACHE_MAX_ENTRIES: Maximum number of stored analyzer outputs
+        ANALYSIS_PARAGRAPH_MAX_ENTRIES: Maximum number of stored paragraph partials
+        ANALYSIS_BATCH_TIMEOUT: Seconds analyze_many() waits for a batch of texts
+        ANALYSIS_SKETCH_MIN_BYTES: Stored texts at least this large count top
+            terms with sketches (default 4MB, 0 = never)
+        ANALYSIS_SKETCH_CAPACITY: Space-Saving counters per term table
+        ANALYSIS_SKETCH_PRECISION: HyperLogLog precision for unique words
+        ANALYSIS_SKETCH_MAX_ENTITIES: Entity mentions kept for sketched texts
+        ANALYSIS_SKETCH_TIMELINE_POINTS: Sentiment timeline points kept for
+            sketched texts
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ANALYSIS_CACHE_ENABLED', True)
+        app.config.setdefault('ANALYSIS_CACHE_MAX_ENTRIES', 10000)
+        app.config.setdefault('ANALYSIS_PARAGRAPH_MAX_ENTRIES', 100000)
+        app.config.setdefault('ANALYSIS_BATCH_TIMEOUT', 5)
+        app.config.setdefault('ANALYSIS_SKETCH_MIN_BYTES', 4 * 1024 * 1024)
+        app.config.setdefault('ANALYSIS_SKETCH_CAPACITY', 10000)
+        app.config.setdefault('ANALYSIS_SKETCH_PRECISION', 14)
+        app.config.setdefault('ANALYSIS_SKETCH_MAX_ENTITIES', 10000)
+        app.config.setdefault('ANALYSIS_SKETCH_TIMELINE_POINTS', 1000)
+        app.extensions['analysis_store'] = {
+            'hits': 0, 'misses': 0, 'evictions': 0,
+            'paragraph_hits': 0, 'paragraph_misses': 0, 'paragraph_evictions': 0
+        }
+        # Entries this process added to each table since it last counted it
+        app.extensions['analysis_store_added'] = {AnalysisCacheEntry: 0, ParagraphCacheEntry: 0}
+
+    def _count(self, app, counter, amount=1):
+        with self._lock:
+            app.extensions['analysis_store'][counter] += amount
+
+    def stats(self, app):
+        """
+        Return the hit/miss counters of this process and the store size.
+
+        Returns:
+            dict with hits, misses, evictions, paragraph_hits, paragraph_misses,
+            paragraph_evictions, hit_rate, entries and paragraph_entries
+        """
+        with self._lock:
+            counters = dict(app.extensions['analysis_store'])
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = round(counters['hits'] / lookups, 4) if lookups else 0.0
+        counters['entries'] = AnalysisCacheEntry.query.count()
+        counters['paragraph_entries'] = ParagraphCacheEntry.query.count()
+        return counters
+
+    def _load(self, content_hashes, expected):
+        """
+        Load stored payloads that match an expected version and parameters key.
+
+        Args:
+            content_hashes: Hashes to look up
+            expected: dict of analyzer name -> (version, parameters key)
+
+        Returns:
+            dict of (content hash, analyzer name) -> payload
+        """
+        entries = AnalysisCacheEntry.query.filter(
+            AnalysisCacheEntry.content_hash.in_(list(content_hashes)),
+            AnalysisCacheEntry.analyzer.in_(list(expected))
+        ).all()
+
+        # Only results of the current analyzer version and parameters count
+        found = [
+            entry for entry in entries
+            if (entry.analyzer_version, entry.params_key) == expected[entry.analyzer]
+        ]
+
+        if found:
+            AnalysisCacheEntry.query.filter(
+                AnalysisCacheEntry.id.in_([entry.id for entry in found])
+            ).update({
+                'last_used_at': datetime.utcnow(),
+                'hit_count': AnalysisCacheEntry.hit_count + 1
+            }, synchronize_session=False)
+            db.session.commit()
+
+        return {(entry.content_hash, entry.analyzer): json.loads(entry.payload) for entry in found}
+
+    def _store(self, app, rows):
+        """
+        Add entries and evict old ones if needed.
+
+        Args:
+            app: The Flask application whose configuration is used
+            rows: (content hash, analyzer name, version, parameters key, payload) tuples
+        """
+        _insert_missing(AnalysisCacheEntry, [
+            {
+                'content_hash': content_hash,
+                'analyzer': analyzer,
+                'analyzer_version': version,
+                'params_key': key,
+                'payload': json.dumps(payload)
+            }
+            for content_hash, analyzer, version, key, payload in rows
+        ])
+        self._evict(app, AnalysisCacheEntry, len(rows))
+
+    @staticmethod
+    def _analyzer_key(name, sketch=None):
+        """Return the version and parameters key of an analyzer's outputs"""
+        params = ANALYZERS[name]['params']
+        if sketch and name in SKETCH_ANALYZERS:
+            params = dict(params, sketch=sketch)
+        return ANALYZERS[name]['version'], params_key(params)
+
+    def get(self, content_hash, names, sketch=None):
+        """
+        Load stored outputs for a content.
+
+        Args:
+            content_hash: SHA-256 of the text content
+            names: Analyzer names to look up
+            sketch: Sketch parameters the outputs were computed with, if any
+
+        Returns:
+            dict of analyzer name -> stored output, for the analyzers found
+        """
+        expected = {name: self._analyzer_key(name, sketch) for name in names}
+        found = self._load([content_hash], expected)
+        return {name: output for (_, name), output in found.items()}
+
+    def put(self, app, content_hash, results, sketch=None):
+        """
+        Store analyzer outputs for a content and evict old entries if needed.
+
+        Args:
+            app: The Flask application whose configuration is used
+            content_hash: SHA-256 of the text content
+            results: dict of analyzer name -> output
+            sketch: Sketch parameters the outputs were computed with, if any
+        """
+        self._store(app, [
+            (content_hash, name, *self._analyzer_key(name, sketch), output)
+            for name, output in results.items()
+        ])
+
+    def sketch_params(self, app, size):
+        """
+        Return the sketch parameters for a stored text of size bytes, or
+        None if its terms are counted exactly.
+        """
+        min_bytes = app.config['ANALYSIS_SKETCH_MIN_BYTES']
+        if not min_bytes or size < min_bytes:
+            return None
+        return {
+            'capacity': app.config['ANALYSIS_SKETCH_CAPACITY'],
+            'precision': app.config['ANALYSIS_SKETCH_PRECISION'],
+            'max_entities': app.config['ANALYSIS_SKETCH_MAX_ENTITIES'],
+            'timeline_points': app.config['ANALYSIS_SKETCH_TIMELINE_POINTS']
+        }
+
+    def get_paragraphs(self, paragraph_hashes):
+        """
+        Load stored paragraph partials.
+
+        Returns:
+            dict of paragraph hash -> partial, for the paragraphs found
+        """
+        found = ParagraphCacheEntry.query.filter(
+            ParagraphCacheEntry.paragraph_hash.in_(list(paragraph_hashes)),
+            ParagraphCacheEntry.version == PARAGRAPH_VERSION,
+            ParagraphCacheEntry.params_key == params_key(PARAGRAPH_PARAMS)
+        ).all()
+
+        if found:
+            ParagraphCacheEntry.query.filter(
+                ParagraphCacheEntry.id.in_([entry.id for entry in found])
+            ).update({
+                'last_used_at': datetime.utcnow(),
+                'hit_count': ParagraphCacheEntry.hit_count + 1
+            }, synchronize_session=False)
+            db.session.commit()
+
+        return {entry.paragraph_hash: json.loads(entry.payload) for entry in found}
+
+    def put_paragraphs(self, app, partials):
+        """
+        Store paragraph partials and evict old ones if needed.
+
+        Args:
+            app: The Flask application whose configuration is used
+            partials: dict of paragraph hash -> partial
+        """
+        key = params_key(PARAGRAPH_PARAMS)
+        _insert_missing(ParagraphCacheEntry, [
+            {
+                'paragraph_hash': paragraph_hash,
+                'version': PARAGRAPH_VERSION,
+                'params_key': key,
+                'payload': json.dumps(partial)
+            }
+            for paragraph_hash, partial in partials.items()
+        ])
+        self._evict(app, ParagraphCacheEntry, len(partials))
+
+    def _evict(self, app, model, added):
+        """
+        Delete the least recently used entries of a table beyond its size limit.
+
+        The table is only counted again once this process has added about 1%
+        of its limit, so it can briefly hold that many entries too many.
+
+        Args:
+            app: The Flask application whose configuration is used
+            model: AnalysisCacheEntry or ParagraphCacheEntry
+            added: Number of entries just added
+        """
+        if model is ParagraphCacheEntry:
+            limit, counter = app.config['ANALYSIS_PARAGRAPH_MAX_ENTRIES'], 'paragraph_evictions'
+        else:
+            limit, counter = app.config['ANALYSIS_CACHE_MAX_ENTRIES'], 'evictions'
+
+        with self._lock:
+            added_since_count = app.extensions['analysis_store_added']
+            added_since_count[model] += added
+            if added_since_count[model] < max(1, limit // 100):
+                return
+            added_since_count[model] = 0
+
+        overflow = model.query.count() - limit
+        if overflow <= 0:
+            return
+
+        oldest = db.session.query(model.id) \
+            .order_by(model.last_used_at.asc()) \
+            .limit(overflow)
+        model.query.filter(model.id.in_(oldest.scalar_subquery())) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+        self._count(app, counter, overflow)
+
+    def _add_paragraphs(self, app, merger, paragraphs):
+        """Add the partials of paragraphs to a merger, analyzing only the ones not stored yet"""
+        hashes = [hash_paragraph(paragraph) for paragraph in paragraphs]
+        partials = self.get_paragraphs(set(hashes))
+
+        # Repeated paragraphs are only analyzed once
+        missing = {}
+        for paragraph_hash, paragraph in zip(hashes, paragraphs):
+            if paragraph_hash not in partials:
+                missing.setdefault(paragraph_hash, paragraph)
+
+        self._count(app, 'paragraph_hits', len(set(hashes)) - len(missing))
+        self._count(app, 'paragraph_misses', len(missing))
+
+        if missing:
+            computed = dict(zip(missing, analysis_pool.analyze_paragraphs(app, list(missing.values()))))
+            self.put_paragraphs(app, computed)
+            partials.update(computed)
+
+        for paragraph_hash in hashes:
+            merger.add(partials[paragraph_hash])
+
+    def analyze_paragraphs(self, app, paragraphs):
+        """
+        Merge the outputs of a text from paragraph partials, analyzing only
+        the paragraphs not stored yet.
+
+        Args:
+            app: The Flask application whose configuration is used
+            paragraphs: Paragraphs of the text, as split by split_paragraphs()
+
+        Returns:
+            ParagraphMerger holding the partials of all the paragraphs
+        """
+        merger = ParagraphMerger()
+        self._add_paragraphs(app, merger, paragraphs)
+        return merger
+
+    def analyze_stored(self, app, path, content_hash):
+        """
+        Analyze a text in upload storage without loading it into memory.
+
+        The file is read in batches of paragraphs, and each batch is merged
+        into the result as soon as its partials are available. Texts of at
+        least ANALYSIS_SKETCH_MIN_BYTES count n-grams and words with sketches
+        (see sketch_params()); all other outputs are exact.
+
+        Args:
+            app: The Flask application whose configuration is used
+            path: Path of the stored text
+            content_hash: SHA-256 of the stored text
+
+        Returns:
+            dict with sentiment_data, ngram_data, ner_data and word_freq_data
+        """
+        names = list(ANALYZERS)
+        sketch = self.sketch_params(app, os.path.getsize(path))
+        results = self.get(content_hash, names, sketch) if app.config['ANALYSIS_CACHE_ENABLED'] else {}
+        self._count(app, 'hits', len(results))
+        self._count(app, 'misses', len(names) - len(results))
+        if len(results) == len(names):
+            return {name: results[name] for name in names}
+
+        merger = ParagraphMerger(sketch)
+        batch, batch_chars = [], 0
+        for paragraph in iter_stored_paragraphs(path):
+            batch.append(paragraph)
+            batch_chars += len(paragraph)
+            if batch_chars >= STORED_TEXT_BATCH_CHARS:
+                self._add_paragraphs(app, merger, batch)
+                batch, batch_chars = [], 0
+        if batch:
+            self._add_paragraphs(app, merger, batch)
+
+        computed = merger.result()
+        computed['sentiment_data'] = merger.sentiment()
+        computed = {name: computed[name] for name in names if name not in results}
+        if app.config['ANALYSIS_CACHE_ENABLED']:
+            self.put(app, content_hash, computed, sketch)
+        results.update(computed)
+
+        return {name: results[name] for name in names}
+
+    def analyze(self, app, text, content_hash=None, analyzers=None):
+        """
+        Return analyzer outputs for a text, computing only the missing ones.
+
+        Args:
+            app: The Flask application whose configuration is used
+            text: The text content to analyze
+            content_hash: SHA-256 of text, if already known
+            analyzers: Optional names of the analyzers to run (default: all four)
+
+        Returns:
+            dict with sentiment_data, ngram_data, ner_data and word_freq_data
+        """
+        names = list(analyzers) if analyzers is not None else list(ANALYZERS)
+        if not app.config['ANALYSIS_CACHE_ENABLED']:
+            return analysis_pool.analyze(app, text, names)
+
+        content_hash = content_hash or hash_content(text)
+        results = self.get(content_hash, names)
+        missing = [name for name in names if name not in results]
+
+        self._count(app, 'hits', len(results))
+        self._count(app, 'misses', len(missing))
+
+        if missing:
+            computed = {}
+
+            # Texts with several paragraphs reuse the partials of unchanged paragraphs
+            mergeable = [name for name in missing if name in PARAGRAPH_ANALYZERS]
+            paragraphs = split_paragraphs(text)
+            if mergeable and len(paragraphs) > 1:
+                merger = self.analyze_paragraphs(app, paragraphs)
+                merged = merger.result()
+                computed.update({name: merged[name] for name in mergeable})
+                if 'sentiment_data' in missing:
+                    # The partials hold the sentence scores and the VADER totals
+                    computed['sentiment_data'] = merger.sentiment()
+                missing = [name for name in missing if name not in computed]
+
+            computed.update(analysis_pool.analyze(app, text, missing))
+            self.put(app, content_hash, computed)
+            results.update(computed)
+
+        return {name: results[name] for name in names}
+
+    def analyze_many(self, app, texts, analyzers=None, timeout=None):
+        """
+        Return analyzer outputs for several texts within a time budget.
+
+        Stored outputs of all texts are looked up in one query; the texts
+        with missing outputs are analyzed together on the process pool (see
+        AnalysisProcessPool.analyze_many) and whatever finished is stored.
+
+        Args:
+            app: The Flask application whose configuration is used
+            texts: The texts to analyze
+            analyzers: Optional names of the analyzers to run (default: all four)
+            timeout: Seconds to wait for the analysis (default: ANALYSIS_BATCH_TIMEOUT)
+
+        Returns:
+            list with a dict of analyzer name -> output per text, in the order
+            of the texts; analyzers that did not finish in time are left out
+        """
+        names = list(analyzers) if analyzers is not None else list(ANALYZERS)
+        timeout = app.config['ANALYSIS_BATCH_TIMEOUT'] if timeout is None else timeout
+        if not app.config['ANALYSIS_CACHE_ENABLED']:
+            return analysis_pool.analyze_many(app, texts, names, timeout)
+
+        hashes = [hash_content(text) for text in texts]
+        expected = {name: self._analyzer_key(name) for name in names}
+        found = self._load(set(hashes), expected)
+        outputs = {}
+        for (content_hash, name), output in found.items():
+            outputs.setdefault(content_hash, {})[name] = output
+
+        # Each distinct text with missing outputs is analyzed once
+        missing = {}
+        for content_hash, text in zip(hashes, texts):
+            if len(outputs.get(content_hash, ())) < len(names):
+                missing.setdefault(content_hash, text)
+        self._count(app, 'hits', len(found))
+        self._count(app, 'misses', len(missing) * len(names) - sum(
+            len(outputs.get(content_hash, ())) for content_hash in missing))
+
+        if missing:
+            computed = analysis_pool.analyze_many(app, list(missing.values()), names, timeout)
+            for content_hash, results in zip(missing, computed):
+                # Stored outputs are kept, so they are not stored twice
+                results = {name: output for name, output in results.items()
+                           if name not in outputs.get(content_hash, {})}
+                if results:
+                    self.put(app, content_hash, results)
+                    outputs.setdefault(content_hash, {}).update(results)
+
+        return [dict(outputs.get(content_hash, {})) for content_hash in hashes]
+
+
+# Shared store instance, initialized in create_app()
+analysis_store = AnalysisResultStore()
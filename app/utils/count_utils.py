@@ -0,0 +1,171 @@
+"""
+Vectorized token counting shared by the n-gram and word frequency analyzers
+"""
+
+import string
+import numpy as np
+from .document_utils import clean_token, get_stop_words
+
+
+def _encode(tokens):
+    """
+    Map tokens to integer ids, numbering distinct tokens in order of first occurrence.
+
+    Returns:
+        (list of distinct tokens, int64 array of token ids)
+    """
+    # dict.fromkeys keeps first occurrence order; both passes run in C
+    vocabulary = dict.fromkeys(tokens)
+    for i, token in enumerate(vocabulary):
+        vocabulary[token] = i
+    ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+    return list(vocabulary), ids
+
+
+def _top_k(counts, first_seen, k):
+    """
+    Return the indices of the k largest counts, in Counter.most_common order.
+
+    Ties are broken by first occurrence, like a Counter filled in text order.
+    argpartition finds the k-th largest count, so only the candidates at or
+    above it are sorted.
+    """
+    if k <= 0 or len(counts) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if len(counts) > k:
+        threshold = counts[np.argpartition(-counts, k - 1)[k - 1]]
+        candidates = np.flatnonzero(counts >= threshold)
+    else:
+        candidates = np.arange(len(counts))
+
+    order = np.lexsort((first_seen[candidates], -counts[candidates]))
+    return candidates[order[:k]]
+
+
+class TokenCounts:
+    """
+    Integer id view of a document's tokens.
+
+    The lowercased tokens are encoded once. Cleaning, stopword removal and
+    punctuation filtering are decided once per distinct token instead of once
+    per token, which gives the id streams of both analyzers:
+
+        ngram_ids: cleaned tokens without stopwords (AnalyzedDocument.ngram_tokens)
+        word_ids: tokens without punctuation (AnalyzedDocument.word_tokens)
+
+    N-grams are counted on integer keys built from shifted id arrays, so
+    results match the Counter based implementation exactly, ties included.
+    """
+
+    def __init__(self, document):
+        words, lower_ids = _encode(document.lower_tokens)
+        stop_words = get_stop_words()
+
+        # Cleaned form of every distinct token; ids follow first occurrence
+        cleaned_vocabulary = {}
+        clean_map = np.full(len(words), -1, dtype=np.int64)
+        for i, word in enumerate(words):
+            cleaned = clean_token(word, stop_words)
+            if cleaned:
+                clean_map[i] = cleaned_vocabulary.setdefault(cleaned, len(cleaned_vocabulary))
+
+        is_punctuation = np.fromiter((word in string.punctuation for word in words),
+                                     dtype=bool, count=len(words))
+        is_stop_word = np.fromiter((word in stop_words for word in words),
+                                   dtype=bool, count=len(words))
+
+        self.words = words
+        self.cleaned_words = list(cleaned_vocabulary)
+
+        ngram_ids = clean_map[lower_ids]
+        self.ngram_ids = ngram_ids[ngram_ids >= 0]
+
+        self.word_ids = lower_ids[~is_punctuation[lower_ids]]
+        self._is_stop_word = is_stop_word
+
+    def _ngram_table(self, n):
+        """
+        Count the distinct n-grams of the cleaned tokens.
+
+        Returns:
+            (2-D array of n-gram word ids, counts, index of first occurrence)
+        """
+        ids = self.ngram_ids
+        size = len(self.cleaned_words)
+        if n <= 0 or len(ids) < n:
+            empty = np.empty(0, dtype=np.int64)
+            return np.empty((0, max(n, 0)), dtype=np.int64), empty, empty
+
+        if n == 1:
+            # Ids are numbered in order of first occurrence
+            counts = np.bincount(ids, minlength=size)
+            present = np.flatnonzero(counts)
+            return present[:, np.newaxis], counts[present], present
+
+        windows = len(ids) - n + 1
+        if size ** n < 2 ** 63:
+            # Pack each n-gram into one int64 key
+            keys = np.zeros(windows, dtype=np.int64)
+            for offset in range(n):
+                keys = keys * size + ids[offset:offset + windows]
+            grams, first_seen, counts = np.unique(keys, return_index=True, return_counts=True)
+            rows = np.stack([(grams // size ** (n - 1 - j)) % size for j in range(n)], axis=1)
+        else:
+            # Vocabulary too large to pack - compare rows of ids instead
+            rows = np.stack([ids[offset:offset + windows] for offset in range(n)], axis=1)
+            rows, first_seen, counts = np.unique(rows, axis=0, return_index=True, return_counts=True)
+        return rows, counts, first_seen
+
+    def _decode(self, rows, counts, order):
+        return [
+            (tuple(self.cleaned_words[i] for i in rows[index]), int(counts[index]))
+            for index in order
+        ]
+
+    def top_ngrams(self, n, top_k):
+        """
+        Return the top_k most common n-grams of the cleaned tokens.
+
+        Returns:
+            list of (tuple of words, count)
+        """
+        rows, counts, first_seen = self._ngram_table(n)
+        return self._decode(rows, counts, _top_k(counts, first_seen, top_k))
+
+    def ngram_counts(self, n):
+        """
+        Return every n-gram of the cleaned tokens with its count.
+
+        Returns:
+            list of (tuple of words, count), in order of first occurrence
+        """
+        rows, counts, first_seen = self._ngram_table(n)
+        return self._decode(rows, counts, np.argsort(first_seen, kind='stable'))
+
+    def word_counts(self):
+        """
+        Return every word (stopwords included) with its count.
+
+        Returns:
+            list of (word, count), in order of first occurrence
+        """
+        counts = np.bincount(self.word_ids, minlength=len(self.words))
+        present = np.flatnonzero(counts)
+        return [(self.words[i], int(counts[i])) for i in present]
+
+    def word_frequency(self, top_k):
+        """
+        Return word totals and the top_k most common non-stopword words.
+
+        Returns:
+            (total_words, unique_words, list of (word, count))
+        """
+        ids = self.word_ids
+        counts = np.bincount(ids, minlength=len(self.words))
+        unique_words = int(np.count_nonzero(counts))
+
+        counts[self._is_stop_word] = 0
+        present = np.flatnonzero(counts)
+        top = present[_top_k(counts[present], present, top_k)]
+        return len(ids), unique_words, [(self.words[i], int(counts[i])) for i in top]
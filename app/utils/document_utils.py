@@ -0,0 +1,149 @@
+"""
+Shared tokenization pipeline used by all of the text analyzers
+"""
+
+import string
+import re
+from .nltk_utils import nltk_resources
+
+# Define the symbol set, including Unicode symbols
+PUNCTUATION = string.punctuation + '“”‘’—…·–—'
+
+
+# Blank lines separate paragraphs
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
+def split_paragraphs(text):
+    """
+    Split text into its non-empty paragraphs, with surrounding whitespace removed
+    """
+    return [paragraph.strip() for paragraph in PARAGRAPH_BREAK.split(text or '') if paragraph.strip()]
+
+
+def get_stop_words():
+    """
+    Return the English stopword set (loaded on first use)
+    """
+    return nltk_resources.get('stop_words')
+
+
+def clean_token(token, stop_words=None):
+    """
+    Clear out all symbols and special characters, and only keep letters and numbers
+    """
+    if stop_words is None:
+        stop_words = get_stop_words()
+    # Use regular expressions to match non-letters and non-numbers for filtering
+    cleaned_token = re.sub(r'[^a-zA-Z0-9]', '', token)
+    return cleaned_token if cleaned_token.lower() not in stop_words else None
+
+
+class AnalyzedDocument:
+    """
+    A piece of text that is sentence-split, tokenized, lowercased and cleaned
+    once, so that every analyzer can share the same token streams.
+
+    Sentences never cross a paragraph break, so the tokens of a document are
+    exactly the tokens of its paragraphs one after another. This is what lets
+    analyses be merged from per-paragraph results (see paragraph_utils).
+
+    Each stage is computed on first access and cached on the instance, so an
+    analyzer only pays for the stages it actually uses.
+    """
+
+    def __init__(self, text):
+        self.text = text or ''
+        self._paragraphs = None
+        self._paragraph_sentences = None
+        self._sentences = None
+        self._sentence_tokens = None
+        self._tokens = None
+        self._lower_tokens = None
+        self._ngram_tokens = None
+        self._word_tokens = None
+        self._token_counts = None
+
+    def __repr__(self):
+        return f'<AnalyzedDocument {len(self.text)} chars>'
+
+    @property
+    def paragraphs(self):
+        """Non-empty paragraphs of the original text"""
+        if self._paragraphs is None:
+            self._paragraphs = split_paragraphs(self.text)
+        return self._paragraphs
+
+    @property
+    def sentences(self):
+        """Sentences of the original text (Punkt sentence splitter, per paragraph)"""
+        if self._sentences is None:
+            sentence_tokenizer = nltk_resources.get('sentence_tokenizer')
+            self._paragraph_sentences = [sentence_tokenizer.tokenize(paragraph) for paragraph in self.paragraphs]
+            self._sentences = [sentence for sentences in self._paragraph_sentences for sentence in sentences]
+        return self._sentences
+
+    @property
+    def sentence_tokens(self):
+        """Word tokens of each sentence, in their original case"""
+        if self._sentence_tokens is None:
+            word_tokenizer = nltk_resources.get('word_tokenizer')
+            self._sentence_tokens = [word_tokenizer.tokenize(sentence) for sentence in self.sentences]
+        return self._sentence_tokens
+
+    @property
+    def tokens(self):
+        """All word tokens in their original case (equivalent to nltk.word_tokenize)"""
+        if self._tokens is None:
+            self._tokens = [token for sentence in self.sentence_tokens for token in sentence]
+        return self._tokens
+
+    @property
+    def paragraph_tokens(self):
+        """Word tokens of each paragraph, in their original case"""
+        sentence_tokens = iter(self.sentence_tokens)
+        return [
+            [token for _ in sentences for token in next(sentence_tokens)]
+            for sentences in self._paragraph_sentences
+        ]
+
+    @property
+    def lower_tokens(self):
+        """All word tokens, lowercased"""
+        if self._lower_tokens is None:
+            self._lower_tokens = [token.lower() for token in self.tokens]
+        return self._lower_tokens
+
+    @property
+    def ngram_tokens(self):
+        """Lowercased tokens stripped of symbols, with stopwords and empty tokens removed"""
+        if self._ngram_tokens is None:
+            stop_words = get_stop_words()
+            cleaned = (clean_token(token, stop_words) for token in self.lower_tokens)
+            self._ngram_tokens = [token for token in cleaned if token]
+        return self._ngram_tokens
+
+    @property
+    def word_tokens(self):
+        """Lowercased tokens with plain punctuation tokens removed"""
+        if self._word_tokens is None:
+            self._word_tokens = [word for word in self.lower_tokens if word not in string.punctuation]
+        return self._word_tokens
+
+    @property
+    def token_counts(self):
+        """Integer id view of the tokens, used to count n-grams and word frequencies"""
+        if self._token_counts is None:
+            # Imported here because count_utils builds on this module
+            from .count_utils import TokenCounts
+            self._token_counts = TokenCounts(self)
+        return self._token_counts
+
+
+def as_document(text):
+    """
+    Return text as an AnalyzedDocument, reusing it if it already is one
+    """
+    if isinstance(text, AnalyzedDocument):
+        return text
+    return AnalyzedDocument(text)
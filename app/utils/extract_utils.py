@@ -0,0 +1,315 @@
+"""
+Extraction of the article text from a news page
+
+The page is parsed as a stream of start tag, end tag and text events
+rather than into a tree. Parsing stops as soon as an <article> with enough
+text has been closed, so the comments, related stories and scripts that
+follow it on most news pages are never parsed. Two parser backends produce
+the events: lxml (libxml2, in C) when it is installed, and the standard
+library's html.parser otherwise.
+"""
+
+from html.parser import HTMLParser
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is optional
+    etree = None
+
+# Elements that commonly hold the body of an article, most specific first
+ARTICLE_SELECTORS = [
+    'article', '.article-content', '.story-body', '.entry-content',
+    '.article-body', '.story-content', '.post-content', '.news-content',
+    '[itemprop="articleBody"]', '[property="content:encoded"]',
+    '.main-content', '.blog-post-content', '.node-content'
+]
+
+# Paragraphs of at most this many characters are bylines, captions or buttons
+MIN_PARAGRAPH_CHARS = 20
+
+# An article must have more text than this to be used
+MIN_ARTICLE_CHARS = 100
+
+# Paragraphs whose text is mostly links are navigation or "read more" lists
+MAX_LINK_DENSITY = 0.5
+
+# Characters handed to the parser at a time; parsing can stop between chunks
+FEED_CHARS = 16 * 1024
+
+# Text in these elements is never article text
+IGNORED_TAGS = frozenset({'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'head'})
+
+# Paragraphs in these elements are page furniture rather than article text
+BOILERPLATE_TAGS = frozenset({'nav', 'footer', 'aside', 'form', 'figure', 'button'})
+
+# Elements that have no end tag
+VOID_TAGS = frozenset({'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                       'link', 'meta', 'source', 'track', 'wbr'})
+
+# Start tags that close an open <p>, as browsers (and lxml) do
+CLOSES_PARAGRAPH = frozenset({'address', 'article', 'aside', 'blockquote', 'div', 'dl', 'fieldset',
+                              'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+                              'hr', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul'})
+
+# Containers used when no selector matches, in order of preference
+FALLBACK_CONTAINERS = ('main', '#main', 'body')
+
+
+def _parse_selector(selector):
+    """Return (tag, attribute, value) for 'tag', '.class' or '[attr="value"]'"""
+    if selector.startswith('.'):
+        return None, 'class', selector[1:]
+    if selector.startswith('['):
+        name, _, value = selector[1:-1].partition('=')
+        return None, name, value.strip('"\'')
+    return selector, None, None
+
+
+_SELECTORS = [_parse_selector(selector) for selector in ARTICLE_SELECTORS]
+
+
+def _selector_rank(tag, attrs):
+    """Return the position of the first selector an element matches, or None"""
+    classes = None
+    for rank, (selector_tag, name, value) in enumerate(_SELECTORS):
+        if selector_tag is not None:
+            if tag == selector_tag:
+                return rank
+        elif name == 'class':
+            if classes is None:
+                classes = (attrs.get('class') or '').split()
+            if value in classes:
+                return rank
+        elif attrs.get(name) == value:
+            return rank
+    return None
+
+
+def _fallback_rank(tag, attrs):
+    if tag == 'main':
+        return 0
+    if attrs.get('id') == 'main':
+        return 1
+    if tag == 'body':
+        return 2
+    return None
+
+
+class _Element:
+    __slots__ = ('tag', 'key', 'rank', 'fallback', 'paragraphs')
+
+    def __init__(self, tag, key, rank, fallback):
+        self.tag = tag
+        self.key = key
+        self.rank = rank
+        self.fallback = fallback
+        self.paragraphs = [] if rank is not None or fallback is not None else None
+
+
+class ArticleCollector:
+    """
+    Collects the paragraphs of a page from parser events and picks the article.
+
+    The article is, in order of preference:
+      1. the first element matching the earliest of ARTICLE_SELECTORS whose
+         paragraphs have more than MIN_ARTICLE_CHARS characters;
+      2. the densest block of paragraphs: every paragraph scores its length
+         for its parent element and half of it for its grandparent, and the
+         best scoring element's paragraphs are used;
+      3. the paragraphs of <main>, #main or <body>.
+    Paragraphs inside navigation, footers, asides, forms and figures, short
+    paragraphs and paragraphs that are mostly link text are left out.
+
+    Parsers call start(), end() and data(), and stop feeding the page once
+    done is set. This is also the parser target interface of lxml.
+    """
+
+    def __init__(self):
+        self.stack = []
+        self.done = False
+        self.candidates = []
+        self.fallbacks = []
+        self.scores = {}
+        self.blocks = []
+        self._next_key = 0
+        self._ignored = 0
+        self._boilerplate = 0
+        self._links = 0
+        self._paragraph = None
+        self._link_chars = 0
+
+    def start(self, tag, attrs):
+        tag = tag.lower()
+        if self._paragraph is not None and tag in CLOSES_PARAGRAPH:
+            self.end('p')
+        if tag in VOID_TAGS:
+            return
+        if tag in IGNORED_TAGS:
+            self._ignored += 1
+        elif tag in BOILERPLATE_TAGS:
+            self._boilerplate += 1
+        elif tag == 'a':
+            self._links += 1
+
+        if tag == 'p':
+            self._paragraph = []
+            self._link_chars = 0
+        self._next_key += 1
+        element = _Element(tag, self._next_key, _selector_rank(tag, attrs), _fallback_rank(tag, attrs))
+        if element.rank is not None:
+            self.candidates.append(element)
+        if element.fallback is not None:
+            self.fallbacks.append(element)
+        self.stack.append(element)
+
+    def end(self, tag):
+        tag = tag.lower()
+        if tag in VOID_TAGS or not any(element.tag == tag for element in self.stack):
+            return
+        while self.stack:
+            element = self.stack.pop()
+            self._close(element)
+            if element.tag == tag:
+                break
+
+    def data(self, text):
+        if self._paragraph is not None and not self._ignored:
+            self._paragraph.append(text)
+            if self._links:
+                self._link_chars += len(text.strip())
+
+    def close(self):
+        while self.stack:
+            self._close(self.stack.pop())
+
+    def _close(self, element):
+        tag = element.tag
+        if tag in IGNORED_TAGS:
+            self._ignored -= 1
+        elif tag in BOILERPLATE_TAGS:
+            self._boilerplate -= 1
+        elif tag == 'a':
+            self._links -= 1
+        if tag == 'p':
+            self._add_paragraph()
+        elif element.rank == 0 and _article_length(element.paragraphs) > MIN_ARTICLE_CHARS:
+            # Nothing later in the page can rank above a complete <article>
+            self.done = True
+
+    def _add_paragraph(self):
+        text = ' '.join(''.join(self._paragraph).split())
+        self._paragraph = None
+        if len(text) <= MIN_PARAGRAPH_CHARS or self._boilerplate or self._ignored:
+            return
+        if self._link_chars > len(text) * MAX_LINK_DENSITY:
+            return
+        for element in self.stack:
+            if element.paragraphs is not None:
+                element.paragraphs.append(text)
+        # Paragraph density: the parent scores the full length, the grandparent half
+        parents = [element.key for element in self.stack[-2:]]
+        self.blocks.append((parents, text))
+        for key, weight in zip(reversed(parents), (1.0, 0.5)):
+            self.scores[key] = self.scores.get(key, 0.0) + len(text) * weight
+
+    def article(self):
+        """Return the article text, or None if the page has no substantial text"""
+        for element in sorted(self.candidates, key=lambda element: element.rank):
+            if _article_length(element.paragraphs) > MIN_ARTICLE_CHARS:
+                return '\n\n'.join(element.paragraphs)
+
+        if self.scores:
+            best = max(self.scores, key=self.scores.get)
+            paragraphs = [text for parents, text in self.blocks if best in parents]
+            if _article_length(paragraphs) > MIN_ARTICLE_CHARS:
+                return '\n\n'.join(paragraphs)
+
+        for element in sorted(self.fallbacks, key=lambda element: element.fallback):
+            if _article_length(element.paragraphs) > MIN_ARTICLE_CHARS:
+                return '\n\n'.join(element.paragraphs)
+        return None
+
+
+def _article_length(paragraphs):
+    """Length of the paragraphs joined by blank lines"""
+    if not paragraphs:
+        return 0
+    return sum(len(text) for text in paragraphs) + 2 * (len(paragraphs) - 1)
+
+
+class _StdlibParser(HTMLParser):
+    """Feeds the events of the standard library parser to a collector"""
+
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, {name: value or '' for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, {name: value or '' for name, value in attrs})
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def _parse_stdlib(html, collector):
+    parser = _StdlibParser(collector)
+    for start in range(0, len(html), FEED_CHARS):
+        parser.feed(html[start:start + FEED_CHARS])
+        if collector.done:
+            return
+    parser.close()
+    collector.close()
+
+
+def _parse_lxml(html, collector):
+    # lxml calls the collector's start/end/data/close methods directly
+    parser = etree.HTMLParser(target=collector, no_network=True, remove_comments=True, remove_pis=True)
+    for start in range(0, len(html), FEED_CHARS):
+        parser.feed(html[start:start + FEED_CHARS])
+        if collector.done:
+            return
+    parser.close()
+
+
+_BACKENDS = {'html.parser': _parse_stdlib}
+if etree is not None:
+    _BACKENDS['lxml'] = _parse_lxml
+
+DEFAULT_BACKEND = 'lxml' if 'lxml' in _BACKENDS else 'html.parser'
+
+
+def available_backends():
+    """Return the names of the installed parser backends, fastest first"""
+    return sorted(_BACKENDS, key=lambda name: name != 'lxml')
+
+
+def extract_article_content(html, backend=None):
+    """
+    Extract the text of an article from its page.
+
+    Args:
+        html: The page's HTML
+        backend: 'lxml' or 'html.parser' (default: lxml when installed)
+
+    Returns:
+        str: The article's paragraphs separated by blank lines, or None if
+        no substantial text was found
+
+    Raises:
+        ValueError: If the backend is unknown or not installed
+    """
+    name = backend or DEFAULT_BACKEND
+    parse = _BACKENDS.get(name)
+    if parse is None:
+        raise ValueError(f"Unknown or unavailable HTML parser backend: {name}")
+    if not html:
+        return None
+    collector = ArticleCollector()
+    parse(html, collector)
+    return collector.article()
@@ -0,0 +1,217 @@
+"""
+Shared outbound HTTP client: pooled connections, retries and size limits
+"""
+
+from collections import deque
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+from flask import current_app
+import requests
+from requests.adapters import HTTPAdapter
+
+# Statuses worth retrying: rate limited or a temporary server failure
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Bytes read from the network at a time while streaming a body
+CHUNK_SIZE = 64 * 1024
+
+# Latency samples kept per host for the percentiles in stats()
+LATENCY_SAMPLES = 256
+
+
+class ResponseTooLarge(requests.RequestException):
+    """The response body is larger than the allowed number of bytes"""
+
+
+class HttpClient:
+    """
+    One keep-alive connection pool per app for all outbound GET requests.
+
+    Connections to the news API and to news sites are reused across
+    requests instead of opening a new TLS connection every time. Failed
+    connections and 429/5xx responses are retried with exponential backoff
+    and full jitter, without going past the caller's deadline. Bodies are
+    streamed and the download is aborted as soon as it passes the byte
+    limit, so a huge page is never read or parsed in full. Latency, errors
+    and retries are recorded per host and reported by stats().
+
+    Configuration:
+        HTTP_POOL_HOSTS: Number of hosts whose connections are kept open
+        HTTP_POOL_PER_HOST: Connections kept open per host
+        HTTP_POOL_HOST_SIZES: dict of host -> connections, overriding HTTP_POOL_PER_HOST
+        HTTP_RETRIES: Retries of a failed request
+        HTTP_BACKOFF: Base backoff in seconds; retry n waits up to HTTP_BACKOFF * 2 ** n
+        HTTP_TIMEOUT: Default connect and read timeout in seconds
+        HTTP_MAX_BODY_BYTES: Default limit on the size of a response body
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('HTTP_POOL_HOSTS', 32)
+        app.config.setdefault('HTTP_POOL_PER_HOST', 10)
+        app.config.setdefault('HTTP_POOL_HOST_SIZES', {})
+        app.config.setdefault('HTTP_RETRIES', 2)
+        app.config.setdefault('HTTP_BACKOFF', 0.25)
+        app.config.setdefault('HTTP_TIMEOUT', 10)
+        app.config.setdefault('HTTP_MAX_BODY_BYTES', 5 * 1024 * 1024)
+        app.extensions['http_client'] = {'session': None, 'hosts': {}}
+
+    def _get_session(self, app):
+        """Create the pooled session for this app on first use"""
+        state = app.extensions['http_client']
+        with self._lock:
+            if state['session'] is None:
+                config = app.config
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=config['HTTP_POOL_HOSTS'],
+                                      pool_maxsize=config['HTTP_POOL_PER_HOST'])
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                # Hosts with their own pool size get an adapter of their own
+                for host, size in config['HTTP_POOL_HOST_SIZES'].items():
+                    host_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+                    session.mount(f'http://{host}/', host_adapter)
+                    session.mount(f'https://{host}/', host_adapter)
+                state['session'] = session
+            return state['session']
+
+    def close(self, app):
+        """Close the pooled connections of an app"""
+        state = app.extensions['http_client']
+        with self._lock:
+            session, state['session'] = state['session'], None
+        if session is not None:
+            session.close()
+
+    def _record(self, app, host, **values):
+        hosts = app.extensions['http_client']['hosts']
+        with self._lock:
+            metrics = hosts.get(host)
+            if metrics is None:
+                metrics = hosts[host] = {
+                    'requests': 0, 'errors': 0, 'retries': 0, 'too_large': 0, 'bytes': 0,
+                    'total_seconds': 0.0, 'latencies': deque(maxlen=LATENCY_SAMPLES)
+                }
+            latency = values.pop('latency', None)
+            if latency is not None:
+                metrics['total_seconds'] += latency
+                metrics['latencies'].append(latency)
+            for name, amount in values.items():
+                metrics[name] += amount
+
+    def stats(self, app):
+        """
+        Return the request metrics of this process per host.
+
+        Returns:
+            dict of host -> requests, errors, retries, too_large, bytes and
+            mean, p50, p95 and max latency in milliseconds
+        """
+        with self._lock:
+            hosts = {host: dict(metrics, latencies=sorted(metrics['latencies']))
+                     for host, metrics in app.extensions['http_client']['hosts'].items()}
+        report = {}
+        for host, metrics in hosts.items():
+            latencies = metrics.pop('latencies')
+            total = metrics.pop('total_seconds')
+            completed = metrics['requests'] - metrics['errors']
+            metrics['mean_ms'] = round(total / completed * 1000, 1) if completed > 0 else None
+            for name, quantile in (('p50_ms', 0.5), ('p95_ms', 0.95)):
+                metrics[name] = round(latencies[int(quantile * (len(latencies) - 1))] * 1000, 1) if latencies else None
+            metrics['max_ms'] = round(latencies[-1] * 1000, 1) if latencies else None
+            report[host] = metrics
+        return report
+
+    def _read_body(self, response, max_bytes):
+        """Read a streamed body, aborting as soon as it passes max_bytes"""
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise ResponseTooLarge(f'{response.url} is {length} bytes, over the limit of {max_bytes}')
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ResponseTooLarge(f'{response.url} is over the limit of {max_bytes} bytes')
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def get(self, url, params=None, headers=None, timeout=None, max_bytes=None, deadline=None, app=None):
+        """
+        Send a GET request through the shared pool.
+
+        Args:
+            url: URL to fetch
+            params: Query parameters
+            headers: Extra request headers
+            timeout: Connect and read timeout of one attempt (default HTTP_TIMEOUT)
+            max_bytes: Largest body accepted (default HTTP_MAX_BODY_BYTES)
+            deadline: time.monotonic() value after which no attempt or retry starts
+            app: The Flask application (default current_app)
+
+        Returns:
+            requests.Response: The response, with its body already read
+
+        Raises:
+            ResponseTooLarge: If the body is larger than max_bytes
+            requests.RequestException: If the last attempt failed or the deadline passed
+        """
+        if app is None:
+            app = current_app._get_current_object()
+        config = app.config
+        timeout = config['HTTP_TIMEOUT'] if timeout is None else timeout
+        max_bytes = config['HTTP_MAX_BODY_BYTES'] if max_bytes is None else max_bytes
+        session = self._get_session(app)
+        host = urlsplit(url).hostname or ''
+
+        attempt = 0
+        while True:
+            attempt_timeout = timeout
+            if deadline is not None:
+                attempt_timeout = min(timeout, deadline - time.monotonic())
+                if attempt_timeout <= 0:
+                    raise requests.Timeout(f'Deadline passed before fetching {url}')
+
+            started = time.monotonic()
+            try:
+                with session.get(url, params=params, headers=headers, timeout=attempt_timeout,
+                                 stream=True) as response:
+                    if response.status_code in RETRY_STATUSES and attempt < config['HTTP_RETRIES']:
+                        failure = None
+                        try:
+                            # Drain a short error body so the connection goes back to the pool
+                            self._read_body(response, CHUNK_SIZE)
+                        except ResponseTooLarge:
+                            pass
+                    else:
+                        # Keep the body on the response so .text and .json() work as usual
+                        response._content = self._read_body(response, max_bytes)
+                        self._record(app, host, requests=1, bytes=len(response._content),
+                                     latency=time.monotonic() - started)
+                        return response
+            except ResponseTooLarge:
+                self._record(app, host, requests=1, errors=1, too_large=1)
+                raise
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                failure = e
+            self._record(app, host, requests=1, errors=1)
+
+            if attempt >= config['HTTP_RETRIES']:
+                raise failure
+            # Exponential backoff with full jitter, never sleeping past the deadline
+            delay = random.uniform(0, config['HTTP_BACKOFF'] * 2 ** attempt)
+            if deadline is not None:
+                delay = min(delay, max(0, deadline - time.monotonic()))
+            time.sleep(delay)
+            attempt += 1
+            self._record(app, host, retries=1)
+
+
+# Shared instance, bound to the app in create_app()
+http_client = HttpClient()
@@ -0,0 +1,266 @@
+"""
+Scheduled ingestion of the latest news into a shared, pre-analyzed corpus
+"""
+
+from datetime import datetime, timedelta, timezone
+import re
+import threading
+import time
+import click
+from app import db
+from app.models import NewsArticle, UploadedText
+from app.models.upload import hash_content
+from .analysis_utils import ANALYZERS, save_or_update_analysis_result
+from .cache_utils import analysis_store
+from .news_cache import canonical_url, hash_url
+from .news_providers import news_providers
+from .news_utils import article_fetcher, needs_full_content
+
+# Articles with less text than this are paywalled or failed to extract,
+# the same threshold the news routes use
+MIN_ARTICLE_CHARS = 225
+
+# Categories of the latest news tab
+NEWS_CATEGORIES = ['general', 'business', 'entertainment', 'health', 'science', 'sports', 'technology']
+
+
+def _parse_published(value):
+    """Parse an ISO 8601 publication time into naive UTC, or None"""
+    try:
+        published = datetime.fromisoformat((value or '').replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if published.tzinfo is not None:
+        published = published.astimezone(timezone.utc).replace(tzinfo=None)
+    return published
+
+
+class NewsIngestor:
+    """
+    Pulls the latest headlines of every category into the news_article table
+    and runs the analyzers over them ahead of time.
+
+    The analyzer outputs go to the analysis cache under each article's
+    content hash, where the analysis of any upload with the same text finds
+    them; import_article() uses them to create a user's upload and analysis
+    result in one request. Ingestion runs from `flask ingest-news` (e.g. from
+    cron, or with --loop) or, with NEWS_INGEST_THREAD, on a thread of the web
+    process. With several web processes, use the CLI command instead so the
+    providers are not asked once per process.
+
+    Configuration:
+        NEWS_INGEST_CATEGORIES: Categories to pull
+        NEWS_INGEST_PER_CATEGORY: Headlines pulled per category and run
+        NEWS_INGEST_INTERVAL: Seconds between runs of the loop or thread
+        NEWS_INGEST_MAX_AGE_DAYS: Articles last pulled longer ago are removed
+        NEWS_INGEST_THREAD: Run ingestion on a background thread of this process
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._running = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('NEWS_INGEST_CATEGORIES', NEWS_CATEGORIES)
+        app.config.setdefault('NEWS_INGEST_PER_CATEGORY', 10)
+        app.config.setdefault('NEWS_INGEST_INTERVAL', 15 * 60)
+        app.config.setdefault('NEWS_INGEST_MAX_AGE_DAYS', 7)
+        app.config.setdefault('NEWS_INGEST_THREAD', False)
+        app.extensions['news_ingestor'] = {'thread': None, 'stop': None, 'last_run': None}
+
+        @app.cli.command('ingest-news')
+        @click.option('--category', '-c', multiple=True, help='Category to pull (default: NEWS_INGEST_CATEGORIES)')
+        @click.option('--loop', is_flag=True, help='Keep pulling every NEWS_INGEST_INTERVAL seconds')
+        def ingest_news(category, loop):
+            """Pull the latest news into the pre-analyzed corpus."""
+            while True:
+                for name, counts in self.ingest(app, list(category) or None).items():
+                    print(f"{name}: {counts['fetched']} fetched, {counts['new']} new, {counts['updated']} updated, "
+                          f"{counts['analyzed']} analyzed, {counts['skipped']} skipped")
+                if not loop:
+                    break
+                time.sleep(app.config['NEWS_INGEST_INTERVAL'])
+
+        if app.config['NEWS_INGEST_THREAD']:
+            self.start(app)
+
+    def start(self, app):
+        """Start ingesting every NEWS_INGEST_INTERVAL seconds on a daemon thread"""
+        state = app.extensions['news_ingestor']
+        with self._lock:
+            if state['thread'] is not None:
+                return
+            stop = threading.Event()
+
+            def run():
+                while not stop.is_set():
+                    try:
+                        self.ingest(app)
+                    except Exception as e:
+                        app.logger.error(f"News ingestion failed: {str(e)}")
+                    stop.wait(app.config['NEWS_INGEST_INTERVAL'])
+
+            state['stop'] = stop
+            state['thread'] = threading.Thread(target=run, name='news-ingest', daemon=True)
+            state['thread'].start()
+
+    def stop(self, app, wait=True):
+        """Stop the ingestion thread of an app"""
+        state = app.extensions['news_ingestor']
+        with self._lock:
+            thread, stop = state['thread'], state['stop']
+            state['thread'] = state['stop'] = None
+        if thread is not None:
+            stop.set()
+            if wait:
+                thread.join()
+
+    def ingest(self, app, categories=None):
+        """
+        Pull, extract and analyze the latest news of several categories.
+
+        A run that starts while another one is in progress in this process
+        does nothing.
+
+        Returns:
+            dict of category -> counts of fetched, new, updated, analyzed
+            and skipped articles
+        """
+        if not self._running.acquire(blocking=False):
+            app.logger.info("News ingestion is already running")
+            return {}
+        try:
+            with app.app_context():
+                summary = {}
+                for category in categories or app.config['NEWS_INGEST_CATEGORIES']:
+                    summary[category] = self._ingest_category(app, category)
+                self.prune(app)
+                app.extensions['news_ingestor']['last_run'] = datetime.utcnow()
+                return summary
+        finally:
+            self._running.release()
+
+    def _ingest_category(self, app, category):
+        counts = {'fetched': 0, 'new': 0, 'updated': 0, 'analyzed': 0, 'skipped': 0}
+        response = news_providers.top_headlines(category, datetime.utcnow().strftime('%Y-%m-%d'),
+                                                limit=app.config['NEWS_INGEST_PER_CATEGORY'])
+        for name, error in response['errors'].items():
+            app.logger.warning(f"News ingestion of {category} from {name}: {error}")
+        articles = [article for article in response['articles'] if article.get('url') and article.get('title')]
+        counts['fetched'] = len(articles)
+        if not articles:
+            return counts
+
+        # Full text of the truncated articles, from the article store where possible
+        full_texts = article_fetcher.fetch_articles(
+            article['url'] for article in articles if needs_full_content(article.get('content') or '')
+        )
+        hashes = {article['url']: hash_url(canonical_url(article['url'])) for article in articles}
+        existing = {row.url_hash: row for row in NewsArticle.query.filter(
+            NewsArticle.url_hash.in_(list(hashes.values()))
+        )}
+
+        to_analyze = []
+        for article in articles:
+            url = article['url']
+            content = article.get('content') or ''
+            if needs_full_content(content) and full_texts.get(url):
+                content = full_texts[url]
+            # Remove "[+XXXX chars]" that NewsAPI adds
+            content = re.sub(r'\[\+\d+ chars\]$', '', content).strip()
+            if len(content) < MIN_ARTICLE_CHARS:
+                counts['skipped'] += 1
+                continue
+
+            content_hash = hash_content(content)
+            row = existing.get(hashes[url])
+            if row is None:
+                row = existing[hashes[url]] = NewsArticle(url_hash=hashes[url], url=canonical_url(url))
+                db.session.add(row)
+                counts['new'] += 1
+            elif row.content_hash == content_hash:
+                # Still in the headlines: keep it fresh and retry a failed analysis
+                row.ingested_at = datetime.utcnow()
+                if row.analyzed_at is None:
+                    to_analyze.append(row)
+                continue
+            else:
+                counts['updated'] += 1
+            row.category = category
+            row.provider = article.get('provider')
+            row.title = article['title'][:255]
+            row.source = (article.get('source') or {}).get('name')
+            row.description = article.get('description')
+            row.image_url = article.get('urlToImage')
+            row.published_at = _parse_published(article.get('publishedAt'))
+            row.content = content
+            row.content_hash = content_hash
+            row.ingested_at = datetime.utcnow()
+            row.analyzed_at = None
+            to_analyze.append(row)
+        db.session.commit()
+
+        # The outputs are stored in the analysis cache under the content hash
+        for row in to_analyze:
+            try:
+                analysis_store.analyze(app, row.content, row.content_hash)
+            except Exception as e:
+                app.logger.error(f"Analysis of news article {row.id} failed: {str(e)}")
+                continue
+            row.analyzed_at = datetime.utcnow()
+            counts['analyzed'] += 1
+        db.session.commit()
+        return counts
+
+    def prune(self, app):
+        """Remove articles last pulled more than NEWS_INGEST_MAX_AGE_DAYS ago"""
+        cutoff = datetime.utcnow() - timedelta(days=app.config['NEWS_INGEST_MAX_AGE_DAYS'])
+        deleted = NewsArticle.query.filter(NewsArticle.ingested_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def latest(self, app, category, limit):
+        """
+        Return the newest analyzed articles of a category that were still in
+        the headlines within the last two intervals.
+
+        Returns:
+            list of NewsArticle, newest first (empty if the corpus is stale)
+        """
+        fresh_since = datetime.utcnow() - timedelta(seconds=2 * app.config['NEWS_INGEST_INTERVAL'])
+        return NewsArticle.query.filter(
+            NewsArticle.category == category,
+            NewsArticle.analyzed_at.isnot(None),
+            NewsArticle.ingested_at >= fresh_since
+        ).order_by(NewsArticle.published_at.desc(), NewsArticle.id.desc()).limit(limit).all()
+
+    def import_article(self, article, user_id):
+        """
+        Add a corpus article to a user's uploads, with its analysis result
+        when the analyzer outputs are in the analysis cache.
+
+        Returns:
+            tuple: (UploadedText, AnalysisResult or None if it must be analyzed)
+        """
+        upload = UploadedText(
+            user_id=user_id,
+            title=article.title,
+            content=article.content,
+            filename='news_article.txt',
+            file_type='text'
+        )
+        db.session.add(upload)
+        db.session.commit()
+
+        analysis_data = analysis_store.get(article.content_hash, list(ANALYZERS))
+        if len(analysis_data) < len(ANALYZERS):
+            return upload, None
+        result = save_or_update_analysis_result(upload.title, upload.content, user_id, upload.id,
+                                                analysis_data=analysis_data)
+        return upload, result
+
+
+# Shared instance, bound to the app in create_app()
+news_ingestor = NewsIngestor()
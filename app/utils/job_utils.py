@@ -0,0 +1,192 @@
+"""
+Background analysis jobs for uploaded texts
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+import threading
+import uuid
+from app import db
+from app.models import AnalysisJob, UploadedText
+from .analysis_utils import save_or_update_analysis_result
+from .cache_utils import analysis_store
+from .storage_utils import RESULT_TEXT_LENGTH, read_stored_preview
+
+
+class AnalysisJobQueue:
+    """
+    Runs the text analyzers for uploads on a local worker pool.
+
+    Jobs are rows in the analysis_job table, so their state survives restarts
+    and can be read by any worker process. A job is claimed with a conditional
+    UPDATE, which keeps two processes from running the same job.
+
+    Configuration:
+        ANALYSIS_JOB_WORKERS: Number of worker threads (default 2)
+        ANALYSIS_JOBS_EAGER: Run jobs inline in the request instead of the pool
+        ANALYSIS_JOB_LEASE: Seconds after which a running job is considered
+            abandoned by its process and may be run again (default 900)
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ANALYSIS_JOB_WORKERS', 2)
+        app.config.setdefault('ANALYSIS_JOBS_EAGER', False)
+        app.config.setdefault('ANALYSIS_JOB_LEASE', 15 * 60)
+        app.extensions['analysis_jobs'] = {'executor': None}
+
+    def _get_executor(self, app):
+        """Create the worker pool for this app on first use"""
+        state = app.extensions['analysis_jobs']
+        with self._lock:
+            if state['executor'] is None:
+                state['executor'] = ThreadPoolExecutor(
+                    max_workers=app.config['ANALYSIS_JOB_WORKERS'],
+                    thread_name_prefix='analysis-job'
+                )
+            return state['executor']
+
+    def enqueue(self, upload):
+        """
+        Queue an analysis job for an uploaded text.
+
+        Args:
+            upload: The UploadedText to analyze
+
+        Returns:
+            The new AnalysisJob (already committed)
+        """
+        job = AnalysisJob(user_id=upload.user_id, upload_id=upload.id)
+        db.session.add(job)
+        db.session.commit()
+
+        self._submit(current_app._get_current_object(), job.id)
+        return job
+
+    def enqueue_many(self, uploads):
+        """
+        Queue analysis jobs for many uploaded texts as one batch.
+
+        The jobs are inserted together and then spread over the worker pool,
+        so the uploads are analyzed in parallel.
+
+        Args:
+            uploads: The UploadedTexts to analyze (already committed)
+
+        Returns:
+            tuple: (batch id, list of AnalysisJob in the order of uploads)
+        """
+        batch_id = uuid.uuid4().hex
+        jobs = [AnalysisJob(user_id=upload.user_id, upload_id=upload.id, batch_id=batch_id)
+                for upload in uploads]
+        db.session.add_all(jobs)
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        for job in jobs:
+            self._submit(app, job.id)
+            # Reload the state on next access; the job may already have run
+            db.session.expire(job)
+        return batch_id, jobs
+
+    def requeue_pending(self, app):
+        """
+        Resubmit jobs left queued by a previous process, and running jobs
+        whose process has not finished them within ANALYSIS_JOB_LEASE.
+
+        Jobs that are running in a live process (e.g. another server worker
+        or the reloader's other process) are left alone. Queued jobs are
+        safe to resubmit: only the first worker to claim a job runs it.
+
+        Returns:
+            int: Number of jobs resubmitted
+        """
+        with app.app_context():
+            # Reclaim abandoned jobs with one conditional UPDATE, so two
+            # processes starting together cannot both reset the same job
+            stale_before = datetime.utcnow() - timedelta(seconds=app.config['ANALYSIS_JOB_LEASE'])
+            AnalysisJob.query.filter(
+                AnalysisJob.status == AnalysisJob.RUNNING,
+                AnalysisJob.started_at < stale_before
+            ).update({'status': AnalysisJob.QUEUED, 'started_at': None}, synchronize_session=False)
+            db.session.commit()
+            job_ids = [job_id for (job_id,) in db.session.query(AnalysisJob.id).filter(
+                AnalysisJob.status == AnalysisJob.QUEUED
+            )]
+
+        for job_id in job_ids:
+            self._submit(app, job_id)
+        return len(job_ids)
+
+    def shutdown(self, app, wait=True):
+        """Stop the worker pool of an app"""
+        state = app.extensions['analysis_jobs']
+        with self._lock:
+            executor, state['executor'] = state['executor'], None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _submit(self, app, job_id):
+        if app.config['ANALYSIS_JOBS_EAGER']:
+            self.run_job(app, job_id)
+        else:
+            self._get_executor(app).submit(self.run_job, app, job_id)
+
+    def run_job(self, app, job_id):
+        """Claim a queued job, run the analyzers and store the AnalysisResult"""
+        with app.app_context():
+            # Claim the job atomically so it is only ever run once
+            claimed = AnalysisJob.query.filter_by(id=job_id, status=AnalysisJob.QUEUED).update(
+                {'status': AnalysisJob.RUNNING, 'started_at': datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.session.commit()
+            if not claimed:
+                return
+
+            job = db.session.get(AnalysisJob, job_id)
+            try:
+                upload = db.session.get(UploadedText, job.upload_id)
+                if upload is None:
+                    raise ValueError(f"Upload {job.upload_id} no longer exists")
+
+                # Reuse stored outputs for this content; the missing analyzers
+                # run on the process pool when one is configured
+                if upload.is_stored:
+                    # Large files are analyzed from storage paragraph by paragraph,
+                    # and only their beginning is kept with the result for display
+                    analysis_data = analysis_store.analyze_stored(app, upload.content_path, upload.content_hash)
+                    content = read_stored_preview(upload.content_path, RESULT_TEXT_LENGTH)
+                else:
+                    analysis_data = analysis_store.analyze(app, upload.content, upload.content_hash)
+                    content = upload.content
+                result = save_or_update_analysis_result(
+                    upload.title or 'Untitled',
+                    content,
+                    upload.user_id,
+                    upload.id,
+                    analysis_data=analysis_data
+                )
+
+                job.analysis_id = result.id
+                job.status = AnalysisJob.DONE
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Analysis job {job_id} failed: {str(e)}")
+                job = db.session.get(AnalysisJob, job_id)
+                if job is not None:
+                    job.status = AnalysisJob.FAILED
+                    job.error = str(e)
+                    job.finished_at = datetime.utcnow()
+                    db.session.commit()
+
+
+# Shared queue instance, initialized in create_app()
+analysis_jobs = AnalysisJobQueue()
@@ -1,33 +1,8 @@
-import nltk
-from nltk import ne_chunk, pos_tag
-from nltk.tree import Tree
+from .document_utils import as_document
+from .nltk_utils import nltk_resources
 
-def download_nltk_resources():
-    """
-    Download NLTK resources needed for NER
-    """
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
-    
-    try:
-        nltk.data.find('taggers/maxent_treebank_pos_tagger')
-    except LookupError:
-        nltk.download('averaged_perceptron_tagger')
-    
-    try:
-        nltk.data.find('chunkers/maxent_ne_chunker')
-    except LookupError:
-        nltk.download('maxent_ne_chunker')
-        
-    try:
-        nltk.data.find('corpora/words')
-    except LookupError:
-        nltk.download('words')
-
-# Initialize NLTK resource download
-download_nltk_resources()
+# Bump when the output of the NER analyzer changes
+NER_VERSION = 2
 
 def perform_ner_analysis(text):
     """
@@ -35,31 +10,47 @@ def perform_ner_analysis(text):
     Returns identified named entities and their types
     
     Parameters:
-    text (str): Text to analyze
+    text (str or AnalyzedDocument): Text to analyze
     
     Returns:
     dict: Dictionary containing named entities and their types
     """
-    # Tokenize and POS tag the words
-    tokens = nltk.word_tokenize(text)
-    pos_tagged = nltk.pos_tag(tokens)
-    
-    # Apply NER chunking to the POS tagged text
-    ne_chunks = nltk.ne_chunk(pos_tagged)
+    pos_tagger = nltk_resources.get('pos_tagger')
+    ne_chunker = nltk_resources.get('ne_chunker')
     
     # Extract named entities
     named_entities = []
     
-    for chunk in ne_chunks:
-        if isinstance(chunk, Tree):
-            entity_type = chunk.label()
-            entity_text = ' '.join([word for word, tag in chunk.leaves()])
-            named_entities.append({
-                'text': entity_text,
-                'type': entity_type
-            })
+    # Reuse the shared tokens and tag each paragraph on its own, so a
+    # paragraph's entities do not depend on the text around it
+    for tokens in as_document(text).paragraph_tokens:
+        if not tokens:
+            continue
+        pos_tagged = pos_tagger.tag(tokens)
+        
+        # Apply NER chunking to the POS tagged text
+        for chunk in ne_chunker.parse(pos_tagged):
+            # Entity chunks are NLTK Trees; other tokens are (word, tag) tuples
+            if hasattr(chunk, 'label'):
+                entity_type = chunk.label()
+                entity_text = ' '.join([word for word, tag in chunk.leaves()])
+                named_entities.append({
+                    'text': entity_text,
+                    'type': entity_type
+                })
+    
+    return group_entities(named_entities)
+
+def group_entities(named_entities):
+    """
+    Group a list of named entities by type
+    
+    Parameters:
+    named_entities (list): Entities as {'text': ..., 'type': ...} dicts
     
-    # Group entities by type
+    Returns:
+    dict: Dictionary containing named entities and their types
+    """
     entity_types = {}
     for entity in named_entities:
         entity_type = entity['type']
@@ -72,4 +63,4 @@ def perform_ner_analysis(text):
     return {
         'entities': named_entities,
         'entity_types': entity_types
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,309 @@
+"""
+Caches for news API responses and extracted article bodies
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import ArticleCacheEntry
+from app.utils.http_utils import http_client
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ocid', 'cmpid', 'smid')
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# Columns a new download of a stored page replaces
+UPDATED_COLUMNS = ('content', 'etag', 'last_modified', 'fetched_at', 'validated_at', 'last_used_at')
+
+
+def canonical_url(url):
+    """
+    Normalize an article URL so that links to the same page compare equal:
+    lowercase scheme and host, no default port, fragment or tracking
+    parameters, and the remaining query parameters sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+def hash_url(url):
+    """Return the SHA-256 hex digest of a canonical URL"""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+class NewsResponseCache:
+    """
+    Short-lived in-memory cache of news API responses.
+
+    Responses are keyed by (endpoint, query, category, date window) and kept
+    for NEWS_CACHE_TTL seconds, so repeated searches and category clicks
+    within that time do not spend API quota. At most NEWS_CACHE_MAX_ENTRIES
+    responses are kept per process; the least recently used go first.
+
+    Configuration:
+        NEWS_CACHE_TTL: Seconds a response is reused (0 turns the cache off)
+        NEWS_CACHE_MAX_ENTRIES: Maximum number of responses kept
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('NEWS_CACHE_TTL', 300)
+        app.config.setdefault('NEWS_CACHE_MAX_ENTRIES', 256)
+        app.extensions['news_responses'] = {
+            'entries': OrderedDict(),
+            'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0
+        }
+
+    def get(self, app, key):
+        """Return the cached response body for a key, or None"""
+        state = app.extensions['news_responses']
+        with self._lock:
+            entry = state['entries'].get(key)
+            if entry is None:
+                state['misses'] += 1
+                return None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del state['entries'][key]
+                state['expired'] += 1
+                state['misses'] += 1
+                return None
+            state['entries'].move_to_end(key)
+            state['hits'] += 1
+            return data
+
+    def put(self, app, key, data):
+        """Cache a response body for NEWS_CACHE_TTL seconds"""
+        ttl = app.config['NEWS_CACHE_TTL']
+        if ttl <= 0:
+            return
+        state = app.extensions['news_responses']
+        with self._lock:
+            entries = state['entries']
+            entries[key] = (time.monotonic() + ttl, data)
+            entries.move_to_end(key)
+            while len(entries) > app.config['NEWS_CACHE_MAX_ENTRIES']:
+                entries.popitem(last=False)
+                state['evictions'] += 1
+
+    def clear(self, app):
+        with self._lock:
+            app.extensions['news_responses']['entries'].clear()
+
+    def stats(self, app):
+        """
+        Return the counters of this process.
+
+        Returns:
+            dict with hits, misses, expired, evictions, hit_rate and entries
+        """
+        state = app.extensions['news_responses']
+        with self._lock:
+            counters = {name: state[name] for name in ('hits', 'misses', 'expired', 'evictions')}
+            counters['entries'] = len(state['entries'])
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = round(counters['hits'] / lookups, 4) if lookups else 0.0
+        return counters
+
+
+class ArticleStore:
+    """
+    Extracted article bodies keyed by canonical URL, shared by all processes.
+
+    Entries live in the article_cache table together with the ETag and
+    Last-Modified headers of the page they came from. An entry younger than
+    ARTICLE_CACHE_FRESH_SECONDS is used as is; an older one is revalidated
+    with a conditional GET (If-None-Match / If-Modified-Since), so an
+    unchanged page costs a 304 response and no extraction. Pages nothing
+    could be extracted from are stored too, so they are not scraped again
+    and again. When the table grows past ARTICLE_CACHE_MAX_ENTRIES the least
+    recently used entries are evicted.
+    Hit and miss counters are kept per process and reported by stats().
+
+    Configuration:
+        ARTICLE_CACHE_ENABLED: Turn the store on or off (default True)
+        ARTICLE_CACHE_FRESH_SECONDS: Age under which an entry is not revalidated
+        ARTICLE_CACHE_MAX_ENTRIES: Maximum number of stored articles
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ARTICLE_CACHE_ENABLED', True)
+        app.config.setdefault('ARTICLE_CACHE_FRESH_SECONDS', 60 * 60)
+        app.config.setdefault('ARTICLE_CACHE_MAX_ENTRIES', 5000)
+        app.extensions['article_store'] = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evictions': 0}
+
+    def count(self, app, counter, amount=1):
+        with self._lock:
+            app.extensions['article_store'][counter] += amount
+
+    def stats(self, app):
+        """
+        Return the counters of this process and the store size.
+
+        Returns:
+            dict with hits (fresh entries), revalidated (304 responses), misses,
+            evictions, hit_rate and entries
+        """
+        with self._lock:
+            counters = dict(app.extensions['article_store'])
+        lookups = counters['hits'] + counters['revalidated'] + counters['misses']
+        hits = counters['hits'] + counters['revalidated']
+        counters['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        counters['entries'] = ArticleCacheEntry.query.count()
+        return counters
+
+    def is_fresh(self, app, entry):
+        age = datetime.utcnow() - entry.validated_at
+        return age < timedelta(seconds=app.config['ARTICLE_CACHE_FRESH_SECONDS'])
+
+    def load(self, app, urls):
+        """
+        Load the stored entries of several article URLs in one query.
+
+        Returns:
+            dict of url -> ArticleCacheEntry, for the URLs found
+        """
+        if not app.config['ARTICLE_CACHE_ENABLED'] or not urls:
+            return {}
+        hashes = {hash_url(canonical_url(url)): url for url in urls}
+        entries = ArticleCacheEntry.query.filter(ArticleCacheEntry.url_hash.in_(list(hashes))).all()
+        return {hashes[entry.url_hash]: entry for entry in entries}
+
+    def save(self, app, used, revalidated, fetched):
+        """
+        Record the outcome of a round of article downloads and evict old
+        entries if needed.
+
+        Args:
+            app: The Flask application whose configuration is used
+            used: Entries that were served from the store (fresh or revalidated)
+            revalidated: Entries whose page answered 304 Not Modified
+            fetched: dict of url -> (content, etag, last_modified) of downloaded pages
+        """
+        if not app.config['ARTICLE_CACHE_ENABLED']:
+            return
+        now = datetime.utcnow()
+        for entry in used:
+            entry.last_used_at = now
+            entry.hit_count = (entry.hit_count or 0) + 1
+        for entry in revalidated:
+            entry.validated_at = now
+
+        # Links to the same page share one entry; the last download wins
+        rows = {}
+        for url, (content, etag, last_modified) in fetched.items():
+            canonical = canonical_url(url)
+            rows[hash_url(canonical)] = {
+                'url_hash': hash_url(canonical), 'url': canonical, 'content': content, 'etag': etag,
+                'last_modified': last_modified, 'fetched_at': now, 'validated_at': now, 'last_used_at': now
+            }
+
+        make_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+        if rows and make_insert is not None:
+            # Pages another request stored first are overwritten, not rejected
+            table = ArticleCacheEntry.__table__
+            statement = make_insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=['url_hash'],
+                set_={column: statement.excluded[column] for column in UPDATED_COLUMNS}
+            )
+            db.session.execute(statement, list(rows.values()))
+        elif rows:
+            existing = {entry.url_hash: entry for entry in ArticleCacheEntry.query.filter(
+                ArticleCacheEntry.url_hash.in_(list(rows)))}
+            for url_hash, row in rows.items():
+                entry = existing.get(url_hash)
+                if entry is not None:
+                    for column in UPDATED_COLUMNS:
+                        setattr(entry, column, row[column])
+                    continue
+                # If another request stored the page first, only this entry is skipped
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(ArticleCacheEntry(**row))
+                except IntegrityError:
+                    pass
+        db.session.commit()
+
+        if fetched:
+            self._evict(app)
+
+    def _evict(self, app):
+        """Delete the least recently used entries beyond ARTICLE_CACHE_MAX_ENTRIES"""
+        max_entries = app.config['ARTICLE_CACHE_MAX_ENTRIES']
+        excess = ArticleCacheEntry.query.count() - max_entries
+        if excess <= 0:
+            return
+        oldest = db.session.query(ArticleCacheEntry.id).order_by(
+            ArticleCacheEntry.last_used_at
+        ).limit(excess).subquery()
+        deleted = ArticleCacheEntry.query.filter(
+            ArticleCacheEntry.id.in_(db.session.query(oldest.c.id))
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        self.count(app, 'evictions', deleted)
+
+
+def get_news_json(url, params, key, app=None, results_key='articles', **options):
+    """
+    GET a news API endpoint, reusing a recent response to the same request.
+
+    The raw body is cached rather than the parsed JSON, so callers may
+    modify the articles they get back. Only successful responses with
+    results are cached.
+
+    Args:
+        url: Endpoint URL
+        params: Query parameters, including the API key
+        key: Cache key, e.g. (provider, endpoint, query, category, date window)
+        app: The Flask application (default current_app)
+        results_key: Field of the response that holds the articles
+        **options: timeout, max_bytes or deadline for HttpClient.get()
+
+    Returns:
+        tuple: (HTTP status code, parsed JSON body)
+    """
+    if app is None:
+        app = current_app._get_current_object()
+    body = news_responses.get(app, key)
+    if body is not None:
+        return 200, json.loads(body)
+
+    response = http_client.get(url, params=params, app=app, **options)
+    data = response.json()
+    if response.status_code == 200 and isinstance(data, dict) and data.get(results_key):
+        news_responses.put(app, key, response.content)
+    return response.status_code, data
+
+
+# Shared instances, bound to the app in create_app()
+news_responses = NewsResponseCache()
+article_store = ArticleStore()
@@ -0,0 +1,469 @@
+"""
+News search across several providers, with hedged requests and circuit breakers
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+import threading
+import time
+from flask import current_app
+import requests
+from app.utils.news_cache import canonical_url, get_news_json
+
+# Placeholder keys from the example configuration
+PLACEHOLDER_KEYS = ('', 'your-news-api-key-here')
+
+FANOUT_MODES = ('hedged', 'all')
+
+
+class ProviderError(Exception):
+    """A provider answered with an error or could not be reached"""
+
+
+class NewsProvider:
+    """
+    One news API. Subclasses build its requests and turn its articles into
+    the NewsAPI article format the news routes already use:
+    title, source.name, url, publishedAt, description, content, urlToImage.
+    """
+    name = None
+    key_config = None
+    default_url = None
+    results_key = 'articles'
+
+    def api_key(self, config):
+        key = config.get(self.key_config) or ''
+        return None if key in PLACEHOLDER_KEYS else key
+
+    def base_url(self, config):
+        return config['NEWS_PROVIDER_URLS'].get(self.name, self.default_url).rstrip('/')
+
+    def search_request(self, query, from_date, limit, api_key):
+        """Return (path, params) of a search over recent articles"""
+        raise NotImplementedError
+
+    def headlines_request(self, category, limit, api_key):
+        """Return (path, params) of the top headlines of a category"""
+        raise NotImplementedError
+
+    def error_message(self, data):
+        """Return the error in a response body, or None if it is a success"""
+        if not isinstance(data, dict):
+            return 'Unexpected response'
+        if data.get('status') == 'error':
+            return data.get('message') or 'Unknown error'
+        return None
+
+    def normalize(self, item):
+        return item
+
+
+class NewsAPIProvider(NewsProvider):
+    name = 'newsapi'
+    key_config = 'NEWS_API_KEY'
+    default_url = 'https://newsapi.org'
+
+    def search_request(self, query, from_date, limit, api_key):
+        return '/v2/everything', {
+            'q': query,
+            'from': from_date,
+            'sortBy': 'relevancy',
+            'language': 'en',
+            'apiKey': api_key,
+            'pageSize': limit
+        }
+
+    def headlines_request(self, category, limit, api_key):
+        params = {'country': 'us', 'apiKey': api_key, 'pageSize': limit}
+        if category != 'general':
+            params['category'] = category
+        return '/v2/top-headlines', params
+
+
+class GNewsProvider(NewsProvider):
+    name = 'gnews'
+    key_config = 'GNEWS_API_KEY'
+    default_url = 'https://gnews.io'
+
+    def search_request(self, query, from_date, limit, api_key):
+        return '/api/v4/search', {
+            'q': query,
+            'from': f'{from_date}T00:00:00Z',
+            'sortby': 'relevance',
+            'lang': 'en',
+            'apikey': api_key,
+            'max': limit
+        }
+
+    def headlines_request(self, category, limit, api_key):
+        return '/api/v4/top-headlines', {
+            'category': category,
+            'country': 'us',
+            'lang': 'en',
+            'apikey': api_key,
+            'max': limit
+        }
+
+    def error_message(self, data):
+        if isinstance(data, dict) and data.get('errors'):
+            errors = data['errors']
+            return '; '.join(errors) if isinstance(errors, list) else str(errors)
+        return super().error_message(data)
+
+    def normalize(self, item):
+        return {
+            'title': item.get('title', ''),
+            'source': {'name': (item.get('source') or {}).get('name', 'Unknown')},
+            'url': item.get('url'),
+            'publishedAt': item.get('publishedAt', ''),
+            'description': item.get('description', ''),
+            'content': item.get('content', ''),
+            'urlToImage': item.get('image', '')
+        }
+
+
+class NewsDataProvider(NewsProvider):
+    name = 'newsdata'
+    key_config = 'NEWSDATA_API_KEY'
+    default_url = 'https://newsdata.io'
+    results_key = 'results'
+
+    # NewsData calls the general category 'top'
+    CATEGORIES = {'general': 'top'}
+
+    # Placeholder NewsData returns in place of paid-plan fields
+    PAID_PLAN_ONLY = 'ONLY AVAILABLE IN PAID PLANS'
+
+    def search_request(self, query, from_date, limit, api_key):
+        return '/api/1/news', {'q': query, 'language': 'en', 'apikey': api_key, 'size': limit}
+
+    def headlines_request(self, category, limit, api_key):
+        return '/api/1/news', {
+            'category': self.CATEGORIES.get(category, category),
+            'country': 'us',
+            'language': 'en',
+            'apikey': api_key,
+            'size': limit
+        }
+
+    def error_message(self, data):
+        if isinstance(data, dict) and data.get('status') == 'error':
+            results = data.get('results')
+            return (results or {}).get('message', 'Unknown error') if isinstance(results, dict) else 'Unknown error'
+        return super().error_message(data)
+
+    def normalize(self, item):
+        published = item.get('pubDate') or ''
+        try:
+            # pubDate is 'YYYY-MM-DD HH:MM:SS' in UTC
+            published = datetime.strptime(published, '%Y-%m-%d %H:%M:%S').strftime('%Y-%m-%dT%H:%M:%SZ')
+        except ValueError:
+            pass
+        content = item.get('content') or ''
+        description = item.get('description') or ''
+        return {
+            'title': item.get('title', ''),
+            'source': {'name': item.get('source_name') or item.get('source_id') or 'Unknown'},
+            'url': item.get('link'),
+            'publishedAt': published,
+            'description': '' if description == self.PAID_PLAN_ONLY else description,
+            'content': '' if content == self.PAID_PLAN_ONLY else content,
+            'urlToImage': item.get('image_url') or ''
+        }
+
+
+PROVIDERS = {provider.name: provider for provider in (NewsAPIProvider(), GNewsProvider(), NewsDataProvider())}
+
+
+class CircuitBreaker:
+    """
+    Skips a provider while it is unhealthy.
+
+    After NEWS_BREAKER_FAILURES failures in a row the breaker opens and the
+    provider is not asked for NEWS_BREAKER_COOLDOWN seconds. Then one trial
+    request is let through (half open): a success closes the breaker, a
+    failure opens it for another cooldown. A trial that is never sent
+    (cancelled before it ran) is given back with release().
+    """
+
+    def __init__(self, failures, cooldown):
+        self._lock = threading.Lock()
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.trial or time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """True if a request may be sent now; reserves the trial request when half open"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial:
+                self.trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.max_failures:
+                self.opened_at = time.monotonic()
+            self.trial = False
+
+    def release(self):
+        """Give back a trial request that was reserved but not sent"""
+        with self._lock:
+            self.trial = False
+
+    def to_dict(self):
+        with self._lock:
+            retry_in = None
+            if self.state == 'open':
+                retry_in = round(self.cooldown - (time.monotonic() - self.opened_at), 1)
+            return {'state': self.state, 'failures': self.failures, 'retry_in': retry_in}
+
+
+class NewsAggregator:
+    """
+    Searches the configured news providers concurrently.
+
+    Providers are used in NEWS_PROVIDERS order if their API key is set. In
+    'hedged' mode the first provider is asked alone; if it has not answered
+    after NEWS_HEDGE_DELAY seconds, or fails, the next one is asked too, and
+    the first successful answer is used. In 'all' mode every provider is
+    asked at once and the answers that arrive within NEWS_FANOUT_DEADLINE
+    are merged, taking articles from each provider in turn and dropping
+    repeats of the same canonical URL. A provider whose circuit breaker is
+    open is skipped.
+
+    Configuration:
+        NEWS_PROVIDERS: Provider names in order of preference
+        NEWS_PROVIDER_URLS: dict of provider name -> base URL (for stand-in servers)
+        NEWS_FANOUT_MODE: 'hedged' or 'all'
+        NEWS_HEDGE_DELAY: Seconds before the next provider is asked in hedged mode
+        NEWS_PROVIDER_TIMEOUT: Timeout of one provider request, in seconds
+        NEWS_FANOUT_DEADLINE: Seconds a request waits for providers in total
+        NEWS_BREAKER_FAILURES: Failures in a row that open a provider's breaker
+        NEWS_BREAKER_COOLDOWN: Seconds a provider is skipped once its breaker opens
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('NEWS_PROVIDERS', ['newsapi', 'gnews', 'newsdata'])
+        app.config.setdefault('NEWS_PROVIDER_URLS', {})
+        app.config.setdefault('NEWS_FANOUT_MODE', 'hedged')
+        app.config.setdefault('NEWS_HEDGE_DELAY', 1.5)
+        app.config.setdefault('NEWS_PROVIDER_TIMEOUT', 6)
+        app.config.setdefault('NEWS_FANOUT_DEADLINE', 8)
+        app.config.setdefault('NEWS_BREAKER_FAILURES', 3)
+        app.config.setdefault('NEWS_BREAKER_COOLDOWN', 60)
+        app.extensions['news_providers'] = {'executor': None, 'breakers': {}}
+
+    def _get_executor(self, app):
+        """Create the provider request pool for this app on first use"""
+        state = app.extensions['news_providers']
+        with self._lock:
+            if state['executor'] is None:
+                state['executor'] = ThreadPoolExecutor(
+                    max_workers=max(2, 2 * len(PROVIDERS)),
+                    thread_name_prefix='news-provider'
+                )
+            return state['executor']
+
+    def shutdown(self, app, wait=True):
+        """Stop the provider request pool of an app"""
+        state = app.extensions['news_providers']
+        with self._lock:
+            executor, state['executor'] = state['executor'], None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _breaker(self, app, name):
+        breakers = app.extensions['news_providers']['breakers']
+        with self._lock:
+            breaker = breakers.get(name)
+            if breaker is None:
+                breaker = breakers[name] = CircuitBreaker(app.config['NEWS_BREAKER_FAILURES'],
+                                                          app.config['NEWS_BREAKER_COOLDOWN'])
+            return breaker
+
+    def configured(self, app):
+        """Return the providers that have an API key, in order of preference"""
+        return [PROVIDERS[name] for name in app.config['NEWS_PROVIDERS']
+                if name in PROVIDERS and PROVIDERS[name].api_key(app.config)]
+
+    def stats(self, app):
+        """Return the circuit breaker state of every configured provider"""
+        return {provider.name: self._breaker(app, provider.name).to_dict() for provider in self.configured(app)}
+
+    def search(self, query, from_date, limit):
+        """
+        Search recent articles.
+
+        Returns:
+            dict: articles (NewsAPI format, with the provider of each), the
+            providers answered and errors by provider
+        """
+        key = ('everything', query, None, from_date)
+        return self._gather('search_request', (query, from_date, limit), key, limit)
+
+    def top_headlines(self, category, date, limit):
+        """Return the top headlines of a category; see search()"""
+        key = ('top-headlines', None, category, date)
+        return self._gather('headlines_request', (category, limit), key, limit)
+
+    def _request(self, app, provider, method, args, key, ends_at):
+        """
+        Ask one provider; runs on the pool and records the outcome on its
+        breaker, whatever the outcome, so a half-open trial is always settled.
+        """
+        config = app.config
+        breaker = self._breaker(app, provider.name)
+        succeeded = False
+        try:
+            path, params = getattr(provider, method)(*args, provider.api_key(config))
+            status_code, data = get_news_json(
+                provider.base_url(config) + path, params, (provider.name,) + key, app=app,
+                results_key=provider.results_key, timeout=config['NEWS_PROVIDER_TIMEOUT'], deadline=ends_at
+            )
+            message = provider.error_message(data)
+            if status_code != 200 or message:
+                raise ProviderError(f'{status_code}: {message or "Unknown error"}')
+            articles = []
+            for item in data.get(provider.results_key) or []:
+                article = provider.normalize(item)
+                article['provider'] = provider.name
+                articles.append(article)
+            succeeded = True
+            return articles
+        except (requests.RequestException, ValueError, ProviderError) as e:
+            app.logger.warning(f"News provider {provider.name} failed: {str(e)}")
+            raise ProviderError(str(e)) from e
+        except Exception as e:
+            app.logger.error(f"News provider {provider.name} failed unexpectedly: {str(e)}")
+            raise ProviderError(f'Unexpected error: {str(e)}') from e
+        finally:
+            if succeeded:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+    def _gather(self, method, args, key, limit):
+        app = current_app._get_current_object()
+        config = app.config
+        mode = config['NEWS_FANOUT_MODE']
+        if mode not in FANOUT_MODES:
+            raise ValueError(f"NEWS_FANOUT_MODE must be one of {', '.join(FANOUT_MODES)}")
+
+        waiting = self.configured(app)
+        results = {}
+        errors = {}
+        ends_at = time.monotonic() + config['NEWS_FANOUT_DEADLINE']
+        executor = self._get_executor(app)
+        in_flight = {}
+
+        def ask_next():
+            # Send the next provider whose breaker lets a request through
+            while waiting:
+                provider = waiting.pop(0)
+                breaker = self._breaker(app, provider.name)
+                if breaker.allow():
+                    try:
+                        future = executor.submit(self._request, app, provider, method, args, key, ends_at)
+                    except RuntimeError as e:
+                        # The pool is shutting down
+                        breaker.release()
+                        errors[provider.name] = str(e)
+                        continue
+                    # A request cancelled before it ran gives its trial back
+                    future.add_done_callback(lambda future, breaker=breaker: future.cancelled() and breaker.release())
+                    in_flight[future] = provider
+                    return True
+                errors[provider.name] = 'Skipped: provider is failing (circuit open)'
+            return False
+
+        ask_next()
+        if mode == 'all':
+            while ask_next():
+                pass
+        while in_flight:
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                break
+            timeout = min(remaining, config['NEWS_HEDGE_DELAY']) if mode == 'hedged' and waiting else remaining
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Hedge: the providers asked so far are slow, ask one more
+                ask_next()
+                continue
+            for future in done:
+                provider = in_flight.pop(future)
+                try:
+                    results[provider.name] = future.result()
+                except ProviderError as e:
+                    errors[provider.name] = str(e)
+            if mode == 'hedged':
+                if results:
+                    break
+                # A failure is not worth waiting out the hedge delay for
+                ask_next()
+        for future, provider in in_flight.items():
+            # Late answers still update the breakers, but are not waited for
+            future.cancel()
+            errors.setdefault(provider.name, 'No answer before the deadline')
+
+        return {
+            'articles': merge_articles([results[name] for name in config['NEWS_PROVIDERS'] if name in results], limit),
+            'providers': [name for name in config['NEWS_PROVIDERS'] if name in results],
+            'errors': errors
+        }
+
+
+def merge_articles(article_lists, limit):
+    """
+    Interleave the articles of several providers, best first from each,
+    dropping articles whose canonical URL was already taken.
+    """
+    merged = []
+    seen = set()
+    for rank in range(max((len(articles) for articles in article_lists), default=0)):
+        for articles in article_lists:
+            if rank >= len(articles):
+                continue
+            article = articles[rank]
+            url = article.get('url')
+            try:
+                identity = canonical_url(url) if url else (article.get('title') or '').strip().lower()
+            except ValueError:
+                identity = url
+            if identity in seen:
+                continue
+            seen.add(identity)
+            merged.append(article)
+            if len(merged) >= limit:
+                return merged
+    return merged
+
+
+# Shared instance, bound to the app in create_app()
+news_providers = NewsAggregator()
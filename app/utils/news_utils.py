@@ -0,0 +1,258 @@
+"""
+Concurrent fetching of full news articles
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
+import time
+from urllib.parse import urlsplit
+from flask import current_app
+import requests
+from app.utils.extract_utils import extract_article_content
+from app.utils.http_utils import http_client
+from app.utils.news_cache import article_store
+
+# NewsAPI cuts article content to about 200 characters and appends "[+N chars]"
+TRUNCATED_CONTENT_LENGTH = 500
+
+
+def needs_full_content(content):
+    """True if an article's content from the news API is missing or truncated"""
+    return not content or len(content) < TRUNCATED_CONTENT_LENGTH or '[+' in content
+
+
+class ArticleFetcher:
+    """
+    Downloads article pages in parallel on a shared thread pool.
+
+    A search needs the full text of up to ten articles, often from slow news
+    sites. fetch_pages() downloads all of them at once and waits at most
+    ARTICLE_FETCH_DEADLINE seconds in total, returning the pages that arrived
+    in time; the rest of the articles keep the content the news API gave.
+    No more than ARTICLE_FETCH_PER_HOST downloads run against one site at a
+    time, across all requests of the process.
+
+    Configuration:
+        ARTICLE_FETCH_WORKERS: Number of download threads shared by all requests
+        ARTICLE_FETCH_PER_HOST: Concurrent downloads per host
+        ARTICLE_FETCH_TIMEOUT: Connect and read timeout of one download, in seconds
+        ARTICLE_FETCH_DEADLINE: Seconds a request waits for all of its downloads
+        ARTICLE_FETCH_MAX_BYTES: Largest article page downloaded; bigger ones are abandoned
+        ARTICLE_EXTRACT_BACKEND: HTML parser for extraction, 'lxml' or 'html.parser' (None picks the fastest installed)
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ARTICLE_FETCH_WORKERS', 16)
+        app.config.setdefault('ARTICLE_FETCH_PER_HOST', 2)
+        app.config.setdefault('ARTICLE_FETCH_TIMEOUT', 5)
+        app.config.setdefault('ARTICLE_FETCH_DEADLINE', 8)
+        app.config.setdefault('ARTICLE_FETCH_MAX_BYTES', 2 * 1024 * 1024)
+        app.config.setdefault('ARTICLE_EXTRACT_BACKEND', None)
+        app.extensions['article_fetcher'] = {'executor': None}
+
+    def _get_executor(self, app):
+        """Create the download pool for this app on first use"""
+        state = app.extensions['article_fetcher']
+        with self._lock:
+            if state['executor'] is None:
+                state['executor'] = ThreadPoolExecutor(
+                    max_workers=app.config['ARTICLE_FETCH_WORKERS'],
+                    thread_name_prefix='article-fetch'
+                )
+            return state['executor']
+
+    def _host_slot(self, host, limit):
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(limit)
+            return slot
+
+    def shutdown(self, app, wait=True):
+        """Stop the download pool of an app"""
+        state = app.extensions['article_fetcher']
+        with self._lock:
+            executor, state['executor'] = state['executor'], None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _get(self, app, url, ends_at, timeout, per_host, headers=None):
+        """Send one GET request, or return None if it failed or missed the deadline"""
+        slot = self._host_slot(urlsplit(url).hostname or '', per_host)
+        if not slot.acquire(timeout=max(0, ends_at - time.monotonic())):
+            return None
+        try:
+            return http_client.get(url, headers=headers, timeout=timeout,
+                                   max_bytes=app.config['ARTICLE_FETCH_MAX_BYTES'], deadline=ends_at, app=app)
+        except requests.RequestException as e:
+            app.logger.error(f"Error fetching full article: {str(e)}")
+            return None
+        finally:
+            slot.release()
+
+    def _fetch(self, app, url, ends_at, timeout, per_host):
+        """Download one page, or return None if it failed or missed the deadline"""
+        response = self._get(app, url, ends_at, timeout, per_host)
+        if response is None:
+            return None
+        if response.status_code != 200:
+            app.logger.info(f"Article fetch returned {response.status_code}: {url}")
+            return None
+        return response.text
+
+    def _fetch_article(self, app, url, validators, ends_at, timeout, per_host):
+        """
+        Download and extract one article, revalidating a stored copy if there is one.
+
+        Args:
+            validators: (etag, last_modified) of the stored copy, or None
+
+        Returns:
+            tuple: ('not_modified', None) or ('fetched', (content, etag, last_modified)),
+            or None if the download failed
+        """
+        headers = {}
+        if validators is not None:
+            etag, last_modified = validators
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        response = self._get(app, url, ends_at, timeout, per_host, headers)
+        if response is None:
+            return None
+        if response.status_code == 304 and validators is not None:
+            return 'not_modified', None
+        if response.status_code != 200:
+            app.logger.info(f"Article fetch returned {response.status_code}: {url}")
+            return None
+        try:
+            content = extract_article_content(response.text, app.config['ARTICLE_EXTRACT_BACKEND'])
+        except Exception as e:
+            app.logger.error(f"Error extracting full article: {str(e)}")
+            content = None
+        return 'fetched', (content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    def fetch_pages(self, urls, deadline=None):
+        """
+        Download the HTML of several article pages concurrently.
+
+        Args:
+            urls: Article URLs (duplicates are fetched once)
+            deadline: Seconds to wait in total (default ARTICLE_FETCH_DEADLINE)
+
+        Returns:
+            dict of url -> HTML for the pages downloaded before the deadline
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            return {}
+
+        app = current_app._get_current_object()
+        config = app.config
+        deadline = config['ARTICLE_FETCH_DEADLINE'] if deadline is None else deadline
+        ends_at = time.monotonic() + deadline
+        executor = self._get_executor(app)
+        futures = {
+            executor.submit(self._fetch, app, url, ends_at, config['ARTICLE_FETCH_TIMEOUT'],
+                            config['ARTICLE_FETCH_PER_HOST']): url
+            for url in urls
+        }
+
+        done, pending = wait(futures, timeout=max(0, ends_at - time.monotonic()))
+        for future in pending:
+            # Downloads still queued are dropped; running ones finish in the background
+            future.cancel()
+        if pending:
+            app.logger.warning(f"Article fetch deadline of {deadline}s passed with {len(pending)} of {len(urls)} pending")
+
+        return {futures[future]: future.result() for future in done if future.result() is not None}
+
+    def fetch_articles(self, urls, deadline=None):
+        """
+        Get the extracted text of several articles, from the article store
+        where possible and by concurrent downloads otherwise.
+
+        Stored articles younger than ARTICLE_CACHE_FRESH_SECONDS are used
+        without touching the network. Older ones are revalidated with a
+        conditional GET, and a 304 response keeps the stored text. If a
+        download fails, a stale stored copy is still used.
+
+        Args:
+            urls: Article URLs (duplicates are fetched once)
+            deadline: Seconds to wait in total (default ARTICLE_FETCH_DEADLINE)
+
+        Returns:
+            dict of url -> article text, for the articles with text available
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            return {}
+
+        app = current_app._get_current_object()
+        stored = article_store.load(app, urls)
+        articles = {}
+        used = []
+        pending = []
+        for url in urls:
+            entry = stored.get(url)
+            if entry is not None and article_store.is_fresh(app, entry):
+                used.append(entry)
+                if entry.content:
+                    articles[url] = entry.content
+            else:
+                pending.append(url)
+        article_store.count(app, 'hits', len(used))
+
+        revalidated = []
+        fetched = {}
+        if pending:
+            config = app.config
+            deadline = config['ARTICLE_FETCH_DEADLINE'] if deadline is None else deadline
+            ends_at = time.monotonic() + deadline
+            executor = self._get_executor(app)
+            validators = {url: (entry.etag, entry.last_modified) for url, entry in stored.items()}
+            futures = {
+                executor.submit(self._fetch_article, app, url, validators.get(url), ends_at,
+                                config['ARTICLE_FETCH_TIMEOUT'], config['ARTICLE_FETCH_PER_HOST']): url
+                for url in pending
+            }
+            done, not_done = wait(futures, timeout=max(0, ends_at - time.monotonic()))
+            for future in not_done:
+                future.cancel()
+            if not_done:
+                app.logger.warning(f"Article fetch deadline of {deadline}s passed with {len(not_done)} of {len(pending)} pending")
+
+            for future in done:
+                url = futures[future]
+                outcome = future.result()
+                if outcome is None:
+                    continue
+                status, result = outcome
+                if status == 'not_modified':
+                    revalidated.append(stored[url])
+                else:
+                    fetched[url] = result
+                    if result[0]:
+                        articles[url] = result[0]
+
+            # Revalidated and stale entries are still better than the API's excerpt
+            for url in pending:
+                entry = stored.get(url)
+                if url not in fetched and entry is not None and entry.content:
+                    articles[url] = entry.content
+            article_store.count(app, 'revalidated', len(revalidated))
+            article_store.count(app, 'misses', len(pending) - len(revalidated))
+
+        article_store.save(app, used + revalidated, revalidated, fetched)
+        return articles
+
+
+# Shared instance, bound to the app in create_app()
+article_fetcher = ArticleFetcher()
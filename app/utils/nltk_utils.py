@@ -0,0 +1,212 @@
+"""
+Central, lazy access to the NLTK data and models used by the analyzers
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+# Resource name -> NLTK data path checked for it and the package that provides it
+RESOURCES = OrderedDict([
+    ('punkt', ('tokenizers/punkt', 'punkt')),
+    ('stopwords', ('corpora/stopwords', 'stopwords')),
+    ('vader_lexicon', ('sentiment/vader_lexicon.zip', 'vader_lexicon')),
+    ('averaged_perceptron_tagger', ('taggers/averaged_perceptron_tagger', 'averaged_perceptron_tagger')),
+    ('maxent_ne_chunker', ('chunkers/maxent_ne_chunker', 'maxent_ne_chunker')),
+    ('words', ('corpora/words', 'words')),
+])
+
+# Model name -> NLTK resources it needs
+MODEL_RESOURCES = {
+    'word_tokenizer': [],
+    'sentence_tokenizer': ['punkt'],
+    'stop_words': ['stopwords'],
+    'sentiment_analyzer': ['vader_lexicon'],
+    'pos_tagger': ['averaged_perceptron_tagger'],
+    'ne_chunker': ['maxent_ne_chunker', 'words'],
+}
+
+
+def _load_word_tokenizer():
+    # Same word tokenizer that nltk.word_tokenize applies to each sentence
+    from nltk.tokenize.destructive import NLTKWordTokenizer
+    return NLTKWordTokenizer()
+
+
+def _load_sentence_tokenizer():
+    # The Punkt model nltk.sent_tokenize uses for English
+    import nltk.data
+    return nltk.data.load('tokenizers/punkt/english.pickle')
+
+
+def _load_stop_words():
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+
+def _load_sentiment_analyzer():
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+
+def _load_pos_tagger():
+    # nltk.pos_tag builds a new tagger (and reloads its model) on every call
+    from nltk.tag.perceptron import PerceptronTagger
+    return PerceptronTagger()
+
+
+def _load_ne_chunker():
+    # The chunker nltk.ne_chunk uses for multiclass entity labels
+    import nltk.data
+    from nltk.chunk import _MULTICLASS_NE_CHUNKER
+    return nltk.data.load(_MULTICLASS_NE_CHUNKER)
+
+
+_LOADERS = OrderedDict([
+    ('word_tokenizer', _load_word_tokenizer),
+    ('sentence_tokenizer', _load_sentence_tokenizer),
+    ('stop_words', _load_stop_words),
+    ('sentiment_analyzer', _load_sentiment_analyzer),
+    ('pos_tagger', _load_pos_tagger),
+    ('ne_chunker', _load_ne_chunker),
+])
+
+
+class NLTKResources:
+    """
+    Loads each NLTK model the first time an analyzer asks for it.
+
+    Importing the analyzers no longer touches NLTK data or the network. The
+    locally installed data is checked once per process, when the first model
+    is loaded, and missing packages are only downloaded if NLTK_AUTO_DOWNLOAD
+    is set. warm_up() loads every model up front, e.g. before a pre-fork
+    server forks its workers.
+
+    Configuration:
+        NLTK_AUTO_DOWNLOAD: Download missing NLTK packages on first use (default False)
+        NLTK_WARM_UP: Load all models when the app is created (default False)
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.RLock()
+        self._models = {}
+        self._missing = None
+        self.auto_download = False
+        self.load_times = OrderedDict()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('NLTK_AUTO_DOWNLOAD', False)
+        app.config.setdefault('NLTK_WARM_UP', False)
+        self.auto_download = app.config['NLTK_AUTO_DOWNLOAD']
+
+        @app.cli.command('download-nltk-data')
+        def download_nltk_data():
+            """Download the NLTK data used by the text analyzers."""
+            for package in self.download():
+                print(f"Downloaded {package}")
+            print("All NLTK data is installed.")
+
+        if app.config['NLTK_WARM_UP']:
+            self.warm_up()
+
+    def missing(self):
+        """
+        Return the resources that are not installed locally (checked once).
+
+        Returns:
+            list of resource names
+        """
+        with self._lock:
+            if self._missing is None:
+                import nltk.data
+                self._missing = []
+                for name, (path, package) in RESOURCES.items():
+                    try:
+                        nltk.data.find(path)
+                    except LookupError:
+                        self._missing.append(name)
+            return list(self._missing)
+
+    def download(self, names=None):
+        """
+        Download missing NLTK packages.
+
+        Args:
+            names: Optional resource names to download (default: all missing)
+
+        Returns:
+            list of the packages that were downloaded
+        """
+        import nltk
+        wanted = [name for name in self.missing() if names is None or name in names]
+        downloaded = []
+        with self._lock:
+            for name in wanted:
+                package = RESOURCES[name][1]
+                if not nltk.download(package, quiet=True):
+                    raise LookupError(f"Could not download NLTK package '{package}'")
+                downloaded.append(package)
+            # Check the installed data again on next use
+            self._missing = None
+        return downloaded
+
+    def require(self, names=None):
+        """
+        Make sure NLTK resources are installed, downloading them if allowed.
+
+        Args:
+            names: Optional resource names to check (default: all of them)
+
+        Raises:
+            LookupError: If a resource is missing and NLTK_AUTO_DOWNLOAD is off
+        """
+        missing = [name for name in self.missing() if names is None or name in names]
+        if not missing:
+            return
+        if self.auto_download:
+            self.download(missing)
+            return
+        packages = ', '.join(RESOURCES[name][1] for name in missing)
+        raise LookupError(
+            f"NLTK data not installed: {packages}. Run 'flask download-nltk-data' to install it."
+        )
+
+    def get(self, model):
+        """
+        Return a loaded NLTK model, loading it on first use.
+
+        Args:
+            model: One of word_tokenizer, sentence_tokenizer, stop_words,
+                sentiment_analyzer, pos_tagger or ne_chunker
+
+        Raises:
+            LookupError: If the data the model needs is not installed
+        """
+        loaded = self._models.get(model)
+        if loaded is not None:
+            return loaded
+
+        with self._lock:
+            if model not in self._models:
+                self.require(MODEL_RESOURCES[model])
+                started = time.perf_counter()
+                self._models[model] = _LOADERS[model]()
+                self.load_times[model] = time.perf_counter() - started
+            return self._models[model]
+
+    def warm_up(self):
+        """
+        Load every model now instead of on first use.
+
+        Returns:
+            dict of model name -> seconds it took to load
+        """
+        for model in _LOADERS:
+            self.get(model)
+        return dict(self.load_times)
+
+
+# Shared resource manager, configured in create_app()
+nltk_resources = NLTKResources()
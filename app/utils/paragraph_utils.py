@@ -0,0 +1,308 @@
+"""
+Per-paragraph partial analyses that merge into whole-document results
+"""
+
+from collections import Counter
+import hashlib
+from operator import itemgetter
+from .document_utils import AnalyzedDocument, get_stop_words, split_paragraphs
+from .ngram_utils import MULTIPLE_NGRAMS, NGRAM_TOP_K, NGRAM_VERSION, format_ngrams
+from .word_frequency_utils import WORD_FREQUENCY_TOP_K, WORD_FREQUENCY_VERSION, format_word_frequency
+from .ner_utils import NER_VERSION, group_entities, perform_ner_analysis
+from .sentiment_utils import SENTIMENT_VERSION, TIMELINE_WINDOW, sentiment_summary, sentiment_totals, totals_scores
+from .sketch_utils import HyperLogLog, SpaceSaving
+
+# Bump when the format of a paragraph partial changes
+PARAGRAPH_VERSION = 4
+
+# Most n-grams, non-stopwords and entity mentions kept in a paragraph partial
+PARAGRAPH_TOP_K = 2000
+
+# Analyzers whose output can be merged from paragraph partials, and the
+# versions a stored partial must have been built with
+PARAGRAPH_ANALYZERS = ('ngram_data', 'word_freq_data', 'ner_data')
+PARAGRAPH_PARAMS = {
+    'ngram_data': NGRAM_VERSION,
+    'word_freq_data': WORD_FREQUENCY_VERSION,
+    'ner_data': NER_VERSION,
+    'sentiment_data': SENTIMENT_VERSION,
+    'ngram_top_k': NGRAM_TOP_K,
+    'word_freq_top_k': WORD_FREQUENCY_TOP_K,
+    'paragraph_top_k': PARAGRAPH_TOP_K
+}
+
+# N-grams can span a paragraph break by at most this many tokens on each side
+_EDGE = max(n for _, n in MULTIPLE_NGRAMS) - 1
+
+
+def hash_paragraph(paragraph):
+    """Return the SHA-256 of a paragraph"""
+    return hashlib.sha256(paragraph.encode('utf-8')).hexdigest()
+
+
+def analyze_paragraph(paragraph):
+    """
+    Build the mergeable partial result of one paragraph.
+
+    Counts are kept in order of first occurrence, so that merging partials
+    in paragraph order gives the same counts and the same tie order as
+    counting the whole document at once. Each n-gram table keeps its
+    PARAGRAPH_TOP_K largest counts and the word table its PARAGRAPH_TOP_K
+    largest non-stopword counts (plus the stopwords); the largest dropped
+    count of each table is kept in dropped, and bounds how far the merged
+    counts can be off. Only the first PARAGRAPH_TOP_K entity mentions are kept.
+
+    Returns:
+        dict with ngrams, head, tail, words, total_words, dropped, entities,
+        entities_dropped, sentence_scores and sentiment
+    """
+    document = AnalyzedDocument(paragraph)
+    counts = document.token_counts
+    tokens = counts.cleaned_words
+    ngram_ids = counts.ngram_ids
+    entities = perform_ner_analysis(document)['entities']
+    sentiment, sentence_scores = sentiment_totals(document)
+
+    ngrams, dropped = {}, {}
+    for _, n in MULTIPLE_NGRAMS:
+        ngrams[str(n)], dropped[str(n)] = _top_counts(
+            [(' '.join(gram), count) for gram, count in counts.ngram_counts(n)])
+    words, dropped['words'] = _top_counts(counts.word_counts(), get_stop_words())
+
+    return {
+        'ngrams': ngrams,
+        # Tokens that can form n-grams with the neighbouring paragraphs
+        'head': [tokens[i] for i in ngram_ids[:_EDGE]],
+        'tail': [tokens[i] for i in ngram_ids[-_EDGE:]] if _EDGE else [],
+        'words': words,
+        'total_words': len(counts.word_ids),
+        'dropped': dropped,
+        'entities': entities[:PARAGRAPH_TOP_K],
+        'entities_dropped': len(entities) > PARAGRAPH_TOP_K,
+        'sentence_scores': sentence_scores,
+        # VADER totals, which add up to those of the whole text
+        'sentiment': sentiment
+    }
+
+
+def _top_counts(counts, keep=frozenset()):
+    """
+    Keep the PARAGRAPH_TOP_K largest of a list of (term, count) pairs, and
+    every term in keep, in their original order.
+
+    Returns:
+        the kept [term, count] pairs and the largest dropped count (0 if
+        nothing was dropped)
+    """
+    ranked = [item for item in counts if item[0] not in keep]
+    if len(ranked) <= PARAGRAPH_TOP_K:
+        return [[term, count] for term, count in counts], 0
+
+    # sorted is stable, so tied counts keep their first-occurrence order
+    ranked.sort(key=itemgetter(1), reverse=True)
+    kept = {term for term, _ in ranked[:PARAGRAPH_TOP_K]}
+    return [[term, count] for term, count in counts if term in kept or term in keep], ranked[PARAGRAPH_TOP_K][1]
+
+
+class ParagraphMerger:
+    """
+    Merges paragraph partials, added in paragraph order, into analyzer outputs.
+
+    Partials can be added one at a time as a text is read, so a long text
+    never has to be held in memory as a whole. The result equals running the
+    analyzers over the whole document, unless a partial had to drop counts
+    (see analyze_paragraph); the tables concerned are then flagged
+    approximate, with the largest possible undercount as max_error.
+
+    With sketch parameters ({'capacity': ..., 'precision': ...,
+    'max_entities': ..., 'timeline_points': ...}) the n-gram and word tables
+    are Space-Saving counters of bounded size and the unique word count is a
+    HyperLogLog estimate, so memory no longer grows with the vocabulary.
+    Those outputs are then flagged approximate. Only the first max_entities
+    entity mentions are kept, and the sentiment timeline is cut to at most
+    timeline_points points by averaging runs of consecutive sentences.
+    """
+
+    def __init__(self, sketch=None):
+        self.sketch = sketch
+        if sketch:
+            self.ngram_counts = {n: SpaceSaving(sketch['capacity']) for _, n in MULTIPLE_NGRAMS}
+            self.word_counts = SpaceSaving(sketch['capacity'])
+            self.unique_words = HyperLogLog(sketch['precision'])
+            self._stop_words = get_stop_words()
+        else:
+            self.ngram_counts = {n: Counter() for _, n in MULTIPLE_NGRAMS}
+            self.word_counts = Counter()
+        self.total_words = 0
+        self.dropped = Counter()
+        self.entities = []
+        self.entities_dropped = False
+        self.sentence_scores = []
+        # Sentences per timeline point, and the sum and count of the sentences
+        # of the point being filled (sketch mode only)
+        self._sentences_per_point = 1
+        self._point = [0.0, 0]
+        self._previous = []
+        self._sentiment_totals = Counter()
+
+    def add(self, partial):
+        """Add the partial of the next paragraph"""
+        # N-grams across the break start in the previous tokens and end in
+        # this paragraph's head; in the document they come before its own
+        previous = self._previous
+        window = previous + partial['head']
+        for n, counts in self.ngram_counts.items():
+            junction = Counter()
+            for start in range(max(0, len(previous) - n + 1), len(previous)):
+                if start + n <= len(window):
+                    junction[' '.join(window[start:start + n])] += 1
+            counts.update(junction)
+            counts.update(dict(partial['ngrams'][str(n)]))
+        self._previous = (previous + partial['tail'])[-_EDGE:] if _EDGE else []
+
+        if self.sketch:
+            # Only non-stopwords can be top words; every word is unique-counted
+            self.word_counts.update({word: count for word, count in partial['words']
+                                     if word not in self._stop_words})
+            self.unique_words.add(word for word, _ in partial['words'])
+        else:
+            self.word_counts.update(dict(partial['words']))
+        self.total_words += partial['total_words']
+        self.dropped.update(partial['dropped'])
+        self.entities.extend(partial['entities'])
+        self.entities_dropped = self.entities_dropped or partial['entities_dropped']
+        self._sentiment_totals.update(partial['sentiment'])
+
+        if self.sketch:
+            self._add_sketch_timeline(partial['sentence_scores'])
+            if len(self.entities) > self.sketch['max_entities']:
+                del self.entities[self.sketch['max_entities']:]
+                self.entities_dropped = True
+        else:
+            self.sentence_scores.extend(partial['sentence_scores'])
+
+    def _add_sketch_timeline(self, sentence_scores):
+        """Add sentence scores to the timeline, halving it whenever it gets too long"""
+        point = self._point
+        for score in sentence_scores:
+            point[0] += score
+            point[1] += 1
+            if point[1] < self._sentences_per_point:
+                continue
+            self.sentence_scores.append(point[0] / point[1])
+            point[0], point[1] = 0.0, 0
+
+            if len(self.sentence_scores) > self.sketch['timeline_points']:
+                # Merge pairs of points; an odd last point is filled further
+                points = self.sentence_scores
+                self.sentence_scores = [(points[i] + points[i + 1]) / 2 for i in range(0, len(points) - 1, 2)]
+                if len(points) % 2:
+                    point[0], point[1] = points[-1] * self._sentences_per_point, self._sentences_per_point
+                self._sentences_per_point *= 2
+
+    def result(self):
+        """
+        Build the merged analyzer outputs.
+
+        Returns:
+            dict with ngram_data, word_freq_data and ner_data
+        """
+        if self.sketch:
+            return self._sketch_result()
+
+        stop_words = get_stop_words()
+        top_words = Counter({word: count for word, count in self.word_counts.items() if word not in stop_words})
+
+        merged = {
+            'ngram_data': {
+                key: format_ngrams(n, [(tuple(gram.split(' ')), count)
+                                       for gram, count in self.ngram_counts[n].most_common(NGRAM_TOP_K)])
+                for key, n in MULTIPLE_NGRAMS
+            },
+            'word_freq_data': format_word_frequency(self.total_words, len(self.word_counts),
+                                                    top_words.most_common(WORD_FREQUENCY_TOP_K)),
+            'ner_data': self._ner_data()
+        }
+        for key, n in MULTIPLE_NGRAMS:
+            if self.dropped[str(n)]:
+                merged['ngram_data'][key].update({'approximate': True, 'max_error': self.dropped[str(n)]})
+        if self.dropped['words']:
+            merged['word_freq_data'].update({'approximate': True, 'max_error': self.dropped['words']})
+
+        return merged
+
+    def _sketch_result(self):
+        """Build the outputs from the sketches, with their error bounds"""
+        ngram_data = {}
+        for key, n in MULTIPLE_NGRAMS:
+            counts = self.ngram_counts[n]
+            ngram_data[key] = format_ngrams(n, [(tuple(gram.split(' ')), count)
+                                                for gram, count in counts.most_common(NGRAM_TOP_K)])
+            # Counts are off by at most max_error: the sketch overestimates,
+            # counts dropped from the partials underestimate
+            ngram_data[key].update({'approximate': True, 'max_error': counts.max_error + self.dropped[str(n)]})
+
+        word_freq_data = format_word_frequency(self.total_words, self.unique_words.estimate(),
+                                               self.word_counts.most_common(WORD_FREQUENCY_TOP_K))
+        word_freq_data.update({
+            'approximate': True,
+            'max_error': self.word_counts.max_error + self.dropped['words'],
+            'unique_words_error': round(self.unique_words.relative_error, 4)
+        })
+
+        return {
+            'ngram_data': ngram_data,
+            'word_freq_data': word_freq_data,
+            'ner_data': self._ner_data()
+        }
+
+    def _ner_data(self):
+        """Group the entity mentions, flagging them truncated if some were dropped"""
+        ner_data = group_entities(self.entities)
+        if self.entities_dropped:
+            ner_data['truncated'] = True
+        return ner_data
+
+    def sentiment(self):
+        """
+        Build the whole-text sentiment summary from the paragraphs.
+
+        The summary is computed from the summed VADER totals of the
+        paragraphs, so it equals analyzing the whole text. In sketch mode
+        each timeline point may average several sentences (see
+        sentences_per_point).
+        """
+        if not self.sketch:
+            return sentiment_summary(totals_scores(self._sentiment_totals), self.sentence_scores, TIMELINE_WINDOW)
+
+        points = list(self.sentence_scores)
+        if self._point[1]:
+            points.append(self._point[0] / self._point[1])
+        summary = sentiment_summary(totals_scores(self._sentiment_totals),
+                                    [round(point, 4) for point in points], TIMELINE_WINDOW)
+        summary['timeline']['sentences_per_point'] = self._sentences_per_point
+        return summary
+
+
+def merge_paragraphs(partials):
+    """
+    Merge paragraph partials, in paragraph order, into analyzer outputs.
+
+    Returns:
+        dict with ngram_data, word_freq_data and ner_data, equal to running
+        the analyzers over the whole document
+    """
+    merger = ParagraphMerger()
+    for partial in partials:
+        merger.add(partial)
+    return merger.result()
+
+
+def analyze_paragraphs(text):
+    """
+    Analyze a text paragraph by paragraph (without any stored partials).
+
+    Returns:
+        dict with ngram_data, word_freq_data and ner_data
+    """
+    return merge_paragraphs([analyze_paragraph(paragraph) for paragraph in split_paragraphs(text)])
@@ -0,0 +1,269 @@
+"""
+Process pool for running the CPU-bound NLTK analyzers outside the GIL
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import sys
+import threading
+from .analysis_utils import ANALYZERS, analyze_text
+from .nltk_utils import nltk_resources
+from .paragraph_utils import analyze_paragraph
+
+
+def _init_worker():
+    """Load the NLTK models once when a worker process starts"""
+    nltk_resources.warm_up()
+
+
+def _run_analyzers(names, text):
+    """Run analyzers over one tokenization of a text inside a worker process"""
+    return analyze_text(text, names)
+
+
+def _run_paragraphs(paragraphs):
+    """Build the partial results of a batch of paragraphs inside a worker process"""
+    return [analyze_paragraph(paragraph) for paragraph in paragraphs]
+
+
+class AnalysisProcessPool:
+    """
+    Runs the analyzers of documents in worker processes.
+
+    Every document is one task that tokenizes the text once and runs all the
+    requested analyzers over it (see AnalyzedDocument). All documents share
+    the same pool, so concurrent uploads are spread over all cores.
+
+    A task that is already running cannot be cancelled, and stopping one
+    worker breaks every task of its pool. So when a document does not
+    finish within ANALYSIS_TASK_TIMEOUT, its pool is retired: new documents
+    go to a fresh pool, the tasks of other documents on the old pool run to
+    the end, and then the old pool's workers are terminated, stopping the
+    timed-out work.
+
+    Without a pool (ANALYSIS_PROCESS_POOL_SIZE = 0) nothing can stop a
+    running analysis: a timeout only stops the caller waiting for it.
+
+    Configuration:
+        ANALYSIS_PROCESS_POOL_SIZE: Number of worker processes (0 runs
+            in-process; default min(4, number of CPUs))
+        ANALYSIS_MAX_TASKS_PER_CHILD: Replace a worker after this many tasks (Python 3.11+)
+        ANALYSIS_TASK_TIMEOUT: Seconds to wait for the analyzers of one document
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ANALYSIS_PROCESS_POOL_SIZE', min(4, os.cpu_count() or 1))
+        app.config.setdefault('ANALYSIS_MAX_TASKS_PER_CHILD', None)
+        app.config.setdefault('ANALYSIS_TASK_TIMEOUT', 120)
+        app.extensions['analysis_pool'] = {'executor': None, 'threads': None}
+
+    def _get_executor(self, app):
+        """Create the process pool for this app on first use"""
+        state = app.extensions['analysis_pool']
+        with self._lock:
+            if state['executor'] is None:
+                # Install missing NLTK data here, not in every worker
+                nltk_resources.require()
+                # Spawn fresh interpreters rather than forking a process that
+                # already runs job threads and holds database connections
+                options = {
+                    'max_workers': app.config['ANALYSIS_PROCESS_POOL_SIZE'],
+                    'mp_context': multiprocessing.get_context('spawn'),
+                    'initializer': _init_worker
+                }
+                max_tasks = app.config['ANALYSIS_MAX_TASKS_PER_CHILD']
+                if max_tasks and sys.version_info >= (3, 11):
+                    options['max_tasks_per_child'] = max_tasks
+                state['executor'] = ProcessPoolExecutor(**options)
+            return state['executor']
+
+    def _get_threads(self, app):
+        """
+        Create the thread that runs budgeted analyses without a process pool.
+
+        One thread is enough: the analyzers hold the GIL, so the thread only
+        lets the caller stop waiting when the budget is spent.
+        """
+        state = app.extensions['analysis_pool']
+        with self._lock:
+            if state['threads'] is None:
+                state['threads'] = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analysis-inline')
+            return state['threads']
+
+    def _reset_executor(self, app):
+        """Drop the broken pool of an app, so the next document starts a fresh one"""
+        state = app.extensions['analysis_pool']
+        with self._lock:
+            executor, state['executor'] = state['executor'], None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _retire(self, app, executor, abandoned):
+        """
+        Send new documents to a fresh pool and terminate the workers of
+        executor once its tasks other than the abandoned ones have finished.
+        """
+        state = app.extensions['analysis_pool']
+        with self._lock:
+            if state['executor'] is executor:
+                state['executor'] = None
+        processes = list((executor._processes or {}).values())
+        others = [item.future for item in list(executor._pending_work_items.values())
+                  if item.future not in abandoned]
+
+        def stop(_=None):
+            if not all(future.done() for future in others):
+                return
+            executor.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+
+        for future in others:
+            future.add_done_callback(stop)
+        stop()
+
+    def shutdown(self, app, wait=True):
+        """Stop the worker processes of an app"""
+        state = app.extensions['analysis_pool']
+        with self._lock:
+            executor, state['executor'] = state['executor'], None
+            threads, state['threads'] = state['threads'], None
+        for pool in (executor, threads):
+            if pool is not None:
+                pool.shutdown(wait=wait)
+
+    def analyze(self, app, text, analyzers=None):
+        """
+        Run the analyzers over a text.
+
+        Args:
+            app: The Flask application whose configuration is used
+            text: The text content to analyze
+            analyzers: Optional names of the analyzers to run (default: all four)
+
+        Returns:
+            dict with sentiment_data, ngram_data, ner_data and word_freq_data
+
+        Raises:
+            TimeoutError: If the analyzers did not finish within ANALYSIS_TASK_TIMEOUT
+        """
+        names = list(analyzers) if analyzers is not None else list(ANALYZERS)
+        if not names:
+            return {}
+
+        if not app.config['ANALYSIS_PROCESS_POOL_SIZE']:
+            # No pool configured - run the analyzers in this process
+            return analyze_text(text, names)
+
+        executor = self._get_executor(app)
+        return self._results(app, executor, [executor.submit(_run_analyzers, names, text)])[0]
+
+    def analyze_many(self, app, texts, analyzers=None, timeout=None):
+        """
+        Run the analyzers over several texts at once, for as long as a time budget allows.
+
+        All texts are submitted to the pool together, so they are analyzed in
+        parallel by the workers' already loaded models. Texts still waiting
+        when the budget is spent are cancelled; texts already being analyzed
+        are stopped by retiring the pool (see the class docstring), and
+        their outputs are dropped. Without a pool the texts are analyzed in
+        turn on a thread of this process; the caller stops waiting when the
+        budget is spent, but a text already being analyzed keeps that thread
+        busy until it is done.
+
+        Args:
+            app: The Flask application whose configuration is used
+            texts: The texts to analyze
+            analyzers: Optional names of the analyzers to run (default: all four)
+            timeout: Seconds to wait (default: ANALYSIS_TASK_TIMEOUT)
+
+        Returns:
+            list with a dict of analyzer name -> output per text, in the order
+            of the texts; analyzers that did not finish in time or failed are
+            left out
+        """
+        names = list(analyzers) if analyzers is not None else list(ANALYZERS)
+        timeout = app.config['ANALYSIS_TASK_TIMEOUT'] if timeout is None else timeout
+        results = [{} for _ in texts]
+        if not names or not texts:
+            return results
+
+        if not app.config['ANALYSIS_PROCESS_POOL_SIZE']:
+            threads = self._get_threads(app)
+            futures = {threads.submit(analyze_text, text, names): i for i, text in enumerate(texts)}
+        else:
+            executor = self._get_executor(app)
+            try:
+                futures = {executor.submit(_run_analyzers, names, text): i for i, text in enumerate(texts)}
+            except BrokenProcessPool:
+                self._reset_executor(app)
+                return results
+        done, not_done = wait(futures, timeout=timeout)
+        running = {future for future in not_done if not future.cancel()}
+        if running and app.config['ANALYSIS_PROCESS_POOL_SIZE']:
+            self._retire(app, executor, running)
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except BrokenProcessPool:
+                self._reset_executor(app)
+            except Exception:
+                continue
+        return results
+
+    def analyze_paragraphs(self, app, paragraphs):
+        """
+        Build the partial results of paragraphs (see paragraph_utils).
+
+        Args:
+            app: The Flask application whose configuration is used
+            paragraphs: Paragraph texts
+
+        Returns:
+            list of partial results, in the order of the paragraphs
+
+        Raises:
+            TimeoutError: If the paragraphs did not finish within ANALYSIS_TASK_TIMEOUT
+        """
+        if not paragraphs:
+            return []
+
+        if not app.config['ANALYSIS_PROCESS_POOL_SIZE']:
+            return [analyze_paragraph(paragraph) for paragraph in paragraphs]
+
+        # A few batches per worker keeps the pool busy without one task per paragraph
+        batch_size = max(1, len(paragraphs) // (app.config['ANALYSIS_PROCESS_POOL_SIZE'] * 4))
+        executor = self._get_executor(app)
+        futures = [
+            executor.submit(_run_paragraphs, paragraphs[i:i + batch_size])
+            for i in range(0, len(paragraphs), batch_size)
+        ]
+        return [partial for batch in self._results(app, executor, futures) for partial in batch]
+
+    def _results(self, app, executor, futures):
+        """Wait for futures of executor and return their results in order"""
+        done, not_done = wait(futures, timeout=app.config['ANALYSIS_TASK_TIMEOUT'])
+        if not_done:
+            running = {future for future in not_done if not future.cancel()}
+            if running:
+                # Stop the timed-out tasks without breaking other documents' tasks
+                self._retire(app, executor, running)
+            raise TimeoutError(f"Analysis did not finish within {app.config['ANALYSIS_TASK_TIMEOUT']} seconds")
+
+        try:
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory) - start a fresh pool next time
+            self._reset_executor(app)
+            raise
+
+
+# Shared pool instance, initialized in create_app()
+analysis_pool = AnalysisProcessPool()
@@ -0,0 +1,162 @@
+"""
+Ranked full-text search over a user's uploads and analysis results
+"""
+
+import re
+from sqlalchemy import DateTime, bindparam, text
+from app import db
+from app.models.search import SEARCH_KINDS, SEARCH_TABLE
+
+# Markers around matched terms in snippets; control characters never occur
+# in indexed text, so they can be stripped back out unambiguously
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+
+# Tokens per snippet
+SNIPPET_TOKENS = 24
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+_TERM = re.compile(r'(\w+)(\*?)')
+
+
+class SearchUnavailable(Exception):
+    """The database has no full-text index (it is not SQLite)"""
+
+
+def build_match_query(query, user_id):
+    """
+    Turn free text into an FTS5 MATCH expression over a user's documents.
+
+    Every word is quoted, so user input can never be an FTS5 syntax error;
+    all words must match the title or body, and a trailing * makes a word
+    a prefix.
+
+    Returns:
+        str: The MATCH expression, or None if the text has no words
+    """
+    terms = [f'"{word}"{star}' for word, star in _TERM.findall(query or '')]
+    if not terms:
+        return None
+    return f'owner : "u{int(user_id)}" AND {{title body}} : ({" ".join(terms)})'
+
+
+def split_highlights(marked):
+    """
+    Strip the highlight markers from a snippet.
+
+    Returns:
+        tuple: (plain text, list of [start, end) character offsets of the matches)
+    """
+    highlights = []
+    plain = []
+    length = 0
+    start = None
+    for part in re.split(f'([{_HIGHLIGHT_START}{_HIGHLIGHT_END}])', marked or ''):
+        if part == _HIGHLIGHT_START:
+            start = length
+        elif part == _HIGHLIGHT_END:
+            if start is not None:
+                highlights.append([start, length])
+            start = None
+        else:
+            plain.append(part)
+            length += len(part)
+    return ''.join(plain), highlights
+
+
+def _encode_cursor(rank, rowid):
+    """Return the page cursor of a hit: its (rank, rowid) position"""
+    return f'{rank!r}_{rowid}'
+
+
+def _decode_cursor(cursor):
+    """Parse a page cursor; raises ValueError if it is malformed"""
+    rank, _, rowid = cursor.rpartition('_')
+    return float(rank), int(rowid)
+
+
+def search_documents(user_id, query, cursor=None, limit=SEARCH_PAGE_SIZE):
+    """
+    Search a user's uploads and analysis results, best matches first.
+
+    Matching, BM25 ranking, snippets and highlighting all happen inside
+    SQLite's FTS5 index, so only one page of short snippets is read into
+    Python however large the matching documents are. The matches are
+    ranked first and snippets are only built for the page's hits. Pages
+    are keyed on (rank, rowid), so no offset is ever skipped over.
+
+    Args:
+        user_id: Owner of the documents to search
+        query: Free text; all words must match
+        cursor: Only return hits after this cursor (the next page)
+        limit: Maximum number of hits to return
+
+    Returns:
+        tuple: (list of hit dicts, cursor of the next page or None)
+
+    Raises:
+        SearchUnavailable: If the database is not SQLite
+        ValueError: If the cursor is malformed
+    """
+    if db.engine.dialect.name != 'sqlite':
+        raise SearchUnavailable('Full-text search needs the SQLite FTS5 index')
+
+    match = build_match_query(query, user_id)
+    if match is None:
+        return [], None
+
+    # Rank the matches; only rowids and scores leave the index here
+    params = {'match': match, 'limit': limit + 1}
+    after = ''
+    if cursor:
+        params['rank'], params['rowid'] = _decode_cursor(cursor)
+        after = 'AND (rank > :rank OR (rank = :rank AND rowid > :rowid))'
+    page = db.session.execute(text(f"""
+        SELECT rowid, rank FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH :match {after}
+        ORDER BY rank, rowid
+        LIMIT :limit
+    """), params).all()
+    next_cursor = _encode_cursor(page[limit - 1].rank, page[limit - 1].rowid) if len(page) > limit else None
+    page = page[:limit]
+    if not page:
+        return [], None
+
+    # Then build snippets for that page only, with its uploads and analyses
+    statement = text(f"""
+        SELECT {SEARCH_TABLE}.rowid,
+               highlight({SEARCH_TABLE}, 0, :start, :end) AS title,
+               snippet({SEARCH_TABLE}, 1, :start, :end, '…', :tokens) AS snippet,
+               analysis_result.url_path, analysis_result.upload_id,
+               COALESCE(uploaded_texts.created_at, analysis_result.created_at) AS created_at
+        FROM {SEARCH_TABLE}
+        LEFT JOIN uploaded_texts ON {SEARCH_TABLE}.rowid % 2 = 0 AND uploaded_texts.id = {SEARCH_TABLE}.rowid / 2
+        LEFT JOIN analysis_result ON {SEARCH_TABLE}.rowid % 2 = 1 AND analysis_result.id = {SEARCH_TABLE}.rowid / 2
+        WHERE {SEARCH_TABLE} MATCH :match AND {SEARCH_TABLE}.rowid IN :rowids
+    """).bindparams(bindparam('rowids', expanding=True)).columns(created_at=DateTime)
+    rows = {row.rowid: row for row in db.session.execute(statement, {
+        'match': match, 'rowids': [rowid for rowid, _ in page],
+        'start': _HIGHLIGHT_START, 'end': _HIGHLIGHT_END, 'tokens': SNIPPET_TOKENS
+    })}
+
+    hits = []
+    for rowid, rank in page:
+        row = rows[rowid]
+        title, title_highlights = split_highlights(row.title)
+        snippet, snippet_highlights = split_highlights(row.snippet)
+        hits.append({
+            'kind': SEARCH_KINDS[rowid % 2],
+            'id': rowid // 2,
+            'title': title,
+            'title_highlights': title_highlights,
+            'snippet': snippet,
+            'snippet_highlights': snippet_highlights,
+            'rank': rank,
+            'url_path': row.url_path,
+            'upload_id': row.upload_id if rowid % 2 else rowid // 2,
+            'created_at': row.created_at,
+            'cursor': _encode_cursor(rank, rowid)
+        })
+    return hits, next_cursor
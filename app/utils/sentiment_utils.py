@@ -1,50 +1,188 @@
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
-import nltk.data
+import math
+from nltk.sentiment.vader import SentiText
+from .document_utils import as_document
+from .nltk_utils import nltk_resources
 
-# Download necessary NLTK resources (only needed for first run)
-def download_nltk_resources():
-    try:
-        nltk.data.find('sentiment/vader_lexicon.zip')
-    except LookupError:
-        nltk.download('vader_lexicon')
+# Bump when the output of the sentiment analyzer changes
+SENTIMENT_VERSION = 4
 
-# Initialize NLTK resource download
-download_nltk_resources()
+# Number of sentences in the rolling average of the sentiment timeline
+TIMELINE_WINDOW = 5
 
 def analyze_sentiment(text):
     """
     Use NLTK's VADER sentiment analyzer to analyze text sentiment
     Returns a dictionary containing sentiment scores
     """
-    # Initialize sentiment analyzer
-    sia = SentimentIntensityAnalyzer()
+    # Shared sentiment analyzer, loaded on first use
+    sia = nltk_resources.get('sentiment_analyzer')
     
     # Get sentiment scores
     sentiment_scores = sia.polarity_scores(text)
     
     # Add text sentiment label
-    if sentiment_scores['compound'] >= 0.05:
-        sentiment_scores['sentiment'] = 'Positive'
-    elif sentiment_scores['compound'] <= -0.05:
-        sentiment_scores['sentiment'] = 'Negative'
-    else:
-        sentiment_scores['sentiment'] = 'Neutral'
+    sentiment_scores['sentiment'] = sentiment_label(sentiment_scores['compound'])
     
     return sentiment_scores
 
-def get_sentiment_summary(text):
+def sentiment_label(compound):
     """
-    Analyze text and return a concise summary
+    Return the Positive/Negative/Neutral label of a compound score
     """
-    scores = analyze_sentiment(text)
+    if compound >= 0.05:
+        return 'Positive'
+    elif compound <= -0.05:
+        return 'Negative'
+    return 'Neutral'
+
+def analyze_sentence_sentiment(text, window=TIMELINE_WINDOW):
+    """
+    Score every sentence of a text (a string or an AnalyzedDocument)
+    Returns the compound score of each sentence and their trailing rolling average
+    """
+    _, scores = score_sentences(text)
+    
+    return sentiment_timeline(scores, window)
+
+def score_sentences(text):
+    """
+    Score a text (a string or an AnalyzedDocument) in one pass over its sentences
+    Returns the whole-text VADER scores and the compound score of every sentence
+    """
+    totals, sentence_scores = sentiment_totals(text)
+    
+    return totals_scores(totals), sentence_scores
+
+def sentiment_totals(text):
+    """
+    Score every sentence of a text (a string or an AnalyzedDocument)
+    Returns the VADER totals of the whole text and the compound score of every sentence
+
+    The totals are sums over the words and punctuation of the text, so the
+    totals of consecutive paragraphs add up to those of the whole text (see
+    totals_scores).
+    """
+    # The analyzer is shared and keeps no state, so it is thread-safe
+    sia = nltk_resources.get('sentiment_analyzer')
+    document = as_document(text)
+    
+    valences = []
+    sentence_scores = []
+    for sentence in document.sentences:
+        sentence_valences = _valences(sia, sentence)
+        sentence_scores.append(sia.score_valence(sentence_valences, sentence)['compound'])
+        valences.extend(sentence_valences)
+    
+    # The whole-text scores come from the same word valences, so no word is scored twice
+    pos_sum, neg_sum, neu_count = sia._sift_sentiment_scores(valences)
+    totals = {
+        'words': len(valences),
+        'valence': float(sum(valences)),
+        'pos': pos_sum,
+        'neg': neg_sum,
+        'neu': neu_count,
+        'exclamations': document.text.count('!'),
+        'questions': document.text.count('?')
+    }
+    
+    return totals, sentence_scores
+
+def totals_scores(totals):
+    """
+    Return the VADER scores of a text from its totals (see sentiment_totals),
+    as SentimentIntensityAnalyzer.score_valence computes them
+    """
+    if not totals.get('words'):
+        return {'neg': 0.0, 'neu': 0.0, 'pos': 0.0, 'compound': 0.0, 'sentiment': 'Neutral'}
+    
+    sia = nltk_resources.get('sentiment_analyzer')
     
+    # Emphasis from up to 4 exclamation points and from 2 or more question marks
+    emphasis = min(totals['exclamations'], 4) * 0.292
+    questions = totals['questions']
+    if questions > 1:
+        emphasis += questions * 0.18 if questions <= 3 else 0.96
+    
+    valence = totals['valence']
+    if valence > 0:
+        valence += emphasis
+    elif valence < 0:
+        valence -= emphasis
+    compound = round(sia.constants.normalize(valence), 4)
+    
+    pos_sum, neg_sum = totals['pos'], totals['neg']
+    if pos_sum > math.fabs(neg_sum):
+        pos_sum += emphasis
+    elif pos_sum < math.fabs(neg_sum):
+        neg_sum -= emphasis
+    total = pos_sum + math.fabs(neg_sum) + totals['neu']
+    
+    return {
+        'neg': round(math.fabs(neg_sum / total), 3),
+        'neu': round(math.fabs(totals['neu'] / total), 3),
+        'pos': round(math.fabs(pos_sum / total), 3),
+        'compound': compound,
+        'sentiment': sentiment_label(compound)
+    }
+
+def _valences(sia, text):
+    """
+    Return the valence of every word of a text, as VADER's polarity_scores
+    computes them before adding them up
+    """
+    sentitext = SentiText(text, sia.constants.PUNC_LIST, sia.constants.REGEX_REMOVE_PUNCTUATION)
+    words_and_emoticons = sentitext.words_and_emoticons
+    valences = []
+    for item in words_and_emoticons:
+        # Same lookup as polarity_scores, so sentence scores are unchanged
+        i = words_and_emoticons.index(item)
+        if (i < len(words_and_emoticons) - 1 and item.lower() == 'kind'
+                and words_and_emoticons[i + 1].lower() == 'of') or item.lower() in sia.constants.BOOSTER_DICT:
+            valences.append(0)
+            continue
+        valences = sia.sentiment_valence(0, sentitext, item, i, valences)
+    
+    return sia._but_check(words_and_emoticons, valences)
+
+def sentiment_timeline(scores, window=TIMELINE_WINDOW):
+    """
+    Build the timeline of per-sentence compound scores with their trailing rolling average
+    """
+    rolling = []
+    running_total = 0.0
+    for i, compound in enumerate(scores):
+        # Keep a running sum over the last `window` sentences
+        running_total += compound
+        if i >= window:
+            running_total -= scores[i - window]
+        rolling.append(round(running_total / min(i + 1, window), 4))
+    
+    return {
+        'window': window,
+        'scores': scores,
+        'rolling_average': rolling
+    }
+
+def get_sentiment_summary(text, window=TIMELINE_WINDOW):
+    """
+    Analyze text (a string or an AnalyzedDocument) and return a concise summary
+    """
+    scores, sentence_scores = score_sentences(text)
+    
+    return sentiment_summary(scores, sentence_scores, window)
+
+def sentiment_summary(scores, sentence_scores, window=TIMELINE_WINDOW):
+    """
+    Build the summary from the whole-text VADER scores and the compound
+    score of every sentence (see score_sentences)
+    """
     summary = {
         'compound_score': scores['compound'],
         'sentiment': scores['sentiment'],
         'positive_score': scores['pos'],
         'negative_score': scores['neg'],
         'neutral_score': scores['neu'],
+        'timeline': sentiment_timeline(sentence_scores, window)
     }
     
-    return summary
\ No newline at end of file
+    return summary
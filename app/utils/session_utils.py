@@ -0,0 +1,189 @@
+"""
+Server-side sessions stored in the application database
+"""
+
+from datetime import datetime, timedelta
+import secrets
+import threading
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import CallbackDict
+from app import db
+from app.models import ServerSession
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and whether it was changed"""
+
+    def __init__(self, initial=None, session_id=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.session_id = session_id
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+        self.replaced_id = None  # Previous id, deleted when the session is saved
+
+
+class ServerSessionInterface(SessionInterface):
+    """
+    Keeps session data in the server_session table instead of the cookie.
+
+    The cookie only carries a signed random session id, so requests stay
+    small however much a view puts into the session. Because the data lives
+    in the shared database, every worker process sees the same sessions.
+    Sessions expire SESSION_TTL after they were last saved; expired rows are
+    deleted at most once per SESSION_CLEANUP_INTERVAL by whichever process
+    saves a session next. Views that change who is logged in call
+    regenerate() so a session id known before the change stops working.
+
+    Session rows are read and written on their own connection, so they never
+    commit or roll back the view's db.session.
+
+    Configuration:
+        SESSION_BACKEND: 'server' (default) or 'cookie' for Flask's signed cookie
+        SESSION_TTL: Lifetime of a session in seconds since it was last saved
+        SESSION_CLEANUP_INTERVAL: Seconds between purges of expired sessions
+    """
+
+    serializer = TaggedJSONSerializer()
+    session_class = ServerSideSession
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._last_cleanup = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SESSION_BACKEND', 'server')
+        app.config.setdefault('SESSION_TTL', 24 * 60 * 60)
+        app.config.setdefault('SESSION_CLEANUP_INTERVAL', 10 * 60)
+        if app.config['SESSION_BACKEND'] == 'server':
+            app.session_interface = self
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-session')
+
+    def _ttl(self, app):
+        return timedelta(seconds=app.config['SESSION_TTL'])
+
+    def _new_session(self):
+        return self.session_class(session_id=secrets.token_hex(32), new=True)
+
+    def regenerate(self, session):
+        """
+        Give a session a new random id, keeping its data.
+
+        The row of the old id is deleted when the session is saved, so an id
+        planted in a victim's browser before login (session fixation) or
+        copied before logout cannot be used afterwards. Cookie sessions are
+        left alone.
+        """
+        if not isinstance(session, self.session_class):
+            return
+        if not session.new and session.replaced_id is None:
+            session.replaced_id = session.session_id
+        session.session_id = secrets.token_hex(32)
+        session.new = True
+        session.modified = True
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return self._new_session()
+        try:
+            session_id = self._signer(app).unsign(cookie).decode('ascii')
+        except BadSignature:
+            return self._new_session()
+
+        table = ServerSession.__table__
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                select(table.c.data, table.c.expires_at).where(table.c.session_id == session_id)
+            ).first()
+        if row is None or row.expires_at <= datetime.utcnow():
+            return self._new_session()
+
+        return self.session_class(self.serializer.loads(row.data), session_id=session_id,
+                                  expires_at=row.expires_at)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+        table = ServerSession.__table__
+
+        if session.replaced_id is not None:
+            with db.engine.begin() as connection:
+                connection.execute(delete(table).where(table.c.session_id == session.replaced_id))
+
+        # An emptied session is removed along with its cookie
+        if not session:
+            if session.modified:
+                if not session.new:
+                    with db.engine.begin() as connection:
+                        connection.execute(delete(table).where(table.c.session_id == session.session_id))
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        now = datetime.utcnow()
+        ttl = self._ttl(app)
+        # Unchanged sessions are only written again once half their TTL has passed
+        refresh = session.expires_at is not None and session.expires_at - now < ttl / 2
+        if not (session.modified or session.new or refresh):
+            return
+
+        values = {'data': self.serializer.dumps(dict(session)), 'expires_at': now + ttl, 'updated_at': now}
+        statement = update(table).where(table.c.session_id == session.session_id).values(**values)
+        try:
+            with db.engine.begin() as connection:
+                if not connection.execute(statement).rowcount:
+                    connection.execute(insert(table).values(session_id=session.session_id, **values))
+        except IntegrityError:
+            # Another request of the same new session inserted it first
+            with db.engine.begin() as connection:
+                connection.execute(statement)
+        self._cleanup(app, now)
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.session_id).decode('ascii'),
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite
+        )
+
+    def _cleanup(self, app, now):
+        """Delete expired sessions, at most once per SESSION_CLEANUP_INTERVAL"""
+        with self._lock:
+            interval = timedelta(seconds=app.config['SESSION_CLEANUP_INTERVAL'])
+            if self._last_cleanup is not None and now - self._last_cleanup < interval:
+                return
+            self._last_cleanup = now
+
+        table = ServerSession.__table__
+        with db.engine.begin() as connection:
+            connection.execute(delete(table).where(table.c.expires_at <= now))
+
+
+# Shared instance, bound to the app in create_app()
+server_sessions = ServerSessionInterface()
@@ -0,0 +1,197 @@
+"""
+Bulk sharing of analysis results
+"""
+
+from datetime import datetime
+from sqlalchemy import func, inspect, select
+from sqlalchemy.orm import load_only
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import AnalysisResult, AnalysisSnapshot, SharedAnalysis, User
+from app.models.snapshot import SNAPSHOT_FIELDS, SNAPSHOT_REF_DDL, hash_snapshot
+
+# SharedAnalysis column -> AnalysisResult column copied into every share;
+# the text and results go into a shared AnalysisSnapshot instead
+SHARED_FIELDS = {
+    'title': 'title',
+    'original_owner_id': 'owner_id',
+    'upload_id': 'upload_id',
+    'analysis_created_at': 'created_at',
+    'url_path': 'url_path'
+}
+
+# Dialects with INSERT ... ON CONFLICT
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def snapshot_results(results):
+    """
+    Get the snapshot of the current state of each analysis result, creating
+    the snapshots that do not exist yet. Results with identical text and
+    outputs share one snapshot. The text and outputs of results loaded
+    without them (see load_share_targets()) are read in one query.
+
+    Existing snapshots are locked by a no-op update rather than skipped,
+    so a transaction dropping their last share waits for this one instead
+    of deleting a snapshot it is about to reference.
+
+    Returns:
+        dict of result id -> snapshot id
+    """
+    unloaded = [result.id for result in results if inspect(result).unloaded & set(SNAPSHOT_FIELDS)]
+    loaded = {}
+    if unloaded:
+        columns = [getattr(AnalysisResult, name) for name in SNAPSHOT_FIELDS]
+        loaded = {row.id: row._asdict() for row in db.session.query(AnalysisResult.id, *columns).filter(
+            AnalysisResult.id.in_(unloaded))}
+
+    hashes = {}
+    snapshots = {}
+    for result in results:
+        if result.id in loaded:
+            fields = {name: loaded[result.id][name] for name in SNAPSHOT_FIELDS}
+        else:
+            fields = {name: getattr(result, name) for name in SNAPSHOT_FIELDS}
+        snapshot_hash = hash_snapshot(fields)
+        hashes[result.id] = snapshot_hash
+        snapshots.setdefault(snapshot_hash, dict(fields, snapshot_hash=snapshot_hash, ref_count=0))
+    if not snapshots:
+        return {}
+
+    table = AnalysisSnapshot.__table__
+    make_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if make_insert is not None:
+        statement = make_insert(table)
+        statement = statement.on_conflict_do_update(index_elements=['snapshot_hash'],
+                                                    set_={'ref_count': table.c.ref_count})
+        db.session.execute(statement, list(snapshots.values()))
+    else:
+        existing = {snapshot_hash for (snapshot_hash,) in db.session.query(AnalysisSnapshot.snapshot_hash).filter(
+            AnalysisSnapshot.snapshot_hash.in_(list(snapshots)))}
+        missing = [row for snapshot_hash, row in snapshots.items() if snapshot_hash not in existing]
+        if missing:
+            db.session.execute(table.insert(), missing)
+
+    ids = dict(db.session.query(AnalysisSnapshot.snapshot_hash, AnalysisSnapshot.id).filter(
+        AnalysisSnapshot.snapshot_hash.in_(list(snapshots))).all())
+    return {result_id: ids[snapshot_hash] for result_id, snapshot_hash in hashes.items()}
+
+
+def release_unused_snapshots(session=None):
+    """
+    Recount the shares referencing each snapshot and delete the snapshots
+    no share references any more.
+
+    On SQLite and PostgreSQL the counts are kept by the triggers of
+    SNAPSHOT_REF_DDL and this is only needed to repair them. On other
+    databases upsert_shares() calls it; snapshots released by cascaded
+    deletes are collected by the next share.
+
+    Returns:
+        int: Number of snapshots deleted
+    """
+    session = session or db.session
+    snapshots = AnalysisSnapshot.__table__
+    shares = SharedAnalysis.__table__
+    references = select(func.count(shares.c.id)).where(
+        shares.c.snapshot_id == snapshots.c.id).scalar_subquery()
+    session.execute(snapshots.update().values(ref_count=references))
+    return session.execute(snapshots.delete().where(snapshots.c.ref_count == 0)).rowcount
+
+
+def load_share_targets(analysis_ids, user_ids):
+    """
+    Load the analysis results and recipients of a share, one IN query each.
+    Only the columns needed to check and write the shares are loaded, so
+    a rejected request does not decompress any analyzer output.
+
+    Returns:
+        tuple: (dict of id -> AnalysisResult, set of existing user ids)
+    """
+    columns = [AnalysisResult.id] + [getattr(AnalysisResult, source) for source in SHARED_FIELDS.values()]
+    results = {result.id: result for result in
+               AnalysisResult.query.options(load_only(*columns)).filter(AnalysisResult.id.in_(analysis_ids)).all()}
+    users = {user_id for (user_id,) in
+             db.session.query(User.id).filter(User.id.in_(user_ids)).all()}
+    return results, users
+
+
+def upsert_shares(results, user_ids, sharer_id, permission, message):
+    """
+    Share every analysis result with every user in one statement.
+
+    Existing (user_id, analysis_id) shares get the new permission, message
+    and sharer and point to a snapshot of the analysis' current state; the
+    others are inserted. Snapshots no longer referenced afterwards are
+    released, by the ref_count triggers where the database has them.
+    Nothing is committed, so the caller controls the transaction.
+
+    Args:
+        results: AnalysisResult objects to share
+        user_ids: Recipient user ids
+        sharer_id: Id of the user sharing the results
+        permission: Share permission ('view-only' or 'allow-reshare')
+        message: Optional message for the recipients
+
+    Returns:
+        int: Number of shares written
+    """
+    now = datetime.utcnow()
+    snapshot_ids = snapshot_results(results)
+    rows = [
+        dict(
+            {field: getattr(result, source) for field, source in SHARED_FIELDS.items()},
+            user_id=user_id,
+            analysis_id=result.id,
+            snapshot_id=snapshot_ids[result.id],
+            sharer_id=sharer_id,
+            permission=permission,
+            message=message,
+            created_at=now
+        )
+        for user_id in user_ids for result in results
+    ]
+    if not rows:
+        return 0
+
+    # Shares keep their original created_at when they are updated
+    updated = [column for column in rows[0] if column not in ('user_id', 'analysis_id', 'created_at')]
+    table = SharedAnalysis.__table__
+
+    make_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if make_insert is not None:
+        statement = make_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', 'analysis_id'],
+            set_={column: statement.excluded[column] for column in updated}
+        )
+        db.session.execute(statement, rows)
+        if db.engine.dialect.name not in SNAPSHOT_REF_DDL:
+            release_unused_snapshots()
+        return len(rows)
+
+    # Other databases: find the existing shares in one query, then bulk
+    # update those and bulk insert the rest
+    existing = {
+        (user_id, analysis_id): share_id
+        for user_id, analysis_id, share_id in db.session.query(
+            SharedAnalysis.user_id, SharedAnalysis.analysis_id, SharedAnalysis.id
+        ).filter(
+            SharedAnalysis.user_id.in_(user_ids),
+            SharedAnalysis.analysis_id.in_([result.id for result in results])
+        )
+    }
+    updates, inserts = [], []
+    for row in rows:
+        share_id = existing.get((row['user_id'], row['analysis_id']))
+        if share_id is None:
+            inserts.append(row)
+        else:
+            updates.append(dict({column: row[column] for column in updated}, id=share_id))
+    if updates:
+        db.session.bulk_update_mappings(SharedAnalysis, updates)
+    if inserts:
+        db.session.bulk_insert_mappings(SharedAnalysis, inserts)
+    if db.engine.dialect.name not in SNAPSHOT_REF_DDL:
+        release_unused_snapshots()
+    return len(rows)
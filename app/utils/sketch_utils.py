@@ -0,0 +1,117 @@
+"""
+Bounded-memory sketches for counting terms in very large texts
+"""
+
+import hashlib
+import heapq
+import math
+from operator import itemgetter
+import numpy as np
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter counter for approximate top-k counts.
+
+    Keeps at most 2 * capacity counters. When the table overflows it is cut
+    back to the capacity largest counters, and a term seen again later starts
+    from the largest count evicted so far. Every reported count is an upper
+    bound that overestimates the true count by at most max_error, which is
+    never more than total / capacity.
+
+    Supports the parts of the Counter interface used by ParagraphMerger:
+    update() with a mapping and most_common().
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.total = 0
+        # Largest count evicted so far
+        self.max_error = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, counts):
+        """Add a mapping of term -> count"""
+        table = self.counts
+        for term, count in counts.items():
+            self.total += count
+            if term in table:
+                table[term] += count
+            else:
+                table[term] = self.max_error + count
+
+        if len(table) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        # nlargest is stable, so tied counters keep their first-seen order
+        kept = heapq.nlargest(self.capacity, self.counts.items(), key=itemgetter(1))
+        kept_terms = {term for term, _ in kept}
+        evicted = max(count for term, count in self.counts.items() if term not in kept_terms)
+        self.max_error = max(self.max_error, evicted)
+        self.counts = {term: count for term, count in self.counts.items() if term in kept_terms}
+
+    def most_common(self, k):
+        """Return the k terms with the largest estimated counts"""
+        return heapq.nlargest(k, self.counts.items(), key=itemgetter(1))
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter.
+
+    Uses 2 ** precision one-byte registers; the relative standard error of
+    the estimate is about 1.04 / sqrt(2 ** precision) (0.8% for the default
+    precision of 14, in 16KB).
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError('HyperLogLog precision must be between 4 and 18')
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, items):
+        """Add an iterable of strings"""
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+             for item in items),
+            dtype=np.uint64
+        )
+        if not len(hashes):
+            return
+
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+
+        # Rank = position of the first 1 bit in the remaining 64 - p bits
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        # Correct float rounding of values just below a power of two
+        too_long = nonzero & ((rest >> np.maximum(bit_length - 1, 0).astype(np.uint64)) == 0)
+        bit_length[too_long] -= 1
+        rank = (64 - p - bit_length + 1).astype(np.uint8)
+
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self):
+        """Return the estimated number of distinct items added"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        # Linear counting is more accurate for small cardinalities
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+
+        return int(round(estimate))
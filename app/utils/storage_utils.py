@@ -0,0 +1,151 @@
+"""
+Streaming storage for uploaded text files
+"""
+
+import codecs
+import hashlib
+import os
+import tempfile
+import uuid
+from .document_utils import PARAGRAPH_BREAK
+
+# Bytes read from an upload stream at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Characters kept from the start of a stored text for previews
+PREVIEW_LENGTH = 1000
+
+# Characters of a stored text copied into its AnalysisResult for display
+RESULT_TEXT_LENGTH = 100 * 1024
+
+# A paragraph longer than this is cut at the last whitespace so that reading
+# a stored text never needs more than about this much memory
+MAX_PARAGRAPH_CHARS = 1024 * 1024
+
+
+class StoredText:
+    """A text file written to upload storage by store_text_stream()"""
+
+    def __init__(self, path, content_hash, size, preview, has_text):
+        self.path = path
+        self.content_hash = content_hash
+        self.size = size
+        self.preview = preview
+        self.has_text = has_text
+
+    def __repr__(self):
+        return f'<StoredText {self.path} {self.size} bytes>'
+
+    def read(self):
+        """Return the whole text (only for small files)"""
+        return read_stored_text(self.path)
+
+    def delete(self):
+        delete_stored_text(self.path)
+
+
+def store_text_stream(stream, directory, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Write a UTF-8 byte stream to storage chunk by chunk.
+
+    The stream is decoded incrementally, so invalid UTF-8 is detected
+    without holding the file in memory. The SHA-256 of the content is
+    computed on the way and matches hash_content() of the decoded text.
+
+    Args:
+        stream: Binary file-like object (e.g. FileStorage.stream)
+        directory: Upload storage directory
+        chunk_size: Bytes to read at a time
+
+    Returns:
+        StoredText
+
+    Raises:
+        UnicodeDecodeError: If the stream is not valid UTF-8
+    """
+    os.makedirs(directory, exist_ok=True)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    digest = hashlib.sha256()
+    size = 0
+    preview = ''
+    has_text = False
+
+    # Write to a temporary name so a failed upload never leaves a partial file
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(handle, 'w', encoding='utf-8', newline='') as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                final = not chunk
+                text = decoder.decode(chunk, final=final)
+
+                if text:
+                    out.write(text)
+                    if len(preview) < PREVIEW_LENGTH:
+                        preview += text[:PREVIEW_LENGTH - len(preview)]
+                    has_text = has_text or not text.isspace()
+                if final:
+                    break
+
+                digest.update(chunk)
+                size += len(chunk)
+
+        path = os.path.join(directory, f'{uuid.uuid4().hex}.txt')
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return StoredText(path, digest.hexdigest(), size, preview, has_text)
+
+
+def iter_stored_paragraphs(path, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the paragraphs of a stored text, reading it chunk by chunk.
+
+    Gives the same paragraphs as split_paragraphs() on the whole text,
+    except that paragraphs over MAX_PARAGRAPH_CHARS are cut into pieces.
+    """
+    buffer = ''
+    with open(path, encoding='utf-8', newline='') as text_file:
+        while True:
+            chunk = text_file.read(chunk_size)
+            pieces = PARAGRAPH_BREAK.split(buffer + chunk)
+
+            # The text after the last break may continue in the next chunk
+            buffer = pieces.pop() if chunk else ''
+            for piece in pieces:
+                if piece.strip():
+                    yield piece.strip()
+
+            # Cut an overlong paragraph at its last whitespace
+            while len(buffer) > MAX_PARAGRAPH_CHARS:
+                cut = max(buffer.rfind(' ', 0, MAX_PARAGRAPH_CHARS), buffer.rfind('\n', 0, MAX_PARAGRAPH_CHARS))
+                if cut <= 0:
+                    cut = MAX_PARAGRAPH_CHARS
+                if buffer[:cut].strip():
+                    yield buffer[:cut].strip()
+                buffer = buffer[cut:]
+
+            if not chunk:
+                break
+
+
+def read_stored_text(path):
+    """Return the whole stored text"""
+    with open(path, encoding='utf-8', newline='') as text_file:
+        return text_file.read()
+
+
+def read_stored_preview(path, length=PREVIEW_LENGTH):
+    """Return the first characters of a stored text"""
+    with open(path, encoding='utf-8', newline='') as text_file:
+        return text_file.read(length)
+
+
+def delete_stored_text(path):
+    """Remove a stored text, ignoring files that are already gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
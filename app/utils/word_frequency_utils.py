@@ -1,55 +1,33 @@
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from collections import Counter
-import string
+from .document_utils import as_document
 
-def download_nltk_resources():
+# Bump when the output of the word frequency analyzer changes
+WORD_FREQUENCY_VERSION = 2
+
+WORD_FREQUENCY_TOP_K = 20
+
+def format_word_frequency(total_words, unique_words, top_words):
     """
-    Download NLTK resources needed for word frequency analysis
+    Format word totals and (word, count) pairs as the word frequency result
     """
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
-    
-    try:
-        nltk.data.find('corpora/stopwords')
-    except LookupError:
-        nltk.download('stopwords')
-
-# Initialize NLTK resource download
-download_nltk_resources()
+    return {
+        'total_words': total_words,
+        'unique_words': unique_words,
+        'top_words': [{'word': word, 'count': count} for word, count in top_words]
+    }
 
-def analyze_word_frequency(text, top_k=20):
+def analyze_word_frequency(text, top_k=WORD_FREQUENCY_TOP_K):
     """
     Analyze word frequency in text
     
     Parameters:
-    text (str): Text to analyze
+    text (str or AnalyzedDocument): Text to analyze
     top_k (int): Number of top frequency words to return
     
     Returns:
     dict: Dictionary containing most common words and their frequencies
     """
-    # Convert to lowercase and tokenize
-    tokens = word_tokenize(text.lower())
+    # Count on the shared integer ids of the lowercased tokens, with
+    # punctuation and stopwords removed
+    total_words, unique_words, top_words = as_document(text).token_counts.word_frequency(top_k)
     
-    # Remove punctuation and special characters
-    tokens = [word for word in tokens if word not in string.punctuation]
-    
-    # Remove stopwords (common words with no significant meaning)
-    stop_words = set(stopwords.words('english'))
-    filtered_tokens = [word for word in tokens if word not in stop_words]
-    
-    # Calculate word frequencies
-    word_counts = Counter(filtered_tokens)
-    
-    # Get top K most common words
-    top_words = word_counts.most_common(top_k)
-    
-    return {
-        'total_words': len(tokens),
-        'unique_words': len(set(tokens)),
-        'top_words': [{'word': word, 'count': count} for word, count in top_words]
-    }
\ No newline at end of file
+    return format_word_frequency(total_words, unique_words, top_words)
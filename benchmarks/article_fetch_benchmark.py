@@ -0,0 +1,122 @@
+"""
+Benchmark fetching the full text of news articles.
+
+Serves stand-in article pages from a local HTTP server that sleeps for a
+given time before answering, spread over several loopback host names
+(127.0.0.1, 127.0.0.2, ...), and compares the previous one-at-a-time
+requests.get() loop with ArticleFetcher.fetch_pages(). Reports the wall
+time, the pages received and the largest number of concurrent requests
+any one host saw.
+
+Usage:
+    python benchmarks/article_fetch_benchmark.py [--delays 0.5 1 2 3 0.5 1 4 1.5 6 12] [--hosts 3]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+
+from app import create_app
+from app.utils.news_utils import article_fetcher
+from config import Config
+
+PAGE = '<html><body><article>{}</article></body></html>'.format(
+    '<p>Stand-in article paragraph with enough text to be extracted as content.</p>' * 20)
+
+
+class DelayedArticleServer(ThreadingHTTPServer):
+    """Answers GET /article?delay=<seconds> after sleeping that long"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('0.0.0.0', 0), DelayedArticleHandler)
+        self.lock = threading.Lock()
+        self.active = Counter()
+        self.peak = Counter()
+
+
+class DelayedArticleHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        host = self.headers.get('Host', '').split(':')[0]
+        server = self.server
+        with server.lock:
+            server.active[host] += 1
+            server.peak[host] = max(server.peak[host], server.active[host])
+        try:
+            delay = float(parse_qs(urlsplit(self.path).query).get('delay', ['0'])[0])
+            time.sleep(delay)
+            body = PAGE.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with server.lock:
+                server.active[host] -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serial_fetch(urls, timeout=5):
+    """The previous loop in search_news()"""
+    pages = {}
+    for url in urls:
+        try:
+            response = requests.get(url, timeout=timeout)
+            if response.status_code == 200:
+                pages[url] = response.text
+        except requests.RequestException:
+            pass
+    return pages
+
+
+def run(name, fetch, server, urls):
+    # Let requests abandoned by the previous run finish first
+    while sum(server.active.values()):
+        time.sleep(0.1)
+    server.peak.clear()
+    start = time.perf_counter()
+    pages = fetch(urls)
+    elapsed = time.perf_counter() - start
+    print(f'{name:>10}  {elapsed:6.2f}s  {len(pages):2d}/{len(urls)} pages  '
+          f'peak {max(server.peak.values())} requests per host')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--delays', nargs='+', type=float, default=[0.5, 1, 2, 3, 0.5, 1, 4, 1.5, 6, 12],
+                        help='Response delay of each article, in seconds')
+    parser.add_argument('--hosts', type=int, default=3, help='Loopback host names to spread the articles over')
+    args = parser.parse_args()
+
+    server = DelayedArticleServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    urls = [f'http://127.0.0.{i % args.hosts + 1}:{port}/article?delay={delay}&n={i}'
+            for i, delay in enumerate(args.delays)]
+
+    app = create_app(Config)
+    print(f'{len(urls)} articles over {args.hosts} hosts; timeout {app.config["ARTICLE_FETCH_TIMEOUT"]}s, '
+          f'deadline {app.config["ARTICLE_FETCH_DEADLINE"]}s, {app.config["ARTICLE_FETCH_PER_HOST"]} per host')
+    with app.app_context():
+        run('serial', serial_fetch, server, urls)
+        run('concurrent', article_fetcher.fetch_pages, server, urls)
+        article_fetcher.shutdown(app, wait=False)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
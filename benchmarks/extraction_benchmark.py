@@ -0,0 +1,116 @@
+"""
+Benchmark article extraction on the saved pages in tests/fixtures/articles.
+
+Each <name>.html page has a <name>.txt file with the article text it
+should give (empty if the page has no article). Compares the previous
+BeautifulSoup extraction with extract_article_content() on every
+installed parser backend, reporting the median time per page and the
+word-level F1 score against the expected text.
+
+Usage:
+    python benchmarks/extraction_benchmark.py [--repeat 20]
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.extract_utils import available_backends, extract_article_content
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures', 'articles')
+
+
+def previous_extraction(html):
+    """The BeautifulSoup code that search_news() and latest_news() used to contain"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    article_content = None
+    selectors = [
+        'article', '.article-content', '.story-body', '.entry-content',
+        '.article-body', '.story-content', '.post-content', '.news-content',
+        '[itemprop="articleBody"]', '[property="content:encoded"]',
+        '.main-content', '.blog-post-content', '.node-content'
+    ]
+    for selector in selectors:
+        if selector.startswith('.'):
+            article_content = soup.find(class_=selector[1:])
+        elif selector.startswith('['):
+            attr = selector[1:-1].split('=')
+            if len(attr) == 2:
+                article_content = soup.find(attrs={attr[0]: attr[1].strip('"\'')})
+        else:
+            article_content = soup.find(selector)
+        if article_content:
+            break
+    if not article_content:
+        article_content = soup.find('main') or soup.find(id='main') or soup.find('body')
+    if article_content:
+        paragraphs = article_content.find_all('p')
+        full_content = '\n\n'.join([p.text.strip() for p in paragraphs if len(p.text.strip()) > 20])
+        if full_content and len(full_content) > 100:
+            return full_content
+    return None
+
+
+def word_f1(extracted, expected):
+    """F1 score of the words of the extracted text against the expected text"""
+    got = Counter((extracted or '').split())
+    want = Counter((expected or '').split())
+    if not got and not want:
+        return 1.0
+    common = sum((got & want).values())
+    if not common:
+        return 0.0
+    precision = common / sum(got.values())
+    recall = common / sum(want.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def load_fixtures():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        with open(path[:-len('.html')] + '.txt', encoding='utf-8') as f:
+            expected = f.read().strip() or None
+        pages.append((os.path.basename(path)[:-len('.html')], html, expected))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per page and extractor')
+    args = parser.parse_args()
+
+    extractors = [('previous', previous_extraction)] + [
+        (name, lambda html, name=name: extract_article_content(html, name)) for name in available_backends()
+    ]
+    pages = load_fixtures()
+    print(f'{"page":>20} {"KB":>6}' + ''.join(f'  {name:>20}' for name, _ in extractors))
+    totals = {name: [0.0, 0.0] for name, _ in extractors}
+    for page, html, expected in pages:
+        row = f'{page:>20} {len(html) / 1024:6.0f}'
+        for name, extract in extractors:
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                extracted = extract(html)
+                times.append(time.perf_counter() - start)
+            median = statistics.median(times) * 1000
+            score = word_f1(extracted, expected)
+            totals[name][0] += median
+            totals[name][1] += score
+            row += f'  {median:7.1f}ms  F1 {score:5.3f}'
+        print(row)
+    print(f'{"total / mean":>20} {"":>6}' + ''.join(
+        f'  {time_ms:7.1f}ms  F1 {score / len(pages):5.3f}' for time_ms, score in totals.values()))
+
+
+if __name__ == '__main__':
+    main()
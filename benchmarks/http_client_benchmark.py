@@ -0,0 +1,140 @@
+"""
+Benchmark the shared HTTP client against bare requests.get() calls.
+
+Serves small pages and one very large page from a local keep-alive HTTP
+server. Compares many sequential GETs with requests.get(), which opens a
+new connection every time, against HttpClient.get() on its connection
+pool, and the download of the large page in full against the client's
+streaming byte cap. Reports wall times, connections opened and bytes
+sent by the server.
+
+Usage:
+    python benchmarks/http_client_benchmark.py [--requests 500] [--large-mb 30]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+
+from app import create_app
+from app.utils.http_utils import ResponseTooLarge, http_client
+from config import Config
+
+SMALL_PAGE = b'<html><body><p>Stand-in article paragraph.</p></body></html>'
+CHUNK = b'<p>' + b'x' * 65530 + b'</p>'
+
+
+class PageServer(ThreadingHTTPServer):
+    """Serves /small and /large?mb=<size>, counting connections and bytes sent"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), PageHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.bytes_sent = 0
+
+    def count(self, connections=0, sent=0):
+        with self.lock:
+            self.connections += connections
+            self.bytes_sent += sent
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, delayed ACKs
+    # stall every request on a kept-alive connection by ~40ms
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count(connections=1)
+
+    def do_GET(self):
+        try:
+            if self.path.startswith('/large'):
+                size = int(float(self.path.rsplit('=', 1)[1]) * 1024 * 1024)
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(size))
+                self.end_headers()
+                sent = 0
+                while sent < size:
+                    chunk = CHUNK[:size - sent]
+                    self.wfile.write(chunk)
+                    sent += len(chunk)
+                    self.server.count(sent=len(chunk))
+            else:
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(SMALL_PAGE)))
+                self.end_headers()
+                self.wfile.write(SMALL_PAGE)
+                self.server.count(sent=len(SMALL_PAGE))
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(name, server, fetch):
+    time.sleep(0.2)
+    with server.lock:
+        server.connections = server.bytes_sent = 0
+    start = time.perf_counter()
+    outcome = fetch()
+    elapsed = time.perf_counter() - start
+    time.sleep(0.2)
+    print(f'{name:>28}  {elapsed:7.3f}s  {server.connections:4d} connections  '
+          f'{server.bytes_sent / 1024 / 1024:7.2f}MB sent  {outcome}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=500, help='Sequential GETs of the small page')
+    parser.add_argument('--large-mb', type=float, default=30, help='Size of the large page in MB')
+    args = parser.parse_args()
+
+    server = PageServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    small = f'{base}/small'
+    large = f'{base}/large?mb={args.large_mb}'
+
+    app = create_app(Config)
+    limit = app.config['HTTP_MAX_BODY_BYTES']
+    print(f'{args.requests} small GETs; {args.large_mb:g}MB page with a {limit / 1024 / 1024:g}MB body limit')
+
+    def bare_small():
+        return f'{sum(len(requests.get(small, timeout=5).content) for _ in range(args.requests))} bytes'
+
+    def pooled_small():
+        return f'{sum(len(http_client.get(small, app=app).content) for _ in range(args.requests))} bytes'
+
+    def bare_large():
+        return f'{len(requests.get(large, timeout=30).content)} bytes read'
+
+    def pooled_large():
+        try:
+            return f'{len(http_client.get(large, app=app).content)} bytes read'
+        except ResponseTooLarge as e:
+            return f'aborted: {e}'
+
+    run('requests.get, small', server, bare_small)
+    run('HttpClient.get, small', server, pooled_small)
+    run('requests.get, large', server, bare_large)
+    run('HttpClient.get, large', server, pooled_large)
+    http_client.close(app)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Report the storage used by analysis JSON columns.
+
+Compares the size of the analyzer outputs as the JSON text previously
+stored in analysis_result and analysis_snapshot with the zlib-compressed
+bytes stored now, and times decoding them with each available codec.
+Without --database, analyses of synthetic texts of several sizes are used;
+with --database, the stored rows of an existing (migrated) database are.
+
+Usage:
+    python benchmarks/json_storage_report.py [--sizes 5KB 50KB 500KB] [--database sqlite:////path/app.db]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import LargeBinary, column, create_engine, select, table
+
+from app.models.types import COMPRESSION_LEVEL, dump_json, load_json
+from app.utils.analysis_utils import ANALYZERS, analyze_text
+from ngram_benchmark import make_text, parse_size
+
+TABLES = ('analysis_result', 'analysis_snapshot')
+
+
+def synthetic_payloads(sizes):
+    """Analyzer outputs as the previous Text columns held them (json.dumps)"""
+    for size in sizes:
+        results = analyze_text(make_text(parse_size(size)))
+        for name in ANALYZERS:
+            yield name, json.dumps(results[name]).encode('utf-8')
+
+
+def stored_payloads(url):
+    """Analyzer outputs decompressed from an existing database"""
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        for table_name in TABLES:
+            rows = table(table_name, *[column(name, LargeBinary) for name in ANALYZERS])
+            for row in connection.execute(select(rows)).mappings():
+                for name in ANALYZERS:
+                    if row[name] is not None:
+                        yield name, json.dumps(json.loads(zlib.decompress(row[name]))).encode('utf-8')
+
+
+def decode_time(payloads, loads, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in payloads:
+            loads(zlib.decompress(data))
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', nargs='+', default=['5KB', '50KB', '500KB'])
+    parser.add_argument('--database', help='SQLAlchemy URL of a database migrated to compressed columns')
+    args = parser.parse_args()
+
+    payloads = list(stored_payloads(args.database) if args.database else synthetic_payloads(args.sizes))
+    if not payloads:
+        print('No analysis data found')
+        return
+
+    text_bytes = {}
+    stored_bytes = {}
+    compressed = []
+    for name, text in payloads:
+        data = zlib.compress(dump_json(json.loads(text)), COMPRESSION_LEVEL)
+        compressed.append(data)
+        text_bytes[name] = text_bytes.get(name, 0) + len(text)
+        stored_bytes[name] = stored_bytes.get(name, 0) + len(data)
+
+    print(f'{len(payloads)} payloads')
+    print(f'{"column":>16}  {"JSON text":>10}  {"compressed":>10}  {"saved":>6}')
+    for name in ANALYZERS:
+        if name in text_bytes:
+            saved = 1 - stored_bytes[name] / text_bytes[name]
+            print(f'{name:>16}  {text_bytes[name]:10d}  {stored_bytes[name]:10d}  {saved:6.1%}')
+    total_text, total_stored = sum(text_bytes.values()), sum(stored_bytes.values())
+    print(f'{"total":>16}  {total_text:10d}  {total_stored:10d}  {1 - total_stored / total_text:6.1%}')
+
+    print(f'decode all payloads: {decode_time(compressed, load_json) * 1000:.2f}ms with load_json, '
+          f'{decode_time(compressed, json.loads) * 1000:.2f}ms with json.loads')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark the n-gram and word frequency counting engine.
+
+Compares the NumPy engine used by the analyzers with the previous
+Counter based implementation on synthetic text of several sizes, and
+checks that both give exactly the same output.
+
+Usage:
+    python benchmarks/ngram_benchmark.py [--sizes 10KB 1MB 50MB] [--repeat 3]
+
+Sentence splitting and word tokenization are shared by both implementations
+and are not timed; cleaning the tokens and counting them is.
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.document_utils import AnalyzedDocument, get_stop_words
+from app.utils.ngram_utils import get_multiple_ngrams
+from app.utils.word_frequency_utils import analyze_word_frequency
+
+SIZES = {'KB': 1024, 'MB': 1024 * 1024}
+
+
+def parse_size(value):
+    for suffix, factor in SIZES.items():
+        if value.upper().endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
+
+
+def make_text(size, seed=5505):
+    """Generate news-like text with a Zipf-shaped vocabulary"""
+    rng = random.Random(seed)
+    stop_words = sorted(get_stop_words())
+    vocabulary = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+                  for _ in range(20000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    sentences = []
+    length = 0
+    while length < size:
+        words = rng.choices(vocabulary, weights, k=rng.randint(6, 20))
+        words = [rng.choice(stop_words) if rng.random() < 0.35 else word for word in words]
+        if rng.random() < 0.3:
+            words[rng.randrange(len(words))] += ','
+        sentence = ' '.join(words).capitalize() + rng.choice(['.', '.', '!', '?'])
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return ' '.join(sentences)[:size]
+
+
+def counter_ngrams(document, n, top_k=10):
+    """The previous implementation: tuples in a Counter, fully sorted"""
+    tokens = document.ngram_tokens
+    counts = Counter(zip(*(tokens[i:] for i in range(n))))
+    return {'n': n, 'ngrams': [{'ngram': ' '.join(gram), 'count': count}
+                               for gram, count in counts.most_common(top_k)]}
+
+
+def counter_word_frequency(document, top_k=20):
+    tokens = document.word_tokens
+    stop_words = get_stop_words()
+    counts = Counter(word for word in tokens if word not in stop_words)
+    return {
+        'total_words': len(tokens),
+        'unique_words': len(set(tokens)),
+        'top_words': [{'word': word, 'count': count} for word, count in counts.most_common(top_k)]
+    }
+
+
+def run_counter(document):
+    # The cleaned token lists are built per document, so include them in the timing
+    document._ngram_tokens = document._word_tokens = None
+    return ({'unigrams': counter_ngrams(document, 1), 'bigrams': counter_ngrams(document, 2),
+             'trigrams': counter_ngrams(document, 3)}, counter_word_frequency(document))
+
+
+def run_numpy(document):
+    # The id arrays are built per document, so include them in the timing
+    document._token_counts = None
+    return get_multiple_ngrams(document), analyze_word_frequency(document)
+
+
+def best_of(function, document, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(document)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', nargs='+', default=['10KB', '1MB', '50MB'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'tokens':>10} {'Counter':>10} {'NumPy':>10} {'speedup':>8}  same output")
+    for label in args.sizes:
+        document = AnalyzedDocument(make_text(parse_size(label)))
+        document.lower_tokens  # tokenize outside the timings
+
+        counter_time, expected = best_of(run_counter, document, args.repeat)
+        numpy_time, actual = best_of(run_numpy, document, args.repeat)
+        print(f"{label:>8} {len(document.tokens):>10} {counter_time:>9.3f}s {numpy_time:>9.3f}s "
+              f"{counter_time / numpy_time:>7.1f}x  {expected == actual}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark full-text search over uploads.
+
+Indexes a synthetic corpus through the search triggers and compares
+search_documents() (FTS5 MATCH, BM25 ranking, snippets, keyset pages) with
+the LIKE '%term%' scan it replaces, for frequent, rare and multi-word
+queries, on the first page and on a deep page.
+
+Usage:
+    python benchmarks/search_benchmark.py [--documents 100000] [--words 120] [--repeat 5]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.models import UploadedText, User
+from app.utils.search_utils import search_documents
+from config import Config
+
+
+def make_vocabulary(size=50000, seed=5505):
+    """Random words, most frequent first"""
+    rng = random.Random(seed)
+    return [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def make_documents(vocabulary, count, words, seed=5505):
+    """Generate documents with Zipf-distributed word frequencies"""
+    rng = random.Random(seed)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    for _ in range(count):
+        yield ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(words // 2, words * 3 // 2))).capitalize() + '.'
+
+
+def load_corpus(user_id, documents, batch=5000):
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i, content in enumerate(documents):
+        rows.append({'user_id': user_id, 'title': f'Document {i}', 'content': content,
+                     'file_type': 'text', 'created_at': start + timedelta(seconds=i)})
+        if len(rows) == batch:
+            db.session.execute(insert(UploadedText), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(UploadedText), rows)
+    db.session.commit()
+
+
+def like_search(user_id, words, limit):
+    """The LIKE workaround: every word as a substring, newest first"""
+    query = UploadedText.query.filter(UploadedText.user_id == user_id)
+    for word in words.split():
+        query = query.filter(UploadedText.content.like(f'%{word}%'))
+    return query.order_by(UploadedText.created_at.desc()).limit(limit).all()
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--words', type=int, default=120, help='Average words per document')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'search.db')
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='reader', email='reader@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+
+        vocabulary = make_vocabulary()
+        start = time.perf_counter()
+        load_corpus(user.id, make_documents(vocabulary, args.documents, args.words))
+        print(f'Indexed {args.documents} documents in {time.perf_counter() - start:.1f}s '
+              f'({os.path.getsize(path) / 2 ** 20:.0f}MB database)')
+
+        queries = {
+            'frequent': vocabulary[5],
+            'rare': vocabulary[20000],
+            'two words': f'{vocabulary[50]} {vocabulary[300]}',
+        }
+        print(f'{"query":>10}  {"FTS page 1":>11}  {"FTS page 10":>11}  {"LIKE (unranked)":>15}')
+        for name, words in queries.items():
+            fts_first, (hits, cursor) = timed(lambda: search_documents(user.id, words), args.repeat)
+
+            # Walk to the tenth page, then time fetching it
+            for _ in range(8):
+                if cursor:
+                    _, cursor = search_documents(user.id, words, cursor=cursor)
+            fts_deep, _ = timed(lambda: search_documents(user.id, words, cursor=cursor), args.repeat) if cursor else (None, None)
+
+            like_first, _ = timed(lambda: like_search(user.id, words, 20), args.repeat)
+            deep = f'{fts_deep * 1000:9.1f}ms' if fts_deep is not None else f'{"-":>11}'
+            print(f'{name:>10}  {fts_first * 1000:9.1f}ms  {deep}  {like_first * 1000:13.1f}ms')
+
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
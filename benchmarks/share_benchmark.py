@@ -0,0 +1,120 @@
+"""
+Benchmark sharing analysis results with many users.
+
+Compares the bulk path used by /share/submit (one IN query per table and a
+single INSERT ... ON CONFLICT upsert) with the previous per-pair loop,
+which looked up the result and the existing share for every
+(user, analysis) pair. Each path shares every analysis with every user
+twice: once inserting the shares and once updating them.
+
+Usage:
+    python benchmarks/share_benchmark.py [--users 100] [--analyses 100] [--database sqlite:////tmp/share.db]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import AnalysisResult, SharedAnalysis, UploadedText, User
+from app.utils.share_utils import SHARED_FIELDS, load_share_targets, snapshot_results, upsert_shares
+from config import Config
+
+
+def per_pair_share(owner_id, analysis_ids, user_ids, permission):
+    """The previous share_results() loop (now writing snapshot references)"""
+    for user_id in user_ids:
+        db.session.get(User, user_id)
+    for result_id in analysis_ids:
+        db.session.get(AnalysisResult, result_id)
+    for user_id in user_ids:
+        for result_id in analysis_ids:
+            existing = SharedAnalysis.query.filter_by(user_id=user_id, analysis_id=result_id).first()
+            result = db.session.get(AnalysisResult, result_id)
+            fields = {field: getattr(result, source) for field, source in SHARED_FIELDS.items()}
+            fields['snapshot_id'] = snapshot_results([result])[result_id]
+            if existing:
+                existing.permission = permission
+                existing.sharer_id = owner_id
+                for field, value in fields.items():
+                    setattr(existing, field, value)
+            else:
+                db.session.add(SharedAnalysis(user_id=user_id, analysis_id=result_id, sharer_id=owner_id,
+                                              permission=permission, **fields))
+    db.session.commit()
+
+
+def bulk_share(owner_id, analysis_ids, user_ids, permission):
+    """The share_results() bulk path"""
+    results, _ = load_share_targets(analysis_ids, user_ids)
+    upsert_shares([results[result_id] for result_id in analysis_ids], user_ids, owner_id, permission, '')
+    db.session.commit()
+
+
+def make_fixtures(users, analyses):
+    owner = User(username='owner', email='owner@example.com', password_hash='x')
+    recipients = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x') for i in range(users)]
+    db.session.add_all([owner] + recipients)
+    db.session.commit()
+    upload = UploadedText(user_id=owner.id, title='Benchmark', content='Stocks rose sharply today. ' * 40)
+    db.session.add(upload)
+    db.session.commit()
+    results = [AnalysisResult(title=f'Analysis Result: {i}', content=upload.content, owner_id=owner.id,
+                              upload_id=upload.id, sentiment_data={'compound_score': 0.4},
+                              ngram_data={}, ner_data={}, word_freq_data={})
+               for i in range(analyses)]
+    db.session.add_all(results)
+    db.session.commit()
+    return owner.id, [result.id for result in results], [user.id for user in recipients]
+
+
+def run(name, share, owner_id, analysis_ids, user_ids):
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    timings = []
+    for permission in ('view-only', 'allow-reshare'):
+        start = time.perf_counter()
+        share(owner_id, analysis_ids, user_ids, permission)
+        timings.append(time.perf_counter() - start)
+    event.remove(db.engine, 'before_cursor_execute', count)
+
+    shares = SharedAnalysis.query.count()
+    print(f'{name:>10}  insert {timings[0]:7.3f}s  update {timings[1]:7.3f}s  '
+          f'{len(statements):6d} statements  {shares} shares')
+    SharedAnalysis.query.delete()
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--analyses', type=int, default=100)
+    parser.add_argument('--database', help='SQLAlchemy URL (default: a temporary SQLite file)')
+    args = parser.parse_args()
+
+    database = args.database or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'share.db')}"
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        owner_id, analysis_ids, user_ids = make_fixtures(args.users, args.analyses)
+        print(f'Sharing {len(analysis_ids)} analyses with {len(user_ids)} users')
+        run('per-pair', per_pair_share, owner_id, analysis_ids, user_ids)
+        run('bulk', bulk_share, owner_id, analysis_ids, user_ids)
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,114 @@
 import os
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-here'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///sentinews.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    MAX_CONTENT_LENGTH = 1024 * 1024  # 1MB limit
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or 128 * 1024 * 1024)  # 128MB limit
+    
+    # Server-side sessions: 'server' keeps session data in the database and only a
+    # signed session id in the cookie; 'cookie' uses Flask's signed cookie session
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND') or 'server'
+    SESSION_TTL = int(os.environ.get('SESSION_TTL') or 24 * 60 * 60)  # seconds since last save
+    SESSION_CLEANUP_INTERVAL = int(os.environ.get('SESSION_CLEANUP_INTERVAL') or 10 * 60)
+    
+    # .txt files are streamed to upload storage; files up to UPLOAD_INLINE_MAX_BYTES
+    # are then moved into the database, larger ones stay on disk
+    UPLOAD_STORAGE_DIR = os.environ.get('UPLOAD_STORAGE_DIR') or os.path.join(basedir, 'instance', 'uploads')
+    UPLOAD_INLINE_MAX_BYTES = int(os.environ.get('UPLOAD_INLINE_MAX_BYTES') or 1024 * 1024)
+    # Batch uploads (several files or .zip archives): most texts and total bytes of text
+    UPLOAD_BATCH_MAX_FILES = int(os.environ.get('UPLOAD_BATCH_MAX_FILES') or 500)
+    UPLOAD_BATCH_MAX_BYTES = int(os.environ.get('UPLOAD_BATCH_MAX_BYTES') or 512 * 1024 * 1024)
+    
+    # Background analysis jobs
+    ANALYSIS_JOB_WORKERS = int(os.environ.get('ANALYSIS_JOB_WORKERS') or 2)
+    ANALYSIS_JOBS_EAGER = False  # Run analysis inline in the request (useful for tests)
+    ANALYSIS_JOB_LEASE = int(os.environ.get('ANALYSIS_JOB_LEASE') or 900)  # Running jobs older than this are run again on startup
+    
+    # Process pool for the CPU-bound analyzers (0 runs them in the job thread)
+    ANALYSIS_PROCESS_POOL_SIZE = int(os.environ.get('ANALYSIS_PROCESS_POOL_SIZE') or min(4, os.cpu_count() or 1))
+    ANALYSIS_MAX_TASKS_PER_CHILD = int(os.environ.get('ANALYSIS_MAX_TASKS_PER_CHILD') or 0) or None  # Recycle workers (Python 3.11+)
+    ANALYSIS_TASK_TIMEOUT = int(os.environ.get('ANALYSIS_TASK_TIMEOUT') or 120)  # Seconds per document
+    
+    # Stored analyzer outputs, keyed by content hash, analyzer version and parameters
+    ANALYSIS_CACHE_ENABLED = True
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES') or 10000)
+    ANALYSIS_PARAGRAPH_MAX_ENTRIES = int(os.environ.get('ANALYSIS_PARAGRAPH_MAX_ENTRIES') or 100000)  # Paragraph partials of edited uploads
+    ANALYSIS_BATCH_TIMEOUT = float(os.environ.get('ANALYSIS_BATCH_TIMEOUT') or 5)  # Seconds to analyze search results (?analyze=1)
+    
+    # Stored uploads of at least ANALYSIS_SKETCH_MIN_BYTES (0 = never) count their
+    # top terms with bounded-memory sketches and are flagged approximate.
+    # Count error <= words / CAPACITY; unique word error ~ 1.04 / sqrt(2 ** PRECISION).
+    # They keep at most MAX_ENTITIES entity mentions and TIMELINE_POINTS timeline points
+    ANALYSIS_SKETCH_MIN_BYTES = int(os.environ.get('ANALYSIS_SKETCH_MIN_BYTES', 4 * 1024 * 1024))
+    ANALYSIS_SKETCH_CAPACITY = int(os.environ.get('ANALYSIS_SKETCH_CAPACITY') or 10000)
+    ANALYSIS_SKETCH_PRECISION = int(os.environ.get('ANALYSIS_SKETCH_PRECISION') or 14)
+    ANALYSIS_SKETCH_MAX_ENTITIES = int(os.environ.get('ANALYSIS_SKETCH_MAX_ENTITIES') or 10000)
+    ANALYSIS_SKETCH_TIMELINE_POINTS = int(os.environ.get('ANALYSIS_SKETCH_TIMELINE_POINTS') or 1000)
+    
+    # The /upload/*/stats routes report counters of the whole process (all users);
+    # they answer 404 unless enabled, e.g. on an internal deployment
+    STATS_ENDPOINTS_ENABLED = os.environ.get('STATS_ENDPOINTS_ENABLED', 'false').lower() == 'true'
+    
+    # NLTK data is installed with `flask download-nltk-data` and loaded on first use;
+    # set NLTK_AUTO_DOWNLOAD=true to download missing data on first use instead
+    NLTK_AUTO_DOWNLOAD = os.environ.get('NLTK_AUTO_DOWNLOAD', 'false').lower() == 'true'
+    NLTK_WARM_UP = os.environ.get('NLTK_WARM_UP', 'false').lower() == 'true'  # Load all models in create_app (pre-fork servers)
+    
+    # Full article downloads for news search: threads shared by all requests, concurrent
+    # downloads per site, timeout of one download and total wait per request (seconds)
+    ARTICLE_FETCH_WORKERS = int(os.environ.get('ARTICLE_FETCH_WORKERS') or 16)
+    ARTICLE_FETCH_PER_HOST = int(os.environ.get('ARTICLE_FETCH_PER_HOST') or 2)
+    ARTICLE_FETCH_TIMEOUT = float(os.environ.get('ARTICLE_FETCH_TIMEOUT') or 5)
+    ARTICLE_FETCH_DEADLINE = float(os.environ.get('ARTICLE_FETCH_DEADLINE') or 8)
+    ARTICLE_FETCH_MAX_BYTES = int(os.environ.get('ARTICLE_FETCH_MAX_BYTES') or 2 * 1024 * 1024)  # Larger pages are abandoned
+    ARTICLE_EXTRACT_BACKEND = os.environ.get('ARTICLE_EXTRACT_BACKEND') or None  # 'lxml' or 'html.parser'; None = lxml if installed
+    
+    # Shared outbound HTTP connection pool: hosts kept open, connections per host
+    # (HTTP_POOL_HOST_SIZES overrides it for named hosts), retries of failed GETs with
+    # jittered exponential backoff from HTTP_BACKOFF seconds, and response limits
+    HTTP_POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS') or 32)
+    HTTP_POOL_PER_HOST = int(os.environ.get('HTTP_POOL_PER_HOST') or 10)
+    HTTP_POOL_HOST_SIZES = {'newsapi.org': 20}
+    HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES') or 2)
+    HTTP_BACKOFF = float(os.environ.get('HTTP_BACKOFF') or 0.25)
+    HTTP_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT') or 10)
+    HTTP_MAX_BODY_BYTES = int(os.environ.get('HTTP_MAX_BODY_BYTES') or 5 * 1024 * 1024)
+    
+    # News API responses are reused for NEWS_CACHE_TTL seconds (0 = off) in each process;
+    # extracted article bodies are stored in the database and revalidated with the
+    # site (ETag / Last-Modified) once older than ARTICLE_CACHE_FRESH_SECONDS
+    NEWS_CACHE_TTL = int(os.environ.get('NEWS_CACHE_TTL') or 300)
+    NEWS_CACHE_MAX_ENTRIES = int(os.environ.get('NEWS_CACHE_MAX_ENTRIES') or 256)
+    ARTICLE_CACHE_ENABLED = True
+    ARTICLE_CACHE_FRESH_SECONDS = int(os.environ.get('ARTICLE_CACHE_FRESH_SECONDS') or 3600)
+    ARTICLE_CACHE_MAX_ENTRIES = int(os.environ.get('ARTICLE_CACHE_MAX_ENTRIES') or 5000)
+    
     NEWS_API_KEY = os.environ.get('NEWS_API_KEY') or '240e271a14ab436bb96c9baf3db79133'  # Get from https://newsapi.org/
     
     # Multiple news API keys for fallback options
     GNEWS_API_KEY = os.environ.get('GNEWS_API_KEY') or ''  # Get from https://gnews.io/
-    NEWSDATA_API_KEY = os.environ.get('NEWSDATA_API_KEY') or ''  # Get from https://newsdata.io/
\ No newline at end of file
+    NEWSDATA_API_KEY = os.environ.get('NEWSDATA_API_KEY') or ''  # Get from https://newsdata.io/
+    
+    # Providers with a key are used in this order. 'hedged' asks the next provider when
+    # the ones asked have not answered within NEWS_HEDGE_DELAY seconds or failed; 'all'
+    # asks every provider at once and merges the results. A provider that fails
+    # NEWS_BREAKER_FAILURES times in a row is skipped for NEWS_BREAKER_COOLDOWN seconds
+    NEWS_PROVIDERS = ['newsapi', 'gnews', 'newsdata']
+    NEWS_FANOUT_MODE = os.environ.get('NEWS_FANOUT_MODE') or 'hedged'
+    NEWS_HEDGE_DELAY = float(os.environ.get('NEWS_HEDGE_DELAY') or 1.5)
+    NEWS_PROVIDER_TIMEOUT = float(os.environ.get('NEWS_PROVIDER_TIMEOUT') or 6)
+    NEWS_FANOUT_DEADLINE = float(os.environ.get('NEWS_FANOUT_DEADLINE') or 8)
+    NEWS_BREAKER_FAILURES = int(os.environ.get('NEWS_BREAKER_FAILURES') or 3)
+    NEWS_BREAKER_COOLDOWN = int(os.environ.get('NEWS_BREAKER_COOLDOWN') or 60)
+
+    # The latest news of each category is pulled and analyzed every NEWS_INGEST_INTERVAL
+    # seconds by `flask ingest-news --loop` (or cron), or by a thread of the web process
+    # when NEWS_INGEST_THREAD is set; the latest news tab uses the corpus while it is fresh
+    NEWS_INGEST_CATEGORIES = ['general', 'business', 'entertainment', 'health', 'science', 'sports', 'technology']
+    NEWS_INGEST_PER_CATEGORY = int(os.environ.get('NEWS_INGEST_PER_CATEGORY') or 10)
+    NEWS_INGEST_INTERVAL = int(os.environ.get('NEWS_INGEST_INTERVAL') or 900)
+    NEWS_INGEST_MAX_AGE_DAYS = int(os.environ.get('NEWS_INGEST_MAX_AGE_DAYS') or 7)
+    NEWS_INGEST_THREAD = os.environ.get('NEWS_INGEST_THREAD', 'false').lower() == 'true'
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""Add batch id to analysis jobs
+
+Revision ID: 3f9b6d2c8e45
+Revises: a4c8e2f61d07
+Create Date: 2026-10-18 20:12:36.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9b6d2c8e45'
+down_revision = 'a4c8e2f61d07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('analysis_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('batch_id', sa.String(length=32), nullable=True))
+        batch_op.create_index(batch_op.f('ix_analysis_job_batch_id'), ['batch_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_analysis_job_batch_id'))
+        batch_op.drop_column('batch_id')
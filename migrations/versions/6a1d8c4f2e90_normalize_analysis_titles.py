@@ -0,0 +1,51 @@
+"""Store analysis and share titles in the "Analysis Result: " form
+
+The share page used to rewrite these titles while rendering; it now only
+reads them.
+
+Revision ID: 6a1d8c4f2e90
+Revises: 2c7f5a9e4d16
+Create Date: 2026-10-18 16:12:08.093471
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1d8c4f2e90'
+down_revision = '2c7f5a9e4d16'
+branch_labels = None
+depends_on = None
+
+PREFIX = 'Analysis Result: '
+
+
+def _normalize(title):
+    # Same rules as format_analysis_title() in app/utils/analysis_utils.py
+    if title.startswith(PREFIX):
+        formatted = title
+    elif title.startswith('Analysis of '):
+        formatted = title.replace('Analysis of ', PREFIX)
+    else:
+        formatted = f'{PREFIX}{title}'
+    return formatted.replace(PREFIX + PREFIX, PREFIX)[:200]
+
+
+def upgrade():
+    conn = op.get_bind()
+    for table_name in ('analysis_result', 'shared_analysis'):
+        table = sa.table(table_name,
+            sa.column('id', sa.Integer),
+            sa.column('title', sa.String)
+        )
+        rows = conn.execute(sa.select(table.c.id, table.c.title).where(table.c.title.isnot(None))).fetchall()
+        for row_id, title in rows:
+            normalized = _normalize(title)
+            if normalized != title:
+                conn.execute(table.update().where(table.c.id == row_id).values(title=normalized))
+
+
+def downgrade():
+    # The original title forms are not kept; normalized titles stay as they are
+    pass
@@ -0,0 +1,100 @@
+"""Add full-text search index of uploads and analysis results
+
+Creates the FTS5 table and sync triggers of app/models/search.py and
+indexes the existing rows. SQLite only; other databases are unchanged.
+
+Revision ID: a4c8e2f61d07
+Revises: d7f1b3a85c29
+Create Date: 2026-10-18 19:04:52.118306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f61d07'
+down_revision = 'd7f1b3a85c29'
+branch_labels = None
+depends_on = None
+
+# Characters of a text kept in upload storage that are indexed
+SEARCH_STORED_TEXT_CHARS = 10 * 1024 * 1024
+
+# As in app/models/search.py at this revision
+SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        title, body, owner,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+    "INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(2.0, 1.0, 0.0)')",
+    """CREATE TRIGGER IF NOT EXISTS uploaded_texts_search_insert AFTER INSERT ON uploaded_texts BEGIN
+        INSERT INTO search_index (rowid, title, body, owner)
+        VALUES (new.id * 2, new.title, new.content, 'u' || new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS uploaded_texts_search_update
+    AFTER UPDATE OF title, content, content_path, user_id ON uploaded_texts BEGIN
+        UPDATE search_index SET title = new.title, owner = 'u' || new.user_id,
+            body = CASE WHEN new.content IS NULL AND new.content_path IS NOT NULL THEN body ELSE new.content END
+        WHERE rowid = new.id * 2;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS uploaded_texts_search_delete AFTER DELETE ON uploaded_texts BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS analysis_result_search_insert AFTER INSERT ON analysis_result BEGIN
+        INSERT INTO search_index (rowid, title, body, owner)
+        VALUES (new.id * 2 + 1, new.title, new.content, 'u' || new.owner_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS analysis_result_search_update
+    AFTER UPDATE OF title, content, owner_id ON analysis_result BEGIN
+        UPDATE search_index SET title = new.title, body = new.content, owner = 'u' || new.owner_id
+        WHERE rowid = new.id * 2 + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS analysis_result_search_delete AFTER DELETE ON analysis_result BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+    END""",
+]
+
+SEARCH_DROP_DDL = [
+    'DROP TRIGGER IF EXISTS uploaded_texts_search_insert',
+    'DROP TRIGGER IF EXISTS uploaded_texts_search_update',
+    'DROP TRIGGER IF EXISTS uploaded_texts_search_delete',
+    'DROP TRIGGER IF EXISTS analysis_result_search_insert',
+    'DROP TRIGGER IF EXISTS analysis_result_search_update',
+    'DROP TRIGGER IF EXISTS analysis_result_search_delete',
+    'DROP TABLE IF EXISTS search_index',
+]
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'sqlite':
+        return
+
+    for statement in SEARCH_DDL:
+        op.execute(statement)
+
+    op.execute("""INSERT INTO search_index (rowid, title, body, owner)
+                  SELECT id * 2, title, content, 'u' || user_id FROM uploaded_texts""")
+    op.execute("""INSERT INTO search_index (rowid, title, body, owner)
+                  SELECT id * 2 + 1, title, content, 'u' || owner_id FROM analysis_result""")
+
+    stored = conn.execute(sa.text(
+        'SELECT id, content_path FROM uploaded_texts WHERE content IS NULL AND content_path IS NOT NULL'
+    )).all()
+    for upload_id, content_path in stored:
+        try:
+            with open(content_path, encoding='utf-8', newline='') as text_file:
+                body = text_file.read(SEARCH_STORED_TEXT_CHARS)
+        except OSError:
+            continue
+        conn.execute(sa.text('UPDATE search_index SET body = :body WHERE rowid = :rowid'),
+                     {'body': body, 'rowid': upload_id * 2})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for statement in SEARCH_DROP_DDL:
+        op.execute(statement)
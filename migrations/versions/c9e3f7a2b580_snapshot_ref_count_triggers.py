@@ -0,0 +1,99 @@
+"""Keep snapshot ref_count with triggers on shared_analysis
+
+Creates the triggers of SNAPSHOT_REF_DDL in app/models/snapshot.py, which
+count the shares of each snapshot and delete snapshots whose last share is
+removed, then recounts the existing snapshots. SQLite and PostgreSQL only;
+on other databases upsert_shares() keeps recounting.
+
+Revision ID: c9e3f7a2b580
+Revises: b4d8e2f6a1c7
+Create Date: 2026-10-19 00:21:44.630195
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e3f7a2b580'
+down_revision = 'b4d8e2f6a1c7'
+branch_labels = None
+depends_on = None
+
+# As in app/models/snapshot.py at this revision
+SNAPSHOT_REF_DDL = {
+    'sqlite': [
+        """CREATE TRIGGER IF NOT EXISTS shared_analysis_snapshot_insert AFTER INSERT ON shared_analysis
+        WHEN new.snapshot_id IS NOT NULL BEGIN
+            UPDATE analysis_snapshot SET ref_count = ref_count + 1 WHERE id = new.snapshot_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS shared_analysis_snapshot_update AFTER UPDATE OF snapshot_id ON shared_analysis
+        WHEN new.snapshot_id IS NOT old.snapshot_id BEGIN
+            UPDATE analysis_snapshot SET ref_count = ref_count + 1 WHERE id = new.snapshot_id;
+            UPDATE analysis_snapshot SET ref_count = ref_count - 1 WHERE id = old.snapshot_id;
+            DELETE FROM analysis_snapshot WHERE id = old.snapshot_id AND ref_count <= 0;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS shared_analysis_snapshot_delete AFTER DELETE ON shared_analysis
+        WHEN old.snapshot_id IS NOT NULL BEGIN
+            UPDATE analysis_snapshot SET ref_count = ref_count - 1 WHERE id = old.snapshot_id;
+            DELETE FROM analysis_snapshot WHERE id = old.snapshot_id AND ref_count <= 0;
+        END""",
+    ],
+    'postgresql': [
+        """CREATE OR REPLACE FUNCTION shared_analysis_snapshot_refs() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.snapshot_id IS NOT DISTINCT FROM OLD.snapshot_id THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP <> 'DELETE' AND NEW.snapshot_id IS NOT NULL THEN
+                UPDATE analysis_snapshot SET ref_count = ref_count + 1 WHERE id = NEW.snapshot_id;
+            END IF;
+            IF TG_OP <> 'INSERT' AND OLD.snapshot_id IS NOT NULL THEN
+                UPDATE analysis_snapshot SET ref_count = ref_count - 1 WHERE id = OLD.snapshot_id;
+                DELETE FROM analysis_snapshot WHERE id = OLD.snapshot_id AND ref_count <= 0;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+        """CREATE TRIGGER shared_analysis_snapshot_refs
+        AFTER INSERT OR DELETE OR UPDATE OF snapshot_id ON shared_analysis
+        FOR EACH ROW EXECUTE FUNCTION shared_analysis_snapshot_refs()""",
+    ],
+}
+
+SNAPSHOT_REF_DROP_DDL = {
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS shared_analysis_snapshot_insert',
+        'DROP TRIGGER IF EXISTS shared_analysis_snapshot_update',
+        'DROP TRIGGER IF EXISTS shared_analysis_snapshot_delete',
+    ],
+    'postgresql': [
+        'DROP TRIGGER IF EXISTS shared_analysis_snapshot_refs ON shared_analysis',
+        'DROP FUNCTION IF EXISTS shared_analysis_snapshot_refs()',
+    ],
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect not in SNAPSHOT_REF_DDL:
+        return
+
+    for statement in SNAPSHOT_REF_DDL[dialect]:
+        op.execute(statement)
+
+    # Start from the current references
+    snapshots = sa.table('analysis_snapshot', sa.column('id', sa.Integer), sa.column('ref_count', sa.Integer))
+    shares = sa.table('shared_analysis', sa.column('id', sa.Integer), sa.column('snapshot_id', sa.Integer))
+    references = sa.select(sa.func.count(shares.c.id)).where(shares.c.snapshot_id == snapshots.c.id).scalar_subquery()
+    op.execute(snapshots.update().values(ref_count=references))
+    op.execute(snapshots.delete().where(snapshots.c.ref_count == 0))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect not in SNAPSHOT_REF_DROP_DDL:
+        return
+
+    for statement in SNAPSHOT_REF_DROP_DDL[dialect]:
+        op.execute(statement)
@@ -0,0 +1,138 @@
+"""Store analysis JSON as zlib-compressed binary
+
+Rewrites the four analyzer output columns of analysis_result and
+analysis_snapshot from JSON text to compressed JSON bytes (see
+CompressedJSON in app/models/types.py) and logs the size reduction.
+
+Revision ID: d7f1b3a85c29
+Revises: e5c3a7d91b42
+Create Date: 2026-10-18 18:21:17.552964
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import hashlib
+import json
+import logging
+import zlib
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7f1b3a85c29'
+down_revision = 'e5c3a7d91b42'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+JSON_FIELDS = ('sentiment_data', 'ngram_data', 'ner_data', 'word_freq_data')
+SNAPSHOT_FIELDS = ('content',) + JSON_FIELDS
+
+
+def _compress(text):
+    # Same encoding as CompressedJSON: compact UTF-8 JSON, zlib level 6
+    value = json.loads(text)
+    return zlib.compress(json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), 6)
+
+
+def _decompress(data):
+    return json.dumps(json.loads(zlib.decompress(data)))
+
+
+def _snapshot_hash(fields):
+    # Same as hash_snapshot() in app/models/snapshot.py, on the decoded values
+    canonical = json.dumps({name: fields.get(name) for name in SNAPSHOT_FIELDS}, sort_keys=True)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _convert(table_name, old_type, new_type, convert):
+    """Rewrite the JSON columns of a table through temporary columns; returns (bytes before, bytes after)
+
+    The columns are added, dropped and renamed with plain ALTER TABLE
+    (SQLite 3.35+) rather than a batch table rebuild: on SQLite with
+    foreign keys on, dropping the old analysis_result table would cascade
+    to shared_analysis and null analysis_job.analysis_id.
+    """
+    for name in JSON_FIELDS:
+        op.add_column(table_name, sa.Column(f'{name}_new', new_type, nullable=True))
+
+    conn = op.get_bind()
+    table = sa.table(table_name, sa.column('id', sa.Integer),
+                     *[sa.column(name, old_type) for name in JSON_FIELDS],
+                     *[sa.column(f'{name}_new', new_type) for name in JSON_FIELDS])
+    before = after = 0
+    for row in conn.execute(sa.select(table.c.id, *[table.c[name] for name in JSON_FIELDS])).mappings():
+        values = {}
+        for name in JSON_FIELDS:
+            if row[name] is not None:
+                values[f'{name}_new'] = convert(row[name])
+                before += len(row[name])
+                after += len(values[f'{name}_new'])
+        if values:
+            conn.execute(table.update().where(table.c.id == row['id']).values(**values))
+
+    for name in JSON_FIELDS:
+        op.drop_column(table_name, name)
+        op.alter_column(table_name, f'{name}_new', new_column_name=name)
+    return before, after
+
+
+def _rehash_snapshots(decode):
+    """Recompute snapshot hashes from the stored values, merging snapshots that become equal"""
+    conn = op.get_bind()
+    snapshots = sa.table('analysis_snapshot', sa.column('id', sa.Integer), sa.column('snapshot_hash', sa.String),
+                         sa.column('content', sa.Text), *[sa.column(name, sa.LargeBinary) for name in JSON_FIELDS])
+    shares = sa.table('shared_analysis', sa.column('id', sa.Integer), sa.column('snapshot_id', sa.Integer))
+
+    rows = conn.execute(sa.select(snapshots.c.id, snapshots.c.content,
+                                  *[snapshots.c[name] for name in JSON_FIELDS])).mappings().all()
+    # Clear the hashes first so the unique constraint holds while rewriting them
+    conn.execute(snapshots.update().values(snapshot_hash=sa.cast(snapshots.c.id, sa.String)))
+    kept = {}
+    for row in rows:
+        fields = {name: decode(row[name]) if row[name] is not None else None for name in JSON_FIELDS}
+        fields['content'] = row['content']
+        snapshot_hash = _snapshot_hash(fields)
+        if snapshot_hash in kept:
+            conn.execute(shares.update().where(shares.c.snapshot_id == row['id']).values(snapshot_id=kept[snapshot_hash]))
+            conn.execute(snapshots.delete().where(snapshots.c.id == row['id']))
+        else:
+            kept[snapshot_hash] = row['id']
+            conn.execute(snapshots.update().where(snapshots.c.id == row['id']).values(snapshot_hash=snapshot_hash))
+
+    counts = sa.table('analysis_snapshot', sa.column('id', sa.Integer), sa.column('ref_count', sa.Integer))
+    references = sa.select(sa.func.count(shares.c.id)).where(shares.c.snapshot_id == counts.c.id).scalar_subquery()
+    conn.execute(counts.update().values(ref_count=references))
+
+
+def upgrade():
+    total_before = total_after = 0
+    for table_name in ('analysis_result', 'analysis_snapshot'):
+        before, after = _convert(table_name, sa.Text, sa.LargeBinary, _compress)
+        total_before += before
+        total_after += after
+        logger.info(f'{table_name}: {before} bytes of JSON -> {after} bytes compressed')
+    if total_before:
+        logger.info(f'Analysis JSON reduced by {100 * (1 - total_after / total_before):.1f}% '
+                    f'({total_before} -> {total_after} bytes)')
+
+    _rehash_snapshots(lambda data: json.loads(zlib.decompress(data)))
+
+
+def downgrade():
+    for table_name in ('analysis_result', 'analysis_snapshot'):
+        _convert(table_name, sa.LargeBinary, sa.Text, _decompress)
+
+    # Text-era snapshot hashes were computed on the JSON strings
+    _rehash_snapshots_text()
+
+
+def _rehash_snapshots_text():
+    conn = op.get_bind()
+    snapshots = sa.table('analysis_snapshot', sa.column('id', sa.Integer), sa.column('snapshot_hash', sa.String),
+                         sa.column('content', sa.Text), *[sa.column(name, sa.Text) for name in JSON_FIELDS])
+    rows = conn.execute(sa.select(snapshots.c.id, snapshots.c.content,
+                                  *[snapshots.c[name] for name in JSON_FIELDS])).mappings().all()
+    for row in rows:
+        conn.execute(snapshots.update().where(snapshots.c.id == row['id']).values(
+            snapshot_hash=_snapshot_hash(dict(row))))
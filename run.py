@@ -1,9 +1,13 @@
 from app import create_app, db
+from app.utils.job_utils import analysis_jobs
 
 app = create_app()
 
 with app.app_context():
     db.create_all()
 
+# Pick up analysis jobs left unfinished by a previous run
+analysis_jobs.requeue_pending(app)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True)
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 sys.path.append('..')
 from config import Config
 
@@ -8,3 +9,7 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     LOGIN_DISABLED = False
+    # In-memory SQLite is per thread, so run analysis jobs inline
+    ANALYSIS_JOBS_EAGER = True
+    ANALYSIS_PROCESS_POOL_SIZE = 0
+    UPLOAD_STORAGE_DIR = os.path.join(tempfile.gettempdir(), 'sentinews-test-uploads')
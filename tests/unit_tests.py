@@ -86,5 +86,1352 @@ class TestRoutes(unittest.TestCase):
         response = self.client.get('/cleanup-orphaned-results', follow_redirects=True)
         self.assertTrue(b'Successfully cleaned up' in response.data or response.status_code == 200)
 
+    def test_text_upload_queues_analysis_job(self):
+        user = User(username='jobuser', email='job@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'jobuser', 'password': 'password'})
+
+        response = self.client.post('/upload/text', data={'content': 'Alice visited Paris. It was a wonderful trip.'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()['job_id']
+
+        # Jobs run inline under TestConfig, so the result is ready right away
+        status = self.client.get(f'/upload/jobs/{job_id}').get_json()
+        self.assertEqual(status['job']['status'], 'done')
+        self.assertTrue(status['job']['url_path'])
+
+        response = self.client.get(f'/analysis/job/{job_id}')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(status['job']['url_path'], response.headers['Location'])
+
+    def test_requeue_only_reclaims_abandoned_jobs(self):
+        from datetime import datetime, timedelta
+        from app.models import AnalysisJob
+        from app.utils.job_utils import analysis_jobs
+        user = User(username='requeueuser', email='requeue@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        jobs = {}
+        for name, status, started_at in (
+            ('queued', AnalysisJob.QUEUED, None),
+            ('live', AnalysisJob.RUNNING, datetime.utcnow() - timedelta(seconds=30)),
+            ('abandoned', AnalysisJob.RUNNING, datetime.utcnow() - timedelta(hours=2)),
+        ):
+            upload = UploadedText(user_id=user.id, content=f'The {name} job is about a sunny day in Perth.')
+            db.session.add(upload)
+            db.session.commit()
+            jobs[name] = AnalysisJob(user_id=user.id, upload_id=upload.id, status=status, started_at=started_at)
+            db.session.add(jobs[name])
+        db.session.commit()
+
+        # A job still running in another process is not run a second time
+        self.assertEqual(analysis_jobs.requeue_pending(self.app), 2)
+        db.session.expire_all()
+        self.assertEqual(jobs['queued'].status, AnalysisJob.DONE)
+        self.assertEqual(jobs['abandoned'].status, AnalysisJob.DONE)
+        self.assertEqual(jobs['live'].status, AnalysisJob.RUNNING)
+
+    def test_in_process_batch_analysis_stops_waiting_at_the_budget(self):
+        import time
+        from unittest import mock
+        from app.utils import pool_utils
+
+        def slow_analysis(text, names):
+            time.sleep(0.3)
+            return {name: text for name in names}
+
+        try:
+            with mock.patch.object(pool_utils, 'analyze_text', side_effect=slow_analysis):
+                start = time.monotonic()
+                results = pool_utils.analysis_pool.analyze_many(self.app, ['a', 'b', 'c', 'd'], ['ner_data'], timeout=0.45)
+                elapsed = time.monotonic() - start
+
+            # A text running when the budget ends is not waited for
+            self.assertLess(elapsed, 0.55)
+            self.assertEqual(results, [{'ner_data': 'a'}, {}, {}, {}])
+        finally:
+            pool_utils.analysis_pool.shutdown(self.app)
+
+    def test_process_pool_matches_in_process_analysis(self):
+        import time
+        from concurrent.futures import TimeoutError
+        from app.utils.analysis_utils import analyze_text
+        from app.utils.pool_utils import analysis_pool
+        texts = ['Alice flew from Paris to Berlin. The trip was wonderful and the food was great.',
+                 'The storm flooded London. Residents were angry about the slow response.\n\nRepairs begin today.']
+        self.app.config.update(ANALYSIS_PROCESS_POOL_SIZE=2)
+        try:
+            # Each text is one task that runs its analyzers over one tokenization
+            self.assertEqual(analysis_pool.analyze(self.app, texts[0]), analyze_text(texts[0]))
+            names = ['sentiment_data', 'ner_data']
+            self.assertEqual(analysis_pool.analyze_many(self.app, texts, names),
+                             [analyze_text(text, names) for text in texts])
+
+            # A timed-out task stops its worker instead of keeping it busy
+            executor = self.app.extensions['analysis_pool']['executor']
+            workers = list(executor._processes.values())
+            self.app.config['ANALYSIS_TASK_TIMEOUT'] = 0.01
+            with self.assertRaises(TimeoutError):
+                analysis_pool.analyze(self.app, ' '.join(texts) * 200)
+            for worker in workers:
+                worker.join(10)
+                self.assertFalse(worker.is_alive())
+            self.assertIsNone(self.app.extensions['analysis_pool']['executor'])
+
+            # Another document's task on the same pool still finishes; then the workers stop
+            self.app.config['ANALYSIS_TASK_TIMEOUT'] = 0.5
+            executor = analysis_pool._get_executor(self.app)
+            for future in [executor.submit(time.sleep, 0.2) for _ in range(2)]:
+                future.result()
+            workers = list(executor._processes.values())
+            slow = executor.submit(time.sleep, 30)
+            other = executor.submit(time.sleep, 1.5)
+            with self.assertRaises(TimeoutError):
+                analysis_pool._results(self.app, executor, [slow])
+            self.assertIsNone(other.result(timeout=10))
+            for worker in workers:
+                worker.join(10)
+                self.assertFalse(worker.is_alive())
+            self.assertIsNot(analysis_pool._get_executor(self.app), executor)
+        finally:
+            analysis_pool.shutdown(self.app)
+
+    def test_identical_upload_reuses_stored_analysis(self):
+        from app.utils.cache_utils import analysis_store
+        user = User(username='cacheuser', email='cache@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'cacheuser', 'password': 'password'})
+
+        text = 'Bob moved to London. The weather there is grey but the people are kind.'
+        self.client.post('/upload/text', data={'content': text})
+        first = analysis_store.stats(self.app)
+        self.client.post('/upload/text', data={'content': text})
+        second = analysis_store.stats(self.app)
+
+        # The second upload is served entirely from the store
+        self.assertEqual(second['misses'], first['misses'])
+        self.assertEqual(second['hits'] - first['hits'], 4)
+        self.assertEqual(second['entries'], 4)
+
+    def test_nltk_models_load_once(self):
+        from app.utils.nltk_utils import NLTKResources
+        resources = NLTKResources()
+        timings = resources.warm_up()
+        self.assertEqual(set(timings), {'word_tokenizer', 'sentence_tokenizer', 'stop_words',
+                                        'sentiment_analyzer', 'pos_tagger', 'ne_chunker'})
+        self.assertIs(resources.get('pos_tagger'), resources.get('pos_tagger'))
+
+    def test_sentence_sentiment_timeline(self):
+        from app.utils.sentiment_utils import analyze_sentence_sentiment
+        timeline = analyze_sentence_sentiment('I love it. I hate it. It is a table.', window=2)
+        scores = timeline['scores']
+        self.assertEqual(len(scores), 3)
+        self.assertEqual(timeline['rolling_average'][0], round(scores[0], 4))
+        self.assertEqual(timeline['rolling_average'][2], round((scores[1] + scores[2]) / 2, 4))
+
+    def test_sentiment_summary_scores_each_sentence_once(self):
+        from unittest import mock
+        from app.utils.nltk_utils import nltk_resources
+        from app.utils.sentiment_utils import get_sentiment_summary
+        text = 'I love it. I hate it. It is a table.'
+        sia = nltk_resources.get('sentiment_analyzer')
+        expected = sia.polarity_scores(text)
+        sentence_scores = [sia.polarity_scores(sentence)['compound']
+                           for sentence in ('I love it.', 'I hate it.', 'It is a table.')]
+        with mock.patch.object(sia, 'sentiment_valence', wraps=sia.sentiment_valence) as sentiment_valence:
+            sia.polarity_scores(text)
+        words = sentiment_valence.call_count
+        with mock.patch.object(sia, 'polarity_scores', wraps=sia.polarity_scores) as polarity_scores, \
+                mock.patch.object(sia, 'sentiment_valence', wraps=sia.sentiment_valence) as sentiment_valence:
+            summary = get_sentiment_summary(text)
+        # Words are scored once, for the sentences and the whole text alike
+        polarity_scores.assert_not_called()
+        self.assertEqual(sentiment_valence.call_count, words)
+        self.assertEqual(summary['compound_score'], expected['compound'])
+        self.assertEqual((summary['positive_score'], summary['negative_score'], summary['neutral_score']),
+                         (expected['pos'], expected['neg'], expected['neu']))
+        self.assertEqual(summary['timeline']['scores'], sentence_scores)
+
+    def test_analyzers_share_one_tokenization(self):
+        import string
+        from collections import Counter
+        from unittest import mock
+        from nltk.tokenize import word_tokenize
+        from app.utils import document_utils
+        from app.utils.analysis_utils import analyze_text
+        from app.utils.document_utils import AnalyzedDocument, clean_token, get_stop_words
+        text = ('The museum in Paris opened a new wing on Monday. "It is wonderful," said the curator!\n\n'
+                'Visitors queued for hours, and 3 cafes sold out of coffee.')
+
+        # The shared streams are the ones each analyzer used to build for itself
+        document = AnalyzedDocument(text)
+        baseline = word_tokenize(text.lower())
+        self.assertEqual(document.tokens, word_tokenize(text))
+        self.assertEqual(document.lower_tokens, baseline)
+        self.assertEqual(document.word_tokens, [word for word in baseline if word not in string.punctuation])
+        stop_words = get_stop_words()
+        self.assertEqual(document.ngram_tokens,
+                         [clean_token(token, stop_words) for token in baseline if clean_token(token, stop_words)])
+        counts = document.token_counts
+        self.assertEqual([counts.words[i] for i in counts.word_ids], document.word_tokens)
+        self.assertEqual([counts.cleaned_words[i] for i in counts.ngram_ids], document.ngram_tokens)
+
+        # All four analyzers, run twice, split and tokenize the text only once
+        calls = Counter()
+        get = document_utils.nltk_resources.get
+
+        class CountingTokenizer:
+            def __init__(self, name):
+                self.name = name
+
+            def tokenize(self, text):
+                calls[self.name] += 1
+                return get(self.name).tokenize(text)
+
+        def counting_get(name):
+            return CountingTokenizer(name) if name.endswith('_tokenizer') else get(name)
+
+        with mock.patch.object(document_utils.nltk_resources, 'get', side_effect=counting_get):
+            document = AnalyzedDocument(text)
+            analyze_text(document)
+            stages = (document.tokens, document.lower_tokens, document.word_tokens, document.token_counts)
+            analyze_text(document)
+        self.assertEqual(calls['sentence_tokenizer'], len(document.paragraphs))
+        self.assertEqual(calls['word_tokenizer'], len(document.sentences))
+        for stage, again in zip(stages, (document.tokens, document.lower_tokens,
+                                         document.word_tokens, document.token_counts)):
+            self.assertIs(stage, again)
+
+    def test_ngram_counts_match_counter(self):
+        from collections import Counter
+        from app.utils.document_utils import AnalyzedDocument
+        from app.utils.ngram_utils import get_multiple_ngrams
+        document = AnalyzedDocument('Red fox, blue fox. Red fox jumps! Blue bird sings, red bird jumps.')
+        tokens = document.ngram_tokens
+        result = get_multiple_ngrams(document)
+        for key, n in (('unigrams', 1), ('bigrams', 2), ('trigrams', 3)):
+            expected = Counter(zip(*(tokens[i:] for i in range(n)))).most_common(10)
+            self.assertEqual(result[key]['ngrams'],
+                             [{'ngram': ' '.join(gram), 'count': count} for gram, count in expected])
+
+    def test_shared_tokenization_matches_the_original_analyzers(self):
+        import re
+        import string
+        from collections import Counter
+        from nltk.corpus import stopwords
+        from nltk.tokenize import word_tokenize
+        from nltk.util import ngrams
+        from app.utils.analysis_utils import analyze_text
+        from app.utils.paragraph_utils import analyze_paragraphs
+        # A fixed corpus with many tied counts, stopwords, numbers, curly quotes and dashes
+        corpus = [
+            'Red fox, blue fox. Red fox jumps! Blue bird sings, red bird jumps.',
+            ('The council met on Monday \u2014 and again on Tuesday \u2014 to discuss the budget. '
+             '\u201cIt\u2019s the budget we need,\u201d said the mayor; others said it was not.\n\n'
+             'Taxes rose 3% in 2023, and 3 new parks opened. Parks, taxes and budgets: the usual debate\u2026'),
+            ('One two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen '
+             'sixteen seventeen eighteen nineteen twenty twenty-one twenty-two. One two three! '
+             "Don't stop; can't stop -- won't stop. U.S. markets fell 2.5 percent.\n\n\n"
+             'Alpha beta gamma. Gamma beta alpha. Alpha, beta; gamma? Delta.')
+        ]
+        stop_words = set(stopwords.words('english'))
+
+        def original_ngrams(text, n):
+            # ngram_utils.analyze_ngrams before the shared tokenization
+            tokens = [re.sub(r'[^a-zA-Z0-9]', '', token) for token in word_tokenize(text.lower())]
+            tokens = [token for token in tokens if token and token.lower() not in stop_words]
+            top = Counter(ngrams(tokens, n)).most_common(10)
+            return {'n': n, 'ngrams': [{'ngram': ' '.join(gram), 'count': count} for gram, count in top]}
+
+        def original_word_frequency(text):
+            # word_frequency_utils.analyze_word_frequency before the shared tokenization
+            tokens = [word for word in word_tokenize(text.lower()) if word not in string.punctuation]
+            top = Counter(word for word in tokens if word not in stop_words).most_common(20)
+            return {
+                'total_words': len(tokens),
+                'unique_words': len(set(tokens)),
+                'top_words': [{'word': word, 'count': count} for word, count in top]
+            }
+
+        for text in corpus:
+            with self.subTest(text=text[:20]):
+                expected_ngrams = {key: original_ngrams(text, n) for key, n in
+                                   (('unigrams', 1), ('bigrams', 2), ('trigrams', 3))}
+                # Whole-text analysis and the merge of paragraph partials alike
+                for result in (analyze_text(text), analyze_paragraphs(text)):
+                    self.assertEqual(result['ngram_data'], expected_ngrams)
+                    self.assertEqual(result['word_freq_data'], original_word_frequency(text))
+
+    def test_edited_upload_reanalyzes_changed_paragraphs(self):
+        from app.utils.analysis_utils import analyze_text
+        from app.utils.cache_utils import analysis_store
+        user = User(username='edituser', email='edit@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'edituser', 'password': 'password'})
+
+        paragraphs = ['Alice flew to Paris on Monday.', 'The weather was cold and grey.', 'Bob met her at the station.']
+        self.client.post('/upload/text', data={'content': '\n\n'.join(paragraphs)})
+        first = analysis_store.stats(self.app)
+
+        paragraphs[1] = 'The weather was warm and sunny.'
+        edited = '\n\n'.join(paragraphs)
+        response = self.client.post('/upload/text', data={'content': edited})
+        second = analysis_store.stats(self.app)
+
+        # Only the changed paragraph is analyzed again
+        self.assertEqual(second['paragraph_hits'] - first['paragraph_hits'], 2)
+        self.assertEqual(second['paragraph_misses'] - first['paragraph_misses'], 1)
+
+        # The merged outputs equal a fresh analysis of the whole text
+        job_id = response.get_json()['job_id']
+        url_path = self.client.get(f'/upload/jobs/{job_id}').get_json()['job']['url_path']
+        result = AnalysisResult.query.filter_by(url_path=url_path).first()
+        expected = analyze_text(edited)
+        self.assertEqual(result.ngram_data, expected['ngram_data'])
+        self.assertEqual(result.word_freq_data, expected['word_freq_data'])
+        self.assertEqual(result.ner_data, expected['ner_data'])
+        self.assertEqual(result.sentiment_data, expected['sentiment_data'])
+
+        # The analysis page without a url_path opens the analysis of the
+        # upload in the session, without rewriting the stored results
+        with self.client.session_transaction() as sess:
+            sess['upload_id'] = result.upload_id
+        response = self.client.get('/analyze', follow_redirects=True)
+        self.assertEqual(response.request.path, f'/analysis/{url_path}')
+        db.session.expire_all()
+        self.assertEqual(db.session.get(AnalysisResult, result.id).sentiment_data, expected['sentiment_data'])
+
+        # Without an upload it sends the user to the upload page
+        with self.client.session_transaction() as sess:
+            sess.pop('upload_id')
+        response = self.client.get('/analyze')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.location.endswith('/upload/'))
+
+    def test_paragraph_partials_are_bounded_apart_from_the_analysis_cache(self):
+        from unittest import mock
+        from app.models import AnalysisCacheEntry, ParagraphCacheEntry
+        from app.utils.analysis_utils import analyze_text
+        from app.utils import paragraph_utils
+        from app.utils.cache_utils import analysis_store
+        from app.utils.pool_utils import analysis_pool
+        self.app.config['ANALYSIS_PARAGRAPH_MAX_ENTRIES'] = 2
+
+        text = 'Alice loved Paris!\n\nThe weather was cold and grey?? Awful.\n\nBob met her at the station.'
+        with mock.patch.object(analysis_pool, 'analyze', wraps=analysis_pool.analyze) as pooled, \
+                mock.patch.object(paragraph_utils, 'sentiment_totals',
+                                  wraps=paragraph_utils.sentiment_totals) as scored:
+            outputs = analysis_store.analyze(self.app, text, 'f' * 64)
+
+        # Sentiment is built from the merged paragraph totals, not analyzed again
+        self.assertEqual(outputs, analyze_text(text))
+        for call in pooled.call_args_list:
+            self.assertNotIn('sentiment_data', call.args[2])
+        self.assertEqual(scored.call_count, 3)
+
+        # The partials live in their own table, under their own limit
+        self.assertEqual(ParagraphCacheEntry.query.count(), 2)
+        self.assertEqual(AnalysisCacheEntry.query.filter_by(content_hash='f' * 64).count(), len(outputs))
+        stats = analysis_store.stats(self.app)
+        self.assertEqual(stats['paragraph_evictions'], 1)
+        self.assertEqual(stats['evictions'], 0)
+
+    def test_stats_routes_are_off_unless_enabled(self):
+        user = User(username='statsuser', email='stats@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'statsuser', 'password': 'password'})
+
+        routes = ['/upload/analysis-cache/stats', '/upload/news-cache/stats',
+                  '/upload/news-providers/stats', '/upload/http-client/stats']
+        for route in routes:
+            self.assertEqual(self.client.get(route).status_code, 404)
+        self.app.config['STATS_ENDPOINTS_ENABLED'] = True
+        for route in routes:
+            self.assertEqual(self.client.get(route).status_code, 200)
+
+    def test_cache_writes_skip_entries_stored_by_another_worker(self):
+        from app.models import AnalysisCacheEntry, ParagraphCacheEntry
+        from app.utils.cache_utils import analysis_store
+        from app.utils.paragraph_utils import analyze_paragraph
+        self.app.config['ANALYSIS_CACHE_MAX_ENTRIES'] = 2
+        analysis_store.put(self.app, 'a' * 64, {'ner_data': {'entities': []}})
+
+        # The entry stored first is kept and the rest of the batch is still stored and evicted
+        analysis_store.put(self.app, 'a' * 64, {'ner_data': {'entities': ['other']}, 'ngram_data': {}})
+        analysis_store.put(self.app, 'b' * 64, {'ngram_data': {}})
+        self.assertEqual(AnalysisCacheEntry.query.count(), 2)
+        self.assertEqual(analysis_store.stats(self.app)['evictions'], 1)
+        self.assertEqual(analysis_store.get('b' * 64, ['ngram_data']), {'ngram_data': {}})
+
+        partial = analyze_paragraph('The weather was cold and grey.')
+        analysis_store.put_paragraphs(self.app, {'c' * 64: partial})
+        analysis_store.put_paragraphs(self.app, {'c' * 64: partial, 'd' * 64: partial})
+        self.assertEqual(ParagraphCacheEntry.query.count(), 2)
+
+    def test_large_file_upload_is_streamed_to_storage(self):
+        from io import BytesIO
+        from app.utils.analysis_utils import analyze_text
+        self.app.config['UPLOAD_INLINE_MAX_BYTES'] = 64
+        user = User(username='streamuser', email='stream@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'streamuser', 'password': 'password'})
+
+        text = 'Alice flew to Paris on Monday.\n\nThe weather was cold and grey.\n\nBob met her at the station.'
+        response = self.client.post('/upload/file', data={'file': (BytesIO(text.encode('utf-8')), 'long.txt')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 202)
+
+        upload = db.session.get(UploadedText, response.get_json()['upload_id'])
+        self.assertIsNone(upload.content)
+        self.assertTrue(os.path.exists(upload.content_path))
+        self.assertEqual(upload.read_content(), text)
+        hits = self.client.get('/upload/search', query_string={'q': 'station'}).get_json()['results']
+        self.assertIn(('upload', upload.id), [(hit['kind'], hit['id']) for hit in hits])
+
+        job_id = response.get_json()['job_id']
+        url_path = self.client.get(f'/upload/jobs/{job_id}').get_json()['job']['url_path']
+        result = AnalysisResult.query.filter_by(url_path=url_path).first()
+        expected = analyze_text(text)
+        self.assertEqual(result.ngram_data, expected['ngram_data'])
+        self.assertEqual(result.word_freq_data, expected['word_freq_data'])
+        self.assertEqual(result.sentiment_data, expected['sentiment_data'])
+        os.remove(upload.content_path)
+
+
+    def test_sketches_bound_top_term_counts(self):
+        from collections import Counter
+        from app.utils.paragraph_utils import ParagraphMerger, analyze_paragraph, analyze_paragraphs
+        from app.utils.sketch_utils import SpaceSaving
+        words = ['w%d' % (i % 7 if i % 3 else i) for i in range(3000)]
+        sketch = SpaceSaving(20)
+        for start in range(0, len(words), 100):
+            sketch.update(Counter(words[start:start + 100]))
+        exact = Counter(words)
+        for word, count in sketch.most_common(5):
+            self.assertTrue(exact[word] <= count <= exact[word] + sketch.max_error)
+        self.assertLessEqual(sketch.max_error, len(words) / 20)
+
+        paragraphs = ['Red fox, blue fox.', 'Red fox jumps! Blue bird sings.', 'Red bird jumps.']
+        merger = ParagraphMerger({'capacity': 100, 'precision': 10, 'max_entities': 100, 'timeline_points': 100})
+        for paragraph in paragraphs:
+            merger.add(analyze_paragraph(paragraph))
+        approximate = merger.result()
+        expected = analyze_paragraphs('\n\n'.join(paragraphs))
+        self.assertTrue(approximate['word_freq_data']['approximate'])
+        self.assertEqual(approximate['word_freq_data']['unique_words'], expected['word_freq_data']['unique_words'])
+        self.assertEqual(approximate['ngram_data']['bigrams']['ngrams'], expected['ngram_data']['bigrams']['ngrams'])
+
+    def test_sketched_texts_keep_bounded_entities_and_timeline(self):
+        from unittest import mock
+        from app.utils import paragraph_utils
+        from app.utils.paragraph_utils import ParagraphMerger, analyze_paragraph
+        paragraph = 'Alice met Bob in Paris. It was lovely. The rain was awful. Carol stayed home.'
+        merger = ParagraphMerger({'capacity': 100, 'precision': 10, 'max_entities': 5, 'timeline_points': 4})
+        for _ in range(10):
+            merger.add(analyze_paragraph(paragraph))
+
+        # The timeline is halved each time it passes 4 points: 40 sentences
+        # end up as two points of 16 sentences and one of the last 8
+        timeline = merger.sentiment()['timeline']
+        self.assertEqual(timeline['sentences_per_point'], 16)
+        self.assertEqual(len(timeline['scores']), 3)
+        self.assertEqual(timeline['scores'][0], timeline['scores'][1])
+        ner_data = merger.result()['ner_data']
+        self.assertEqual(len(ner_data['entities']), 5)
+        self.assertTrue(ner_data['truncated'])
+
+        # Partials keep their largest counts only, and the merged counts say how far off they can be
+        text = 'red red red fox fox blue bird sings'
+        with mock.patch.object(paragraph_utils, 'PARAGRAPH_TOP_K', 2):
+            partial = analyze_paragraph(text)
+        self.assertEqual(partial['words'], [['red', 3], ['fox', 2]])
+        self.assertEqual(partial['dropped']['words'], 1)
+        merger = ParagraphMerger()
+        merger.add(partial)
+        word_freq_data = merger.result()['word_freq_data']
+        self.assertEqual((word_freq_data['approximate'], word_freq_data['max_error']), (True, 1))
+        self.assertEqual(word_freq_data['total_words'], 8)
+        self.assertNotIn('approximate', paragraph_utils.merge_paragraphs([analyze_paragraph(text)])['word_freq_data'])
+
+    def test_session_data_is_kept_on_the_server(self):
+        from app.models import ServerSession
+        user = User(username='sessionuser', email='session@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'sessionuser', 'password': 'password'})
+
+        text = 'The markets rallied today. ' * 400
+        with self.client.session_transaction() as sess:
+            sess['text_content'] = text
+
+        # The cookie only carries the signed session id
+        cookie = self.client.get_cookie(self.app.config['SESSION_COOKIE_NAME'])
+        self.assertLess(len(cookie.value), 200)
+        self.assertEqual(ServerSession.query.count(), 1)
+
+        # The next request loads the data back from the database
+        self.assertEqual(self.client.get('/upload/').status_code, 200)
+        with self.client.session_transaction() as sess:
+            self.assertEqual(sess['text_content'], text)
+
+    def test_login_and_logout_regenerate_the_session_id(self):
+        from app.models import ServerSession
+        user = User(username='fixuser', email='fix@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        cookie_name = self.app.config['SESSION_COOKIE_NAME']
+
+        # A session id planted before login
+        with self.client.session_transaction() as sess:
+            sess['planted'] = True
+        planted = self.client.get_cookie(cookie_name).value
+        planted_id = ServerSession.query.one().session_id
+
+        self.client.post('/auth/login', data={'username': 'fixuser', 'password': 'password'})
+        logged_in = self.client.get_cookie(cookie_name).value
+        self.assertNotEqual(logged_in, planted)
+        self.assertIsNone(db.session.get(ServerSession, planted_id))
+        with self.client.session_transaction() as sess:
+            self.assertTrue(sess['planted'])
+            self.assertEqual(sess['_user_id'], str(user.id))
+
+        # The planted id does not open the logged-in session
+        attacker = self.app.test_client()
+        attacker.set_cookie(cookie_name, planted)
+        with attacker.session_transaction() as sess:
+            self.assertNotIn('_user_id', sess)
+
+        # Nor does the logged-in id once the user logs out
+        self.client.get('/auth/logout')
+        self.assertNotEqual(self.client.get_cookie(cookie_name).value, logged_in)
+        attacker.set_cookie(cookie_name, logged_in)
+        with attacker.session_transaction() as sess:
+            self.assertNotIn('_user_id', sess)
+
+    def test_upload_history_pages_by_cursor(self):
+        from datetime import datetime, timedelta
+        from sqlalchemy import event
+        user = User(username='pageuser', email='page@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        start = datetime(2025, 1, 1)
+        for i in range(5):
+            db.session.add(UploadedText(user_id=user.id, title=f'Upload {i}', content=f'Text {i}',
+                                        created_at=start + timedelta(minutes=i)))
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'pageuser', 'password': 'password'})
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        first = self.client.get('/upload/history?limit=2').get_json()
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual([u['title'] for u in first['uploads']], ['Upload 4', 'Upload 3'])
+        self.assertEqual(len([sql for sql in statements if 'uploaded_texts' in sql]), 1)
+
+        second = self.client.get(f"/upload/history?limit=2&cursor={first['next_cursor']}").get_json()
+        third = self.client.get(f"/upload/history?limit=2&cursor={second['next_cursor']}").get_json()
+        self.assertEqual([u['title'] for u in second['uploads']], ['Upload 2', 'Upload 1'])
+        self.assertEqual([u['title'] for u in third['uploads']], ['Upload 0'])
+        self.assertIsNone(third['next_cursor'])
+
+        db.session.add(UploadedText(user_id=user.id, title='Upload 5', content='Text 5',
+                                    created_at=start + timedelta(minutes=5)))
+        db.session.commit()
+        delta = self.client.get(f"/upload/history?since={first['uploads'][0]['cursor']}").get_json()
+        self.assertEqual([u['title'] for u in delta['uploads']], ['Upload 5'])
+        self.assertIsNone(delta['next_cursor'])
+
+        # More new uploads than a page: the oldest come first and the cursor leads to the rest
+        for i in range(6, 9):
+            db.session.add(UploadedText(user_id=user.id, title=f'Upload {i}', content=f'Text {i}',
+                                        created_at=start + timedelta(minutes=i)))
+        db.session.commit()
+        since = delta['uploads'][0]['cursor']
+        delta = self.client.get(f"/upload/history?limit=2&since={since}").get_json()
+        self.assertEqual([u['title'] for u in delta['uploads']], ['Upload 7', 'Upload 6'])
+        delta = self.client.get(f"/upload/history?limit=2&since={delta['next_cursor']}").get_json()
+        self.assertEqual([u['title'] for u in delta['uploads']], ['Upload 8'])
+        self.assertIsNone(delta['next_cursor'])
+
+    def test_share_page_reads_newest_result_per_upload(self):
+        from datetime import datetime, timedelta
+        from sqlalchemy import event
+        user = User(username='shareuser', email='share@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        upload = UploadedText(user_id=user.id, title='Markets', content='Stocks rose.')
+        db.session.add(upload)
+        db.session.commit()
+        start = datetime(2025, 1, 1)
+        for i, title in enumerate(['Analysis Result: Old', 'Analysis Result: New']):
+            db.session.add(AnalysisResult(title=title, content='Stocks rose.', owner_id=user.id,
+                                          upload_id=upload.id, created_at=start + timedelta(minutes=i)))
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'shareuser', 'password': 'password'})
+
+        # Page views must not write anything besides the session
+        writes = []
+        def listener(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')) and 'server_session' not in statement:
+                writes.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        response = self.client.get('/share/')
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Analysis Result: New', response.data)
+        self.assertNotIn(b'Analysis Result: Old', response.data)
+        self.assertEqual(writes, [])
+
+    def test_share_page_query_count_does_not_grow_with_shares(self):
+        from flask import g
+        from sqlalchemy import event
+        from app.models import UserConnection
+        from app.utils.share_utils import upsert_shares
+        viewer = User(username='viewer', email='viewer@example.com')
+        viewer.set_password('password')
+        db.session.add(viewer)
+        db.session.commit()
+        viewer_id = viewer.id
+        self.client.post('/auth/login', data={'username': 'viewer', 'password': 'password'})
+
+        def add_results(count, start):
+            # Uploads of the viewer, and results shared with them by as many connected users
+            for i in range(start, start + count):
+                sharer = User(username=f'sharer{i}', email=f'sharer{i}@example.com')
+                sharer.set_password('password')
+                db.session.add(sharer)
+                db.session.flush()
+                db.session.add(UserConnection(user_id=viewer_id, connected_user_id=sharer.id))
+                for owner_id in (viewer_id, sharer.id):
+                    upload = UploadedText(user_id=owner_id, title=f'Upload {i}', content=f'Stocks rose {i}.')
+                    db.session.add(upload)
+                    db.session.flush()
+                    result = AnalysisResult(title=f'Analysis Result: {i}', content=upload.content, owner_id=owner_id,
+                                            upload_id=upload.id, sentiment_data={'compound_score': 0.5})
+                    db.session.add(result)
+                db.session.flush()
+                upsert_shares([result], [viewer_id], sharer.id, 'view-only', None)
+            db.session.commit()
+            # Requests share this session and app context; start them without loaded objects
+            db.session.expunge_all()
+            g.pop('_login_user', None)
+
+        def page_statements():
+            statements = []
+            def listener(conn, cursor, statement, *args):
+                if 'server_session' not in statement:
+                    statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                response = self.client.get('/share/')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            self.assertEqual(response.status_code, 200)
+            db.session.expunge_all()
+            g.pop('_login_user', None)
+            return statements
+
+        add_results(1, 0)
+        few = page_statements()
+        add_results(5, 1)
+        many = page_statements()
+
+        # The same statements however many results, shares and sharers are listed, and none write
+        self.assertEqual(len(many), len(few))
+        kinds = {statement.lstrip().split(None, 1)[0].upper() for statement in many}
+        self.assertFalse(kinds & {'INSERT', 'UPDATE', 'DELETE'})
+        # The lists do not load the compressed analyzer outputs
+        self.assertFalse([statement for statement in many if 'analysis_result.sentiment_data' in statement])
+
+    def test_share_results_upserts_shares(self):
+        from app.models import SharedAnalysis
+        users = []
+        for name in ('owner', 'alice', 'bob'):
+            user = User(username=name, email=f'{name}@example.com')
+            user.set_password('password')
+            db.session.add(user)
+            users.append(user)
+        db.session.commit()
+        owner, alice, bob = users
+        upload = UploadedText(user_id=owner.id, title='Markets', content='Stocks rose.')
+        db.session.add(upload)
+        db.session.commit()
+        results = [AnalysisResult(title=f'Analysis Result: {i}', content='Stocks rose.', owner_id=owner.id,
+                                  upload_id=upload.id) for i in range(2)]
+        db.session.add_all(results)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'owner', 'password': 'password'})
+
+        payload = {'analysis_ids': [r.id for r in results], 'user_ids': [alice.id, bob.id]}
+        self.assertEqual(self.client.post('/share/submit', json=payload).status_code, 200)
+        payload['permission'] = 'allow-reshare'
+        self.assertEqual(self.client.post('/share/submit', json=payload).status_code, 200)
+
+        shares = SharedAnalysis.query.all()
+        self.assertEqual(len(shares), 4)
+        self.assertEqual({share.permission for share in shares}, {'allow-reshare'})
+
+        payload['user_ids'] = [alice.id, 9999]
+        self.assertEqual(self.client.post('/share/submit', json=payload).status_code, 400)
+
+    def test_shares_reference_one_snapshot(self):
+        from sqlalchemy import event
+        from app.models import AnalysisSnapshot, SharedAnalysis
+        users = []
+        for name in ('snapowner', 'carol', 'dave'):
+            user = User(username=name, email=f'{name}@example.com')
+            user.set_password('password')
+            db.session.add(user)
+            users.append(user)
+        db.session.commit()
+        owner, carol, dave = users
+        upload = UploadedText(user_id=owner.id, title='Markets', content='Stocks rose.')
+        db.session.add(upload)
+        db.session.commit()
+        result = AnalysisResult(title='Analysis Result: Markets', content='Stocks rose.', owner_id=owner.id,
+                                upload_id=upload.id, sentiment_data={'compound_score': 0.5})
+        db.session.add(result)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'snapowner', 'password': 'password'})
+        # The outputs are only read for the snapshot, once, and not for a rejected share
+        def output_reads(payload):
+            statements = []
+            def listener(conn, cursor, statement, *args):
+                statements.append(statement)
+            db.session.expire_all()
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            self.client.post('/share/submit', json=payload)
+            event.remove(db.engine, 'before_cursor_execute', listener)
+            return len([statement for statement in statements if 'analysis_result.sentiment_data' in statement])
+
+        self.assertEqual(output_reads({'analysis_ids': [result.id], 'user_ids': [9999]}), 0)
+        self.assertEqual(output_reads({'analysis_ids': [result.id], 'user_ids': [carol.id, dave.id]}), 1)
+
+        snapshot = AnalysisSnapshot.query.one()
+        self.assertEqual(snapshot.ref_count, 2)
+        share = SharedAnalysis.query.filter_by(user_id=carol.id).one()
+        self.assertEqual(share.content, 'Stocks rose.')
+        self.assertEqual(share.sentiment_json, {'compound_score': 0.5})
+
+        # Sharing the changed analysis again moves one reference to a new snapshot
+        result.sentiment_data = {'compound_score': -0.5}
+        db.session.commit()
+        self.client.post('/share/submit', json={'analysis_ids': [result.id], 'user_ids': [carol.id]})
+        db.session.expire_all()
+        self.assertEqual(db.session.get(AnalysisSnapshot, snapshot.id).ref_count, 1)
+        changed = SharedAnalysis.query.filter_by(user_id=carol.id).one().snapshot
+        self.assertEqual((changed.ref_count, changed.sentiment_data), (1, {'compound_score': -0.5}))
+
+        # Deleting the upload cascades to the shares and releases the snapshots
+        db.session.delete(upload)
+        db.session.commit()
+        self.assertEqual(AnalysisSnapshot.query.count(), 0)
+
+    def test_analysis_data_is_stored_compressed(self):
+        import zlib
+        user = User(username='zipowner', email='zipowner@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        upload = UploadedText(user_id=user.id, title='Markets', content='Stocks rose.')
+        db.session.add(upload)
+        db.session.commit()
+        ner_data = {'entities': [{'text': 'London', 'label': 'GPE'}] * 50}
+        result = AnalysisResult(title='Analysis Result: Markets', content='Stocks rose.', owner_id=user.id,
+                                upload_id=upload.id, ner_data=ner_data)
+        db.session.add(result)
+        db.session.commit()
+
+        raw = db.session.execute(db.text('SELECT ner_data FROM analysis_result WHERE id = :id'),
+                                 {'id': result.id}).scalar()
+        self.assertIsInstance(raw, bytes)
+        self.assertLess(len(raw), len(zlib.decompress(raw)))
+
+        db.session.expire_all()
+        self.assertEqual(db.session.get(AnalysisResult, result.id).ner_data, ner_data)
+
+    def test_compression_migration_keeps_shares_and_job_links(self):
+        import tempfile
+        from flask_migrate import upgrade
+        from sqlalchemy import text
+        from app.models import AnalysisJob, AnalysisSnapshot, SharedAnalysis
+        directory = tempfile.mkdtemp()
+        migrations = os.path.join(os.path.dirname(__file__), '..', 'migrations')
+
+        class MigrationConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(directory, 'migrate.db')
+        app = create_app(MigrationConfig)
+
+        with app.app_context():
+            # A database with JSON text columns, before the compression migration
+            upgrade(directory=migrations, revision='e5c3a7d91b42')
+            statements = [
+                "INSERT INTO user (id, username, email) VALUES (1, 'owner', 'owner@example.com'), "
+                "(2, 'reader', 'reader@example.com')",
+                "INSERT INTO uploaded_texts (id, user_id, title, content) VALUES (1, 1, 'Markets', 'Stocks rose.')",
+                "INSERT INTO analysis_result (id, title, content, owner_id, upload_id, url_path, sentiment_data) "
+                "VALUES (1, 'Analysis Result: Markets', 'Stocks rose.', 1, 1, 'abc', '{\"compound_score\": 0.5}')",
+                "INSERT INTO analysis_snapshot (id, snapshot_hash, content, sentiment_data, ref_count) "
+                "VALUES (1, 'old', 'Stocks rose.', '{\"compound_score\": 0.5}', 1)",
+                "INSERT INTO shared_analysis (id, user_id, analysis_id, sharer_id, snapshot_id) VALUES (1, 2, 1, 1, 1)",
+                "INSERT INTO analysis_job (id, user_id, upload_id, analysis_id, status) VALUES ('job', 1, 1, 1, 'done')",
+            ]
+            for statement in statements:
+                db.session.execute(text(statement))
+            db.session.commit()
+
+            upgrade(directory=migrations)
+
+            share = db.session.get(SharedAnalysis, 1)
+            self.assertIsNotNone(share)
+            self.assertEqual(share.sentiment_data, {'compound_score': 0.5})
+            self.assertEqual(db.session.get(AnalysisSnapshot, share.snapshot_id).ref_count, 1)
+            self.assertEqual(db.session.get(AnalysisJob, 'job').analysis_id, 1)
+            self.assertEqual(db.session.get(AnalysisResult, 1).sentiment_data, {'compound_score': 0.5})
+            db.session.remove()
+            db.engine.dispose()
+
+    def test_search_ranks_own_documents_with_highlights(self):
+        owner = User(username='searcher', email='searcher@example.com')
+        owner.set_password('password')
+        other = User(username='other', email='other@example.com')
+        other.set_password('password')
+        db.session.add_all([owner, other])
+        db.session.commit()
+        texts = ['Rain is expected in London tomorrow.',
+                 'London markets fell while London traders waited.',
+                 'Markets in Paris were calm.']
+        uploads = [UploadedText(user_id=owner.id, title=f'Note {i}', content=content) for i, content in enumerate(texts)]
+        db.session.add_all(uploads + [UploadedText(user_id=other.id, title='Other', content='London calling.')])
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'searcher', 'password': 'password'})
+
+        first = self.client.get('/upload/search', query_string={'q': 'london', 'limit': 1}).get_json()
+        self.assertEqual([(hit['kind'], hit['id']) for hit in first['results']], [('upload', uploads[1].id)])
+        hit = first['results'][0]
+        self.assertEqual([hit['snippet'][start:end] for start, end in hit['snippet_highlights']], ['London', 'London'])
+        second = self.client.get('/upload/search', query_string={'q': 'london', 'cursor': first['next_cursor']}).get_json()
+        self.assertEqual([hit['id'] for hit in second['results']], [uploads[0].id])
+        self.assertIsNone(second['next_cursor'])
+
+        # The index follows edits and deletes, and prefixes match
+        uploads[2].content = 'Markets in Londonderry were calm.'
+        db.session.delete(uploads[0])
+        db.session.commit()
+        results = self.client.get('/upload/search', query_string={'q': 'london*'}).get_json()['results']
+        self.assertEqual({hit['id'] for hit in results}, {uploads[1].id, uploads[2].id})
+        self.assertEqual(self.client.get('/upload/search', query_string={'q': '"'}).get_json()['results'], [])
+
+    def test_batch_upload_reads_files_and_zip_entries(self):
+        import zipfile
+        from io import BytesIO
+        self.app.config['UPLOAD_INLINE_MAX_BYTES'] = 64
+        user = User(username='batchuser', email='batch@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'batchuser', 'password': 'password'})
+
+        long_text = 'Alice flew to Paris on Monday.\n\nThe weather was cold and grey.\n\nBob met her there.'
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr('news/first.txt', 'Markets rallied today.')
+            zip_file.writestr('news/long.txt', long_text)
+            zip_file.writestr('news/empty.txt', '   ')
+            zip_file.writestr('news/image.png', b'not text')
+            zip_file.writestr('__MACOSX/news/._first.txt', b'metadata')
+        archive.seek(0)
+
+        response = self.client.post('/upload/batch', data={'files': [
+            (BytesIO(b'Rain is expected tomorrow.'), 'weather.txt'),
+            (archive, 'articles.zip')
+        ]}, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 202)
+        files = {entry['filename']: entry for entry in response.get_json()['files']}
+        self.assertEqual(set(files), {'weather.txt', 'articles.zip/news/first.txt', 'articles.zip/news/long.txt',
+                                      'articles.zip/news/empty.txt', 'articles.zip/news/image.png'})
+        self.assertEqual(files['articles.zip/news/empty.txt']['status'], 'skipped')
+        self.assertEqual(files['articles.zip/news/image.png']['status'], 'skipped')
+
+        stored = db.session.get(UploadedText, files['articles.zip/news/long.txt']['upload_id'])
+        self.assertTrue(stored.is_stored)
+        self.assertEqual(stored.read_content(), long_text)
+        self.assertEqual(db.session.get(UploadedText, files['articles.zip/news/first.txt']['upload_id']).content,
+                         'Markets rallied today.')
+
+        status = self.client.get(response.get_json()['status_url']).get_json()
+        self.assertTrue(status['finished'])
+        self.assertEqual(status['counts']['done'], 3)
+        self.assertTrue(all(job['url_path'] for job in status['jobs']))
+        self.assertEqual(self.client.get('/upload/batch/unknown').status_code, 404)
+        os.remove(stored.content_path)
+
+    def test_article_fetch_keeps_pages_done_by_deadline(self):
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from app.utils.news_utils import article_fetcher
+        active = []
+        peak = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                active.append(1)
+                peak.append(len(active))
+                time.sleep(float(self.path.rsplit('=', 1)[1]))
+                active.pop()
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b'<html><body><p>Article</p></body></html>')
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_address[1]}/article'
+        urls = [f'{base}/{i}?delay=0.2' for i in range(4)] + [f'{base}/slow?delay=3']
+
+        start = time.monotonic()
+        pages = article_fetcher.fetch_pages(urls, deadline=1.0)
+        elapsed = time.monotonic() - start
+        server.shutdown()
+        server.server_close()
+
+        self.assertEqual(set(pages), set(urls[:4]))
+        self.assertLess(elapsed, 2)
+        self.assertLessEqual(max(peak), self.app.config['ARTICLE_FETCH_PER_HOST'])
+
+    def test_news_caches_revalidate_articles_and_reuse_responses(self):
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from app.utils.news_cache import article_store, canonical_url, get_news_json, news_responses
+        from app.utils.news_utils import article_fetcher
+        body = '<html><body><article>' + '<p>The council approved the new budget after a long debate.</p>' * 5 + '</article></body></html>'
+        requests_seen = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests_seen.append((self.path, self.headers.get('If-None-Match')))
+                if self.path.startswith('/api'):
+                    payload = json.dumps({'status': 'ok', 'articles': [{'title': 'Budget'}]}).encode()
+                    self.send_response(200)
+                    self.end_headers()
+                    self.wfile.write(payload)
+                elif self.headers.get('If-None-Match') == '"v1"':
+                    self.send_response(304)
+                    self.end_headers()
+                else:
+                    self.send_response(200)
+                    self.send_header('ETag', '"v1"')
+                    self.end_headers()
+                    self.wfile.write(body.encode())
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+        try:
+            url = f'{base}/article?utm_source=feed&id=1'
+            self.assertEqual(canonical_url(url), canonical_url(f'{base.upper()}/article?id=1#top'))
+
+            first = article_fetcher.fetch_articles([url])
+            self.assertIn('council approved', first[url])
+            # A fresh entry is used without a request; a stale one is revalidated
+            self.assertEqual(article_fetcher.fetch_articles([f'{base}/article?id=1']), {f'{base}/article?id=1': first[url]})
+            self.assertEqual(len(requests_seen), 1)
+            self.app.config['ARTICLE_CACHE_FRESH_SECONDS'] = 0
+            self.assertEqual(article_fetcher.fetch_articles([url]), first)
+            self.assertEqual(requests_seen[-1], ('/article?utm_source=feed&id=1', '"v1"'))
+            stats = article_store.stats(self.app)
+            self.assertEqual((stats['hits'], stats['revalidated'], stats['misses'], stats['entries']), (1, 1, 1, 1))
+
+            for _ in range(2):
+                status, data = get_news_json(f'{base}/api', {'q': 'budget'}, ('everything', 'budget', None, '2026-10-18'))
+                self.assertEqual(status, 200)
+                data['articles'][0]['contentInsufficient'] = True
+            self.assertNotIn('contentInsufficient', get_news_json(f'{base}/api', {}, ('everything', 'budget', None, '2026-10-18'))[1]['articles'][0])
+            self.assertEqual(sum(path.startswith('/api') for path, _ in requests_seen), 1)
+            self.assertEqual(news_responses.stats(self.app)['hits'], 2)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_article_store_saves_duplicate_links_once(self):
+        from app.models import ArticleCacheEntry
+        from app.utils.news_cache import article_store
+        used = ArticleCacheEntry(url_hash='a' * 64, url='https://example.com/used', content='Used', hit_count=1)
+        db.session.add(used)
+        db.session.commit()
+
+        fetched = {
+            'https://example.com/story?utm_source=feed': ('First', '"v1"', None),
+            'https://EXAMPLE.com/story#comments': ('Second', '"v2"', None)
+        }
+        article_store.save(self.app, [used], [used], fetched)
+        entries = ArticleCacheEntry.query.filter(ArticleCacheEntry.id != used.id).all()
+        self.assertEqual([(entry.url, entry.content, entry.etag) for entry in entries],
+                         [('https://example.com/story', 'Second', '"v2"')])
+        self.assertEqual(db.session.get(ArticleCacheEntry, used.id).hit_count, 2)
+
+        # A page that is stored already is updated in place
+        article_store.save(self.app, [used], [], {'https://example.com/story': ('Third', None, None)})
+        db.session.expire_all()
+        self.assertEqual(ArticleCacheEntry.query.filter_by(url='https://example.com/story').one().content, 'Third')
+        self.assertEqual(db.session.get(ArticleCacheEntry, used.id).hit_count, 3)
+
+    def test_http_client_retries_reuses_connections_and_caps_bodies(self):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from app.utils.http_utils import ResponseTooLarge, http_client
+        self.app.config['HTTP_BACKOFF'] = 0.01
+        self.app.config['HTTP_MAX_BODY_BYTES'] = 64 * 1024
+        attempts = []
+        client_ports = set()
+        sent = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                client_ports.add(self.client_address[1])
+                if self.path == '/huge':
+                    # No Content-Length, so only streaming can notice the size
+                    self.send_response(200)
+                    self.send_header('Connection', 'close')
+                    self.end_headers()
+                    try:
+                        for _ in range(1000):
+                            self.wfile.write(b'x' * 16384)
+                            sent.append(1)
+                    except OSError:
+                        pass
+                    self.close_connection = True
+                    return
+                attempts.append(self.path)
+                status = 503 if self.path == '/flaky' and len(attempts) == 1 else 200
+                self.send_response(status)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'ok')
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+        try:
+            response = http_client.get(f'{base}/flaky')
+            self.assertEqual((response.status_code, response.text), (200, 'ok'))
+            self.assertEqual(http_client.get(f'{base}/again').text, 'ok')
+            self.assertEqual(len(attempts), 3)
+            self.assertEqual(len(client_ports), 1)
+
+            with self.assertRaises(ResponseTooLarge):
+                http_client.get(f'{base}/huge')
+            self.assertLess(len(sent), 1000)
+
+            metrics = http_client.stats(self.app)['127.0.0.1']
+            self.assertEqual((metrics['requests'], metrics['retries'], metrics['too_large']), (4, 1, 1))
+            self.assertIsNotNone(metrics['p95_ms'])
+        finally:
+            http_client.close(self.app)
+            server.shutdown()
+            server.server_close()
+
+    def test_article_extraction_matches_fixture_corpus(self):
+        import glob
+        from app.utils.extract_utils import available_backends, extract_article_content
+        pages = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'fixtures', 'articles', '*.html')))
+        self.assertTrue(pages)
+        for path in pages:
+            with open(path, encoding='utf-8') as f:
+                html = f.read()
+            with open(path[:-len('.html')] + '.txt', encoding='utf-8') as f:
+                expected = f.read().strip() or None
+            for backend in available_backends():
+                with self.subTest(page=os.path.basename(path), backend=backend):
+                    self.assertEqual(extract_article_content(html, backend), expected)
+        with self.assertRaises(ValueError):
+            extract_article_content('<p>text</p>', 'html5lib')
+
+    def test_breaker_trial_is_settled_when_a_request_errors_or_is_cancelled(self):
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+        from app.utils.news_providers import PROVIDERS, news_providers
+        self.app.config.update(NEWS_PROVIDERS=['newsapi'], NEWS_API_KEY='newsapi-key', NEWS_CACHE_TTL=0,
+                               NEWS_BREAKER_FAILURES=1, NEWS_BREAKER_COOLDOWN=0, NEWS_FANOUT_DEADLINE=0.5)
+        breaker = news_providers._breaker(self.app, 'newsapi')
+        try:
+            # Errors outside the HTTP request are failures of the trial, not a stuck trial
+            with self.app.app_context(), \
+                    mock.patch.object(PROVIDERS['newsapi'], 'search_request', side_effect=KeyError('query')) as request:
+                for _ in range(3):
+                    response = news_providers.search('budget', '2026-10-18', 5)
+                    self.assertIn('Unexpected error', response['errors']['newsapi'])
+            self.assertEqual(request.call_count, 3)
+            self.assertFalse(breaker.trial)
+
+            # A trial still queued at the deadline is cancelled and given back
+            blocker = threading.Event()
+            executor = ThreadPoolExecutor(max_workers=1)
+            executor.submit(blocker.wait)
+            self.app.extensions['news_providers']['executor'] = executor
+            self.app.config['NEWS_FANOUT_DEADLINE'] = 0.1
+            with self.app.app_context():
+                response = news_providers.search('budget', '2026-10-18', 5)
+            blocker.set()
+            self.assertEqual(response['errors']['newsapi'], 'No answer before the deadline')
+            self.assertFalse(breaker.trial)
+            self.assertTrue(breaker.allow())
+        finally:
+            news_providers.shutdown(self.app, wait=False)
+
+    def test_news_search_fans_out_to_providers_with_breakers(self):
+        import json
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from app.utils.news_providers import news_providers
+        body = 'The council approved the new budget after a long debate about rates. ' * 10
+        behaviour = {'newsapi': 0.0, 'gnews': 0.0, 'newsdata': 'fail'}
+        seen = []
+
+        def payload(provider):
+            if provider == 'newsapi':
+                return {'status': 'ok', 'articles': [
+                    {'title': 'Budget passes', 'url': 'https://example.com/budget?utm_source=newsapi',
+                     'content': body, 'source': {'name': 'Example'}, 'publishedAt': '2026-10-17T09:00:00Z'},
+                    {'title': 'Rates rise', 'url': 'https://example.com/rates', 'content': body, 'source': {'name': 'Example'}}]}
+            return {'totalArticles': 2, 'articles': [
+                {'title': 'Budget passes (GNews)', 'url': 'https://EXAMPLE.com/budget', 'content': body,
+                 'source': {'name': 'Example'}, 'image': ''},
+                {'title': 'Parks funded', 'url': 'https://example.org/parks', 'content': body, 'source': {'name': 'Other'}}]}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                provider = self.path.split('/')[1]
+                seen.append(provider)
+                if behaviour[provider] == 'fail':
+                    self.send_response(500)
+                    self.end_headers()
+                    self.wfile.write(b'{"status": "error", "results": {"message": "down"}}')
+                    return
+                time.sleep(behaviour[provider])
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(json.dumps(payload(provider)).encode())
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+        self.app.config.update(
+            GNEWS_API_KEY='gnews-key', NEWSDATA_API_KEY='newsdata-key', HTTP_RETRIES=0, NEWS_CACHE_TTL=0,
+            NEWS_PROVIDER_URLS={name: f'{base}/{name}' for name in behaviour},
+            NEWS_FANOUT_MODE='all', NEWS_BREAKER_FAILURES=2
+        )
+        user = User(username='newsuser', email='news@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'newsuser', 'password': 'password'})
+        try:
+            # All providers at once: merged in turn, the same story from two providers kept once
+            data = self.client.get('/upload/search-news', query_string={'query': 'budget'}).get_json()
+            self.assertTrue(data['success'])
+            self.assertEqual(data['providers'], ['newsapi', 'gnews'])
+            self.assertEqual([article['title'] for article in data['articles']],
+                             ['Budget passes', 'Rates rise', 'Parks funded'])
+
+            # A second failure opens the NewsData breaker, so the third search skips it
+            self.client.get('/upload/search-news', query_string={'query': 'budget'})
+            seen.clear()
+            self.client.get('/upload/search-news', query_string={'query': 'budget'})
+            self.assertNotIn('newsdata', seen)
+            self.assertEqual(news_providers.stats(self.app)['newsdata']['state'], 'open')
+
+            # Hedged: a slow NewsAPI does not hold up the page once GNews has answered
+            behaviour['newsapi'] = 2.0
+            self.app.config.update(NEWS_FANOUT_MODE='hedged', NEWS_HEDGE_DELAY=0.2)
+            start = time.monotonic()
+            data = self.client.get('/upload/latest-news').get_json()
+            self.assertLess(time.monotonic() - start, 1.5)
+            self.assertEqual(data['providers'], ['gnews'])
+            self.assertEqual(len(data['articles']), 2)
+        finally:
+            news_providers.shutdown(self.app, wait=False)
+            server.shutdown()
+            server.server_close()
+
+    def test_news_ingestion_pre_analyzes_articles_for_instant_import(self):
+        import json
+        import threading
+        from datetime import datetime, timedelta
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from app.models import AnalysisJob, NewsArticle
+        from app.utils.ingest_utils import news_ingestor
+        from app.utils.news_providers import news_providers
+        body = 'The festival drew record crowds and glowing reviews from visitors across the region. ' * 6
+        requests_seen = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests_seen.append(self.path)
+                self.send_response(200)
+                self.end_headers()
+                if self.path.startswith('/paywall'):
+                    self.wfile.write(b'<html><body><p>Subscribe to read</p></body></html>')
+                    return
+                base = f'http://127.0.0.1:{self.server.server_address[1]}'
+                self.wfile.write(json.dumps({'status': 'ok', 'articles': [
+                    {'title': 'Festival breaks records', 'url': 'https://example.com/festival', 'content': body,
+                     'source': {'name': 'Example'}, 'publishedAt': '2026-10-17T09:00:00Z'},
+                    {'title': 'Paywalled story', 'url': f'{base}/paywall', 'content': 'Subscribe to read'}
+                ]}).encode())
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.app.config.update(
+            NEWS_PROVIDERS=['newsapi'], HTTP_RETRIES=0, NEWS_CACHE_TTL=0, ARTICLE_CACHE_ENABLED=False,
+            NEWS_PROVIDER_URLS={'newsapi': f'http://127.0.0.1:{server.server_address[1]}/newsapi'}
+        )
+        user = User(username='ingestuser', email='ingest@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'ingestuser', 'password': 'password'})
+        try:
+            result = self.app.test_cli_runner().invoke(args=['ingest-news', '--category', 'arts'])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn('arts: 2 fetched, 1 new, 0 updated, 1 analyzed, 1 skipped', result.output)
+            article = NewsArticle.query.one()
+            self.assertIsNotNone(article.analyzed_at)
+
+            # Unchanged articles are not analyzed again, but stay fresh
+            article.ingested_at = datetime.utcnow() - timedelta(days=30)
+            db.session.commit()
+            summary = news_ingestor.ingest(self.app, ['arts'])
+            self.assertEqual(summary['arts']['analyzed'], 0)
+            self.assertGreater(article.ingested_at, datetime.utcnow() - timedelta(minutes=1))
+
+            # An article whose analysis failed is analyzed on the next run
+            article.analyzed_at = None
+            db.session.commit()
+            summary = news_ingestor.ingest(self.app, ['arts'])
+            self.assertEqual(summary['arts']['analyzed'], 1)
+            self.assertIsNotNone(article.analyzed_at)
+
+            # The latest news tab is served from the fresh corpus without asking the providers
+            requests_seen.clear()
+            data = self.client.get('/upload/latest-news', query_string={'category': 'arts'}).get_json()
+            self.assertEqual(requests_seen, [])
+            self.assertEqual(data['providers'], ['corpus'])
+            self.assertEqual(data['articles'][0]['title'], 'Festival breaks records')
+
+            # Importing needs no analysis job
+            response = self.client.post(data['articles'][0]['import_url'])
+            self.assertEqual(response.status_code, 201)
+            imported = response.get_json()
+            analysis = AnalysisResult.query.filter_by(url_path=imported['url_path']).one()
+            self.assertIsNotNone(analysis.sentiment_data)
+            self.assertIsNotNone(analysis.ner_data)
+            self.assertEqual(AnalysisJob.query.count(), 0)
+            self.assertEqual(db.session.get(UploadedText, imported['upload_id']).content, article.content)
+        finally:
+            news_providers.shutdown(self.app, wait=False)
+            server.shutdown()
+            server.server_close()
+
+    def test_news_search_batch_analyzes_results_within_budget(self):
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from app.utils.news_providers import news_providers
+        body = 'Microsoft shares rose sharply after a wonderful quarter, and Microsoft thanked its loyal customers. ' * 3
+        articles = [
+            {'title': 'Shares rise', 'url': 'https://example.com/shares', 'content': body, 'source': {'name': 'Example'}}
+        ]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(json.dumps({'status': 'ok', 'articles': articles}).encode())
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.app.config.update(
+            NEWS_PROVIDERS=['newsapi'], HTTP_RETRIES=0, NEWS_CACHE_TTL=0,
+            NEWS_PROVIDER_URLS={'newsapi': f'http://127.0.0.1:{server.server_address[1]}/newsapi'}
+        )
+        user = User(username='triageuser', email='triage@example.com')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={'username': 'triageuser', 'password': 'password'})
+        try:
+            # Without the option the results are not analyzed
+            data = self.client.get('/upload/search-news', query_string={'query': 'shares'}).get_json()
+            self.assertNotIn('analysis', data['articles'][0])
+
+            data = self.client.get('/upload/search-news', query_string={'query': 'shares', 'analyze': '1'}).get_json()
+            analysis = data['articles'][0]['analysis']
+            self.assertEqual(analysis['sentiment'], 'Positive')
+            self.assertGreater(analysis['compound_score'], 0)
+            self.assertEqual(analysis['top_entities'][0]['text'], 'Microsoft')
+
+            # With no time left, stored summaries are still returned and new articles are left empty
+            articles.append({'title': 'Paywalled', 'url': 'https://example.com/paywall', 'content': 'Too short'})
+            articles.append({'title': 'Storm damage', 'url': 'https://example.com/storm', 'source': {'name': 'Example'},
+                             'content': 'The storm destroyed homes and left the town in terrible ruin. ' * 5})
+            self.app.config['ANALYSIS_BATCH_TIMEOUT'] = 0
+            self.app.config['ARTICLE_FETCH_DEADLINE'] = 0.01
+            data = self.client.get('/upload/search-news', query_string={'query': 'shares', 'analyze': 'true'}).get_json()
+            results = {article['title']: article['analysis'] for article in data['articles']}
+            self.assertEqual(results['Shares rise'], analysis)
+            self.assertIsNone(results['Paywalled'])
+            self.assertEqual(results['Storm damage'], {'sentiment': None, 'compound_score': None, 'top_entities': None})
+        finally:
+            news_providers.shutdown(self.app, wait=False)
+            server.shutdown()
+            server.server_close()
+
 if __name__ == '__main__':
     unittest.main()